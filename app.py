@@ -1,20 +1,110 @@
 """
 Main script.
+
+Run with: python app.py [--serve ADDRESS | --batch FILE | --sync OTHER |
+                         --build-filter CORPUS]
+ADDRESS is "host:port" for TCP, a Unix socket path otherwise.
+FILE holds one command per line, - reads them from stdin.
+OTHER is a copy of the data file to synchronise with; --base keeps the state of
+the last synchronisation, so that removals are synchronised too.
+CORPUS is a sorted file of breached password SHA-1 hashes: its Bloom filter is
+built once, to CORPUS.bloom, and speeds up password audits.
+With PASSMAN_STATS=stats.json, statistics are dumped to stats.json on exit.
+
+Data loads on a background thread while the menu is drawn: only login, user
+creation and user removal wait for it. Modules needed by a single mode are
+imported by that mode.
 """
-from controller.tui_controller import TuiController
+import argparse
+import atexit
+import os
+import sys
+
+from model import kdf, stats
+from model.autosave import AutoSaver
 from model.data import UserStorage
-from view.tui import Tui
 
 if __name__ == "__main__":
-    view = Tui()
+    parser = argparse.ArgumentParser(description=__doc__)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--serve", metavar="ADDRESS", help="serve clients on socket")
+    mode.add_argument(
+        "--batch", metavar="FILE", type=argparse.FileType("r"), help="run commands"
+    )
+    mode.add_argument("--sync", metavar="OTHER", help="synchronise with a copy")
+    mode.add_argument(
+        "--build-filter", metavar="CORPUS", help="build filter of breach corpus"
+    )
+    parser.add_argument("--base", metavar="FILE", help="state of last --sync")
+    parser.add_argument(
+        "--conflict",
+        choices=("ours", "theirs"),
+        default="ours",
+        help="side kept on --sync conflicts",
+    )
+    args = parser.parse_args()
+    # dumps statistics when PASSMAN_STATS is set, however the app leaves
+    atexit.register(stats.dump)
+
+    if args.build_filter:
+        from model.breach import build_filter
+
+        count, size = build_filter(args.build_filter, args.build_filter + ".bloom")
+        print(f"{count} hachage(s), filtre de {size} octets.")
+        sys.exit(0)
+
     storage = UserStorage()
-    controller = TuiController(view,storage)
 
-    F_NAME = "data.dat"
+    F_NAME = "data.bin"
+    LEGACY_F_NAME = "data.dat"
+    KDF_F_NAME = "kdf.cost"
+
+    if not os.path.exists(F_NAME) and os.path.exists(LEGACY_F_NAME):
+        from model.binfmt import convert
+
+        convert(LEGACY_F_NAME, F_NAME)
+
+    if args.sync:
+        from model.sync import sync_files
+
+        report = sync_files(F_NAME, args.sync, args.base, args.conflict)
+        print(report)
+        for login, name in report.conflicts:
+            print(f"Conflit: {login} {name}".rstrip())
+        sys.exit(0)
+
+    # new users get the cost of about 0.25 s on this host, never less than the
+    # default: calibrated at first launch only, while data loads, and only
+    # waited for by user creation
+    storage.kdf_params = (kdf.SCRYPT, kdf.host_cost(KDF_F_NAME, kdf.SCRYPT))
+    storage.load_in_background(F_NAME, journaled=True, binary=True)
+
+    if args.batch:
+        from view.batch import run as run_batch
+
+        # saved once, at the end
+        try:
+            failed = run_batch(storage, args.batch, sys.stdout)
+        finally:
+            storage.save(F_NAME)
+        sys.exit(1 if failed else 0)
 
-    storage.load(F_NAME)
+    autosaver = AutoSaver(storage, F_NAME)
+    autosaver.start()
+    try:
+        if args.serve:
+            from view.server import run as serve
 
-    view.controller = controller
-    controller.start()
+            serve(storage, args.serve)
+        else:
+            from controller.tui_controller import TuiController
+            from view.tui import Tui
 
-    storage.save(F_NAME)
+            view = Tui()
+            controller = TuiController(view, storage)
+            view.controller = controller
+            controller.start()
+    finally:
+        # TuiController.exit leaves through SystemExit: save anyway
+        autosaver.stop()
+        storage.save(F_NAME)
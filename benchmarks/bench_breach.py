@@ -0,0 +1,74 @@
+"""
+Benchmark: audit of a vault against a breach corpus, with and without filter
+
+Run with: python -m benchmarks.bench_breach [--corpus 1000000] [--items 10000]
+"""
+import argparse
+from hashlib import sha1
+import os
+import random
+import tempfile
+import time
+
+from model.breach import BreachCorpus, build_filter
+
+CORPUS_SIZE = 1_000_000
+ITEMS = 10_000
+# share of vault passwords found in the corpus
+BREACHED = 0.05
+
+
+def make_corpus(filename: str, size: int) -> None:
+    """
+    Write a sorted corpus of size hashes, with breach counts
+
+    Arguments:
+        filename -- corpus file path
+        size -- number of hashes
+    """
+    lines = sorted(
+        f"{sha1(f'breached{i}'.encode()).hexdigest().upper()}:{i % 1000 + 1}\r\n"
+        for i in range(size)
+    )
+    with open(filename, "w", encoding="ascii", newline="") as file:
+        file.writelines(lines)
+
+
+def audit(corpus: str, passwords: list[str]) -> tuple[float, int, int]:
+    """
+    Check passwords against corpus
+
+    Arguments:
+        corpus -- corpus file path
+        passwords -- passwords to check
+
+    Returns:
+        time in seconds, breached passwords, corpus lookups
+    """
+    start = time.perf_counter()
+    with BreachCorpus(corpus) as breaches:
+        found = breaches.check(passwords)
+        lookups = breaches.lookups
+    return time.perf_counter() - start, len(found), lookups
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", type=int, default=CORPUS_SIZE)
+    parser.add_argument("--items", type=int, default=ITEMS)
+    options = parser.parse_args()
+    corpus = os.path.join(tempfile.mkdtemp(), "corpus.txt")
+    make_corpus(corpus, options.corpus)
+    passwords = [
+        f"breached{random.randrange(options.corpus)}"
+        if random.random() < BREACHED
+        else f"secret{i}"
+        for i in range(options.items)
+    ]
+    seconds, found, lookups = audit(corpus, passwords)
+    print(f"without filter: {seconds * 1e3:>8.1f} ms, {found} found, {lookups} lookups")
+    start = time.perf_counter()
+    build_filter(corpus, corpus + ".bloom")
+    print(f"filter built in {time.perf_counter() - start:.1f} s")
+    seconds, found, lookups = audit(corpus, passwords)
+    print(f"with filter:    {seconds * 1e3:>8.1f} ms, {found} found, {lookups} lookups")
@@ -0,0 +1,62 @@
+"""
+Benchmark: snapshot size against save and load time, for each codec
+
+Run with: python -m benchmarks.bench_compression [--sizes 10000 100000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.suite import make_storage
+from model import compress
+from model.data import UserStorage
+
+SIZES = (10_000, 100_000)
+CODECS = (None, *compress.CODECS)
+
+
+def bench(size: int, codec: str | None) -> tuple[int, float, float]:
+    """
+    Save then load size items with a codec
+
+    Arguments:
+        size -- number of items
+        codec -- compression codec, None for a plain pickle
+
+    Returns:
+        file size in bytes, save and load times in seconds
+    """
+    filename = os.path.join(tempfile.mkdtemp(), "data.dat")
+    storage = make_storage(size)
+    storage.compression = codec
+    start = time.perf_counter()
+    storage.save(filename)
+    save_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    UserStorage().load(filename)
+    load_time = time.perf_counter() - start
+    file_size = os.path.getsize(filename)
+    os.remove(filename)
+    return file_size, save_time, load_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    options = parser.parse_args()
+    print(
+        f"{'items':>8} {'codec':>6} {'size (KiB)':>11} {'ratio':>6} "
+        f"{'save (ms)':>10} {'load (ms)':>10}"
+    )
+    for n in options.sizes:
+        plain = None
+        for codec in CODECS:
+            file_size, save_time, load_time = bench(n, codec)
+            plain = plain or file_size
+            print(
+                f"{n:>8} {codec or 'none':>6} {file_size / 1024:>11.1f} "
+                f"{plain / file_size:>6.2f} {save_time * 1e3:>10.1f} "
+                f"{load_time * 1e3:>10.1f}"
+            )
@@ -0,0 +1,52 @@
+"""
+Benchmark: UserStorage.get_user cost against the number of users
+
+Run with: python -m benchmarks.bench_get_user
+"""
+import random
+import timeit
+
+from model.data import UserStorage
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+LOOKUPS = 10_000
+
+
+def fill_storage(size: int) -> UserStorage:
+    """
+    Build a storage holding synthetic users
+
+    Arguments:
+        size -- number of users
+
+    Returns:
+        A filled UserStorage
+    """
+    storage = UserStorage()
+    for i in range(size):
+        storage.create_user(f"user{i}", "password")
+    return storage
+
+
+def bench(size: int) -> float:
+    """
+    Time random get_user calls
+
+    Arguments:
+        size -- number of users in storage
+
+    Returns:
+        Mean cost of one lookup, in microseconds
+    """
+    storage = fill_storage(size)
+    logins = [f"user{random.randrange(size)}" for _ in range(LOOKUPS)]
+    elapsed = timeit.timeit(
+        lambda: [storage.get_user(login) for login in logins], number=1
+    )
+    return elapsed / LOOKUPS * 1e6
+
+
+if __name__ == "__main__":
+    print(f"{'users':>10} {'get_user (µs)':>15}")
+    for n in SIZES:
+        print(f"{n:>10} {bench(n):>15.3f}")
@@ -0,0 +1,62 @@
+"""
+Benchmark: memory used by vault items, former __dict__ layout against slots
+
+Run with: python -m benchmarks.bench_memory
+"""
+import tracemalloc
+from typing import Callable
+
+from model.data import VaultItem
+
+SIZES = (10_000, 100_000, 1_000_000)
+
+
+class DictVaultItem:
+    """
+    Vault Item, as laid out before slots
+    """
+
+    def __init__(self, name: str, login: str, password: str) -> None:
+        """
+        Constructor
+
+        Arguments:
+            name -- name of element
+            login -- login to store
+            password -- password to store
+        """
+        self.name = name
+        self.login = login
+        self.password = password
+
+
+def measure(factory: Callable[[str, str, str], object], size: int) -> int:
+    """
+    Measure memory held by items stored in a dictionary, as in a Vault
+
+    Arguments:
+        factory -- item class
+        size -- number of items
+
+    Returns:
+        Allocated bytes
+    """
+    tracemalloc.start()
+    elements = {}
+    for i in range(size):
+        name = f"site{i}.example.com"
+        elements[name] = factory(name, f"user{i % 50}@example.com", f"pw{i}")
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+if __name__ == "__main__":
+    print(f"{'items':>10} {'__dict__ (MiB)':>15} {'slots (MiB)':>12} {'saved':>7}")
+    for n in SIZES:
+        before = measure(DictVaultItem, n)
+        after = measure(VaultItem, n)
+        print(
+            f"{n:>10} {before / 2**20:>15.1f} {after / 2**20:>12.1f}"
+            f" {1 - after / before:>7.0%}"
+        )
@@ -0,0 +1,113 @@
+"""
+Benchmark: cold start
+
+Measures, in fresh interpreters:
+- import time of app.py;
+- time to first prompt: from start of python app.py until the main menu asks
+  for a choice, with a data file of each size in the working directory;
+- for comparison, the time UserStorage.load takes on that file.
+
+Run with: python -m benchmarks.bench_startup [--sizes 0 100000] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.suite import make_storage
+from model.data import UserStorage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+SIZES = (0, 100_000)
+RUNS = 5
+PROMPT = b"Votre choix"
+IMPORT_SCRIPT = (
+    "import time; start = time.perf_counter(); import app; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def import_time() -> float:
+    """
+    Import app in a fresh interpreter
+
+    Returns:
+        import time, in seconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        cwd=ROOT,
+        capture_output=True,
+        check=True,
+    )
+    return float(result.stdout)
+
+
+def first_prompt(workdir: str) -> float:
+    """
+    Start the app, wait for its first prompt, then quit
+
+    Arguments:
+        workdir -- directory holding the data file
+
+    Returns:
+        time to first prompt, in seconds
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-u", APP],
+        cwd=workdir,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    output = b""
+    while PROMPT not in output:
+        chunk = process.stdout.read1(4096)
+        if not chunk:
+            raise RuntimeError("app exited before its first prompt")
+        output += chunk
+    elapsed = time.perf_counter() - start
+    process.communicate(b"0\n")
+    return elapsed
+
+
+def load_time(filename: str) -> float:
+    """
+    Load a data file
+
+    Arguments:
+        filename -- data file
+
+    Returns:
+        load time, in seconds
+    """
+    start = time.perf_counter()
+    UserStorage().load(filename, journaled=True)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--runs", type=int, default=RUNS)
+    options = parser.parse_args()
+
+    imports = [import_time() for _ in range(options.runs)]
+    print(f"import app: {statistics.median(imports) * 1e3:.1f} ms")
+    print(f"{'items':>8} {'first prompt (ms)':>18} {'load (ms)':>10}")
+    for n in options.sizes:
+        workdir = tempfile.mkdtemp()
+        filename = os.path.join(workdir, "data.bin")
+        if n:
+            make_storage(n, filename, binary=True).save(filename)
+        prompts = [first_prompt(workdir) for _ in range(options.runs)]
+        loads = [load_time(filename) for _ in range(options.runs)]
+        print(
+            f"{n:>8} {statistics.median(prompts) * 1e3:>18.1f} "
+            f"{statistics.median(loads) * 1e3:>10.1f}"
+        )
@@ -0,0 +1,173 @@
+"""
+Load generator for the socket server
+
+Starts a server on a synthetic storage, unless --address points to a running
+one, then opens many connections logging in and sending requests. Client n logs
+in as user<n>, with user<n> as password. Reports requests per second and
+latency percentiles.
+
+Run with: python -m benchmarks.loadgen [--clients 50] [--requests 200]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any, Optional
+
+from model.data import UserStorage, VaultItem
+from view.server import Server
+
+CLIENTS = 50
+REQUESTS = 200
+ITEMS_PER_USER = 100
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def make_storage(users: int) -> UserStorage:
+    """
+    Build a storage of synthetic users, their password is their login
+
+    Arguments:
+        users -- number of users
+
+    Returns:
+        filled UserStorage
+    """
+    storage = UserStorage()
+    for i in range(users):
+        storage.create_user(f"user{i}", f"user{i}")
+        storage.get_vault(storage.get_user(f"user{i}")).add_elements(
+            VaultItem(f"site{j}.example.com", f"user{i}", f"pw{j}")
+            for j in range(ITEMS_PER_USER)
+        )
+    return storage
+
+
+async def connect(
+    address: str,
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """
+    Open a connection
+
+    Arguments:
+        address -- "host:port" for TCP, a socket path otherwise
+
+    Returns:
+        connection streams
+    """
+    if ":" in address:
+        host, port = address.rsplit(":", 1)
+        return await asyncio.open_connection(host, int(port))
+    return await asyncio.open_unix_connection(address)
+
+
+async def request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    op: str,
+    *args: Any,
+) -> dict[str, Any]:
+    """
+    Send a request and wait for its reply
+
+    Arguments:
+        reader -- connection input
+        writer -- connection output
+        op -- operation
+
+    Returns:
+        reply
+    """
+    writer.write(json.dumps({"op": op, "args": args}).encode("utf-8") + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def client(address: str, n: int, requests: int, latencies: list[float]) -> None:
+    """
+    Log in, then send requests one after the other
+
+    Arguments:
+        address -- server address
+        n -- client number, picks its user
+        requests -- number of requests
+        latencies -- receives the latency of each request, in seconds
+    """
+    rng = random.Random(n)
+    reader, writer = await connect(address)
+    login = f"user{n}"
+    await request(reader, writer, "login", login, login)
+    for _ in range(requests):
+        match rng.randrange(4):
+            case 0:
+                name = f"site{rng.randrange(ITEMS_PER_USER)}.example.com"
+                call = ("get_element", name)
+            case 1:
+                call = ("list_page", None, 20)
+            case 2:
+                call = ("search_by_name", f"site{rng.randrange(10)}")
+            case _:
+                call = ("search_by_login", login)
+        start = time.perf_counter()
+        await request(reader, writer, *call)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+
+def percentile(values: list[float], p: float) -> float:
+    """
+    Nearest rank percentile
+
+    Arguments:
+        values -- sorted values
+        p -- percentile, from 0 to 100
+
+    Returns:
+        value below which p percent of values fall
+    """
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def run(clients: int, requests: int, address: Optional[str]) -> None:
+    """
+    Run the load and print its results
+
+    Arguments:
+        clients -- number of concurrent connections
+        requests -- requests per connection
+        address -- running server, None to start one
+    """
+    server = None
+    if address is None:
+        address = os.path.join(tempfile.mkdtemp(), "server.sock")
+        server = Server(make_storage(clients))
+        await server.start(address)
+    latencies: list[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(client(address, n, requests, latencies) for n in range(clients))
+    )
+    elapsed = time.perf_counter() - start
+    if server is not None:
+        server.server.close()
+        await server.server.wait_closed()
+
+    latencies.sort()
+    print(f"{len(latencies)} requests, {clients} clients, {elapsed:.2f} s")
+    print(f"{len(latencies) / elapsed:.0f} requests/s")
+    for p in PERCENTILES:
+        print(f"p{p:<5} {percentile(latencies, p) * 1e3:8.3f} ms")
+    print(f"max    {latencies[-1] * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=CLIENTS)
+    parser.add_argument("--requests", type=int, default=REQUESTS)
+    parser.add_argument("--address", help="running server (default: start one)")
+    options = parser.parse_args()
+    asyncio.run(run(options.clients, options.requests, options.address))
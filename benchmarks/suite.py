@@ -0,0 +1,309 @@
+"""
+Benchmark suite for storage and vault hot paths
+
+Each case runs against synthetic data of growing size. Timings and peak memory
+are compared with a stored baseline: a case slower or bigger than its baseline
+by more than the tolerance is reported and makes the run fail.
+
+Run with: python -m benchmarks.suite [--sizes 1000 10000 ...] [--update]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+from model.data import UserStorage, Vault, VaultItem
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+SIZES = (1_000, 10_000, 100_000)
+TOLERANCE = 0.5
+# differences below these are noise, whatever the tolerance
+NOISE = {"seconds": 0.005, "peak": 1 << 20}
+OPERATIONS = 1_000
+ITEMS_PER_USER = 100
+REPEAT = 5
+
+
+def make_vault(size: int) -> Vault:
+    """
+    Build a vault of synthetic items, inserted in random order
+
+    Arguments:
+        size -- number of items
+
+    Returns:
+        filled Vault
+    """
+    names = [f"site{i:07d}.example.com" for i in range(size)]
+    random.shuffle(names)
+    vault = Vault()
+    vault.add_elements(
+        VaultItem(name, f"user{i % 50}@example.com", f"pw{i}")
+        for i, name in enumerate(names)
+    )
+    return vault
+
+
+def make_storage(
+    size: int, filename: Optional[str] = None, binary: bool = False
+) -> UserStorage:
+    """
+    Build a storage holding size items, ITEMS_PER_USER per user
+
+    Arguments:
+        size -- total number of items
+
+    Keyword Arguments:
+        filename -- new file the storage is bound to (default: {None})
+        binary -- use binary format for filename (default: {False})
+
+    Returns:
+        filled UserStorage
+    """
+    storage = UserStorage()
+    if filename is not None:
+        storage.load(filename, binary=binary)
+    for i in range(max(1, size // ITEMS_PER_USER)):
+        storage.create_user(f"user{i}", "password")
+        vault = storage.get_vault(storage.get_user(f"user{i}"))
+        vault.add_elements(
+            VaultItem(f"site{j}.example.com", f"user{i}", f"pw{j}")
+            for j in range(ITEMS_PER_USER)
+        )
+    return storage
+
+
+def case_get_user(size: int) -> Callable[[], object]:
+    """
+    OPERATIONS lookups among size users
+    """
+    storage = UserStorage()
+    for i in range(size):
+        storage.create_user(f"user{i}", "password")
+    logins = [f"user{random.randrange(size)}" for _ in range(OPERATIONS)]
+    return lambda: [storage.get_user(login) for login in logins]
+
+
+def case_save_pickle(size: int) -> Callable[[], object]:
+    """
+    Save size items as pickle
+    """
+    filename = os.path.join(tempfile.mkdtemp(), "data.dat")
+    storage = make_storage(size, filename)
+    return lambda: storage.save(filename)
+
+
+def case_save_binary(size: int) -> Callable[[], object]:
+    """
+    Save size items in binary format, every vault loaded
+    """
+    filename = os.path.join(tempfile.mkdtemp(), "data.bin")
+    storage = make_storage(size, filename, binary=True)
+
+    def run() -> None:
+        # only changed vaults are written: change them all
+        for vault in storage.users.values():
+            vault.dirty = True
+        storage.save(filename)
+
+    return run
+
+
+def _load_case(size: int, binary: bool) -> Callable[[], object]:
+    """
+    Load size items, then open one vault
+    """
+    filename = os.path.join(tempfile.mkdtemp(), "data.bin" if binary else "data.dat")
+    make_storage(size, filename, binary).save(filename)
+    storage = UserStorage()
+
+    def run() -> Vault:
+        storage.load(filename)
+        return storage.get_vault(storage.get_user("user0"))
+
+    return run
+
+
+def case_load_pickle(size: int) -> Callable[[], object]:
+    """
+    Load size items from pickle, then open one vault
+    """
+    return _load_case(size, False)
+
+
+def case_load_binary(size: int) -> Callable[[], object]:
+    """
+    Load size items from binary format, then open one vault
+    """
+    return _load_case(size, True)
+
+
+def case_list_elements(size: int) -> Callable[[], object]:
+    """
+    List a vault of size items
+    """
+    return make_vault(size).list_elements
+
+
+def case_search_by_name(size: int) -> Callable[[], object]:
+    """
+    OPERATIONS prefix searches in a vault of size items
+    """
+    vault = make_vault(size)
+    prefixes = [f"site{random.randrange(size):07d}"[:-2] for _ in range(OPERATIONS)]
+    return lambda: [vault.search_by_name(prefix) for prefix in prefixes]
+
+
+def case_edit_element(size: int) -> Callable[[], object]:
+    """
+    OPERATIONS edits in a vault of size items
+    """
+    vault = make_vault(size)
+    names = random.sample(vault.list_elements(), min(size, OPERATIONS))
+
+    def run() -> None:
+        for name in names:
+            vault.edit_element(vault.elements[name], VaultItem(name, "login", "new"))
+
+    return run
+
+
+def case_edit_batch(size: int) -> Callable[[], object]:
+    """
+    OPERATIONS edits in a vault of size items, in one transaction
+    """
+    vault = make_vault(size)
+    names = random.sample(vault.list_elements(), min(size, OPERATIONS))
+
+    def run() -> None:
+        with vault.transaction() as transaction:
+            for name in names:
+                transaction.edit(name, VaultItem(name, "login", "new"))
+
+    return run
+
+
+CASES: dict[str, Callable[[int], Callable[[], object]]] = {
+    "get_user": case_get_user,
+    "save_pickle": case_save_pickle,
+    "load_pickle": case_load_pickle,
+    "save_binary": case_save_binary,
+    "load_binary": case_load_binary,
+    "list_elements": case_list_elements,
+    "search_by_name": case_search_by_name,
+    "edit_element": case_edit_element,
+    "edit_batch": case_edit_batch,
+}
+
+
+def measure(case: Callable[[int], Callable[[], object]], size: int) -> dict[str, float]:
+    """
+    Run a case
+
+    Arguments:
+        case -- case setup, returning the function to measure
+        size -- size of synthetic data
+
+    Returns:
+        best time of REPEAT runs, in seconds, and peak memory of setup and one
+        run, in bytes
+    """
+    tracemalloc.start()
+    run = case(size)
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return {"seconds": best, "peak": peak}
+
+
+def compare(
+    results: dict[str, dict[str, dict[str, float]]],
+    baseline: dict[str, dict[str, dict[str, float]]],
+    tolerance: float,
+) -> list[str]:
+    """
+    Find regressions against baseline, ignoring differences within NOISE
+
+    Arguments:
+        results -- measures, by case then size
+        baseline -- reference measures, by case then size
+        tolerance -- allowed relative growth
+
+    Returns:
+        description of each regression
+    """
+    regressions = []
+    for name, sizes in results.items():
+        for size, measures in sizes.items():
+            reference = baseline.get(name, {}).get(size)
+            if reference is None:
+                continue
+            for metric, value in measures.items():
+                if (
+                    value > reference[metric] * (1 + tolerance)
+                    and value - reference[metric] > NOISE[metric]
+                ):
+                    regressions.append(
+                        f"{name} @ {size}: {metric}"
+                        f" {value:.6g} > {reference[metric]:.6g}"
+                    )
+    return regressions
+
+
+def main() -> int:
+    """
+    Run suite
+
+    Returns:
+        exit status, 1 on regression
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument(
+        "--update", action="store_true", help="store results as new baseline"
+    )
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, dict[str, float]]] = {}
+    print(f"{'case':<16} {'size':>9} {'seconds':>12} {'peak (MiB)':>11}")
+    for name in args.cases:
+        for size in args.sizes:
+            measures = measure(CASES[name], size)
+            results.setdefault(name, {})[str(size)] = measures
+            print(
+                f"{name:<16} {size:>9} {measures['seconds']:>12.6f}"
+                f" {measures['peak'] / 2**20:>11.1f}"
+            )
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+    if args.update:
+        for name, sizes in results.items():
+            baseline.setdefault(name, {}).update(sizes)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        return 0
+
+    if regressions := compare(results, baseline, args.tolerance):
+        print("\nREGRESSIONS:", *regressions, sep="\n  ", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,9 +2,19 @@
 TUI controller
 """
 from __future__ import annotations
+from typing import TYPE_CHECKING, Optional
+
+from model import stats
+from model.crypto import ItemCipher, is_encrypted
 from model.data import DuplicateError, Vault, VaultItem, UserStorage
 
-from view.tui import Tui
+PREFIX = "prefix"
+SUBSTRING = "substring"
+FUZZY = "fuzzy"
+PAGE_SIZE = 50
+
+if TYPE_CHECKING:
+    from view.tui import Tui
 
 
 class TuiController:
@@ -15,6 +25,8 @@ class TuiController:
         self.view = view
         self.storage = storage
         self.vault = Vault()
+        # key of the logged user, derived once at login
+        self.cipher: Optional[ItemCipher] = None
 
     def start(self) -> None:
         """
@@ -22,14 +34,21 @@ class TuiController:
         """
         self.view.show_main_menu()
 
+    @stats.timed("controller.login")
     def login(self, user_name: str, user_password: str) -> bool:
         """
-        Log user
+        Log user. Waits for the storage to be loaded. Passwords stored before
+        encryption are encrypted on the way.
         """
-        if (user := self.storage.get_user(user_name)) is not None:
-            if user.verify_password(user_password):
+        self.storage.wait_loaded()
+        if self.storage.get_user(user_name) is not None:
+            user = self.storage.authenticate(user_name, user_password)
+            if user is not None:
                 try:
                     self.vault = self.storage.get_vault(user)
+                    key = self.storage.item_key(user_name, user_password)
+                    self.cipher = ItemCipher(key)
+                    self._encrypt_clear_passwords()
                     return True
                 except KeyError:
                     self.view.show_error("L’utilisateur n’existe pas.")
@@ -38,44 +57,88 @@ class TuiController:
             self.view.show_error("L’utilisateur n’existe pas.")
         return False
 
+    @stats.timed("controller.create_user")
     def create_user(self, user_name: str, user_password: str) -> None:
         """
-        Create user
+        Create user. Waits for the storage to be loaded.
         """
-        if self.storage.get_user(user_name) is None:
-            if self.storage.create_user(user_name, user_password):
-                self.view.show_message("Utilisateur créé avec succès.")
-            else:
-                self.view.show_error("L’utilisateur existe déjà. Veuillez réessayer.")
+        self.storage.wait_loaded()
+        if self.storage.create_user(user_name, user_password):
+            self.view.show_message("Utilisateur créé avec succès.")
         else:
             self.view.show_error("L’utilisateur existe déjà. Veuillez réessayer.")
 
+    @stats.timed("controller.remove_user")
     def remove_user(self, user_name: str, user_password: str) -> None:
         """
-        Remove a user
+        Remove a user. Waits for the storage to be loaded.
         """
+        self.storage.wait_loaded()
         if self.storage.remove_user(user_name, user_password):
             self.view.show_message("Utilisateur supprimé avec succès.")
         else:
             self.view.show_error("Nom d’utilisateur inexistant.")
 
+    def _encrypt(self, item: VaultItem) -> VaultItem:
+        """
+        Encrypt the password of an item about to be stored
+        """
+        return item if self.cipher is None else self.cipher.encrypt_item(item)
+
+    def _encrypt_clear_passwords(self) -> None:
+        """
+        Encrypt the passwords stored in clear, in one transaction kept out of
+        the history: it is no change of the user, and cannot be undone. The
+        items are only scanned until the vault is known to be encrypted.
+        """
+        with self.vault.lock:
+            if self.vault.encrypted:
+                return
+            transaction = self.vault.transaction(versioned=False)
+            for item in self.vault.elements.values():
+                if not is_encrypted(item.password):
+                    transaction.edit(item.name, self._encrypt(item))
+            if len(transaction):
+                self.storage.commit(transaction)
+            self.vault.encrypted = True
+
+    def _decrypt(self, item: VaultItem) -> VaultItem:
+        """
+        Decrypt the password of a stored item
+        """
+        return item if self.cipher is None else self.cipher.decrypt_item(item)
+
     def list_elements(self) -> list[str]:
         """
         List all elements
         """
         return self.vault.list_elements()
 
+    @stats.timed("controller.list_page")
+    def list_page(
+        self, after: Optional[str] = None, limit: int = PAGE_SIZE
+    ) -> list[str]:
+        """
+        List a page of elements, starting after the given name
+        """
+        return self.vault.page(limit, after)
+
+    @stats.timed("controller.show_details")
     def show_details(self, element_name: str) -> tuple[str,str,str]:
         """
         Show element’s details
         """
         try:
-            element = self.vault.get_element(element_name)
+            element = self._decrypt(self.vault.get_element(element_name))
             return (element.name,element.login,element.password)
         except KeyError:
             self.view.show_error("Pas d’élément à ce nom. Veuillez réessayer.")
             return ("","","")
+        except ValueError:
+            self.view.show_error("Impossible de déchiffrer le mot de passe.")
+            return ("","","")
         
+    @stats.timed("controller.add_element")
     def add_element(
         self, element_name: str, element_login: str, element_password: str
     ) -> None:
@@ -84,11 +147,12 @@ class TuiController:
         """
         try:
             v_item = VaultItem(element_name, element_login, element_password)
-            self.vault.add_element(v_item)
+            self.vault.add_element(self._encrypt(v_item))
             self.view.show_message("Élément ajouté avec succès.")
         except DuplicateError:
             self.view.show_error("L’élément existe déjà. Veuillez réessayer.")
 
+    @stats.timed("controller.get_element")
     def get_element(self, element_name: str) -> tuple[str, str, str]:
         """
         _summary_
@@ -99,9 +163,10 @@ class TuiController:
         Returns:
             _description_
         """
-        item = self.vault.get_element(element_name)
+        item = self._decrypt(self.vault.get_element(element_name))
         return (item.name, item.login, item.password)
 
+    @stats.timed("controller.edit_element")
     def edit_element(
         self,
         element_name: str,
@@ -112,15 +177,18 @@ class TuiController:
         """
         Edit an element
         """
+        new_item = VaultItem(new_element_name, new_element_login, new_element_password)
+        transaction = self.vault.transaction()
+        transaction.edit(element_name, self._encrypt(new_item))
         try:
-            old_item = self.vault.get_element(element_name)
-            new_item = VaultItem(
-                new_element_name, new_element_login, new_element_password
-            )
-            self.vault.edit_element(old_item, new_item)
+            # journaled as one record: a rename is never replayed halfway
+            self.storage.commit(transaction)
         except KeyError:
             self.view.show_error("L’élément n’existe pas. Veuillez réessayer.")
+        except DuplicateError:
+            self.view.show_error("L’élément existe déjà. Veuillez réessayer.")
 
+    @stats.timed("controller.remove_element")
     def remove_element(self, element_name: str) -> None:
         """
         Remove an element
@@ -131,15 +199,158 @@ class TuiController:
         except KeyError:
             self.view.show_error("L’élément n’existe pas. Veuillez réessayer.")
 
-    def search_by_name(self, query: str) -> list[str]:
+    @stats.timed("controller.apply_changes")
+    def apply_changes(self, changes: list[list[str]]) -> bool:
+        """
+        Apply many changes at once, or none if one of them fails. A change is
+        ["add", name, login, password], ["edit", name, new_name, new_login,
+        new_password] or ["remove", name].
+        """
+        transaction = self.vault.transaction()
+        for change in changes:
+            match change:
+                case ["add", name, login, password]:
+                    transaction.add(self._encrypt(VaultItem(name, login, password)))
+                case ["edit", name, new_name, new_login, new_password]:
+                    new_item = VaultItem(new_name, new_login, new_password)
+                    transaction.edit(name, self._encrypt(new_item))
+                case ["remove", name]:
+                    transaction.remove(name)
+                case _:
+                    self.view.show_error(f"Modification invalide: {change}")
+                    return False
+        try:
+            self.storage.commit(transaction)
+        except KeyError as error:
+            self.view.show_error(f"Élément(s) inexistant(s): {error.args[0]}")
+            return False
+        except DuplicateError as error:
+            self.view.show_error(f"Élément(s) déjà existant(s): {error}")
+            return False
+        self.view.show_message(f"{len(changes)} modification(s) appliquée(s).")
+        return True
+
+    @stats.timed("controller.search_by_name")
+    def search_by_name(self, query: str, mode: str = PREFIX) -> list[str]:
         """
-        Search an element by it’s name
+        Search an element by it’s name: PREFIX, SUBSTRING or FUZZY match
         """
+        if mode == SUBSTRING:
+            elements = self.vault.search_substring(query)
+        elif mode == FUZZY:
+            elements = self.vault.search_fuzzy(query)
+        else:
+            elements = self.vault.search_by_name(query)
         lst = []
-        for element in self.vault.search_by_name(query):
+        for element in elements:
             lst.append(element.name)
         return lst
 
+    @stats.timed("controller.search_by_login")
+    def search_by_login(self, login: str) -> list[str]:
+        """
+        List elements using a login
+        """
+        return [element.name for element in self.vault.search_by_login(login)]
+
+    @stats.timed("controller.undo")
+    def undo(self) -> None:
+        """
+        Revert the last change of the vault
+        """
+        if self.vault.undo():
+            self.view.show_message("Dernière modification annulée.")
+        else:
+            self.view.show_error("Rien à annuler.")
+
+    @stats.timed("controller.item_history")
+    def item_history(self, element_name: str) -> list[tuple[str, str, str]]:
+        """
+        List the successive states of an element, oldest first; a removal is
+        an empty state
+        """
+        states = self.vault.history(element_name)
+        if not states:
+            self.view.show_error("Pas d’historique pour cet élément.")
+            return []
+        try:
+            return [
+                ("", "", "")
+                if item is None
+                else (item.name, item.login, self._decrypt(item).password)
+                for item in states
+            ]
+        except ValueError:
+            self.view.show_error("Impossible de déchiffrer le mot de passe.")
+            return []
+
+    @stats.timed("controller.import_elements")
+    def import_elements(self, filename: str) -> None:
+        """
+        Import elements from a CSV or JSONL file
+        """
+        from model.transfer import import_file
+
+        try:
+            imported, skipped = import_file(self.vault, filename, self._encrypt)
+            self.view.show_message(
+                f"{imported} élément(s) importé(s), {skipped} doublon(s) ignoré(s)."
+            )
+        except (OSError, ValueError) as error:
+            self.view.show_error(f"Import impossible: {error}")
+
+    @stats.timed("controller.export_elements")
+    def export_elements(self, filename: str) -> None:
+        """
+        Export all elements to a CSV or JSONL file
+        """
+        from model.transfer import export_file
+
+        try:
+            count = export_file(self.vault, filename, self._decrypt)
+            self.view.show_message(f"{count} élément(s) exporté(s).")
+        except (OSError, ValueError) as error:
+            self.view.show_error(f"Export impossible: {error}")
+
+    @stats.timed("controller.audit_passwords")
+    def audit_passwords(self, corpus: str) -> list[tuple[str, int]]:
+        """
+        Check the passwords of the vault against a local corpus of breached
+        password hashes, see model.breach. Lists breached elements with their
+        number of breaches.
+        """
+        from model.breach import BreachCorpus
+
+        with self.vault.lock:
+            items = list(self.vault.elements.values())
+        try:
+            passwords = {item.name: self._decrypt(item).password for item in items}
+        except ValueError:
+            self.view.show_error("Impossible de déchiffrer le mot de passe.")
+            return []
+        try:
+            with BreachCorpus(corpus) as breaches:
+                found = breaches.check(passwords.values())
+        except (OSError, ValueError) as error:
+            self.view.show_error(f"Vérification impossible: {error}")
+            return []
+        hits = [
+            (name, found[password])
+            for name, password in sorted(passwords.items())
+            if password in found
+        ]
+        if hits:
+            self.view.show_message(f"{len(hits)} mot(s) de passe compromis.")
+        else:
+            self.view.show_message("Aucun mot de passe compromis.")
+        return hits
+
+    def get_stats(self) -> list[str]:
+        """
+        Get instrumentation statistics, one line per operation
+        """
+        return stats.report()
+
     def exit(self) -> None:
         """
         Exit application
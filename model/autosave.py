@@ -0,0 +1,77 @@
+"""
+Background autosave
+"""
+from threading import Event, Thread
+from typing import Optional
+
+from model.data import UserStorage
+
+DEFAULT_INTERVAL = 5.0
+
+
+class AutoSaver:
+    """
+    Saves a storage on a background thread, every interval seconds, when it has
+    unsaved changes. Each vault is only locked while its items are listed, not
+    while they are written, so the thread never holds up the user interface.
+    """
+
+    def __init__(
+        self, storage: UserStorage, filename: str, interval: float = DEFAULT_INTERVAL
+    ) -> None:
+        """
+        Constructor
+
+        Arguments:
+            storage -- storage to save
+            filename -- file or directory path
+
+        Keyword Arguments:
+            interval -- seconds between two checks (default: {DEFAULT_INTERVAL})
+        """
+        self.storage = storage
+        self.filename = filename
+        self.interval = interval
+        self.error: Optional[BaseException] = None
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+
+    def start(self) -> None:
+        """
+        Start background thread
+        """
+        self._stopped.clear()
+        self._thread = Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop background thread, waiting for a running save
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def save_if_dirty(self) -> bool:
+        """
+        Save storage if it changed since last save
+
+        Returns:
+            True if storage was saved
+        """
+        if not self.storage.dirty:
+            return False
+        self.storage.save(self.filename)
+        return True
+
+    def _run(self) -> None:
+        """
+        Thread body. A failed save is kept in error and retried next time.
+        """
+        while not self._stopped.wait(self.interval):
+            try:
+                self.save_if_dirty()
+                self.error = None
+            except Exception as error:  # pylint: disable=broad-except
+                self.error = error
@@ -0,0 +1,492 @@
+"""
+Compact binary storage format, read through mmap
+
+Layout (little endian):
+
+    header  magic "PMAN", version u16, reserved u16, index offset u64
+    records user and vault records
+    index   user count u32, then (user offset u64, vault offset u64, vault
+            stamp u64) per user
+
+A record is a u32 length followed by its payload. User and item payloads are
+a u16 field count followed by u32 length prefixed fields. A vault payload is an
+item count u32, a table of u32 item offsets sorted by item name, then the item
+records, so one item can be found by bisection without reading the others.
+
+A vault stamp is drawn at random when the vault is written from memory, and
+kept when its record is copied as is: an unchanged stamp tells an unchanged
+vault without reading it. Version 1 files have no stamps, read as 0.
+"""
+import mmap
+import os
+import struct
+import sys
+from threading import RLock
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+from model import stats
+
+if TYPE_CHECKING:
+    from model.data import User, Vault, VaultItem
+
+MAGIC = b"PMAN"
+VERSION = 2
+HEADER = struct.Struct("<4sHHQ")
+U16 = struct.Struct("<H")
+U32 = struct.Struct("<I")
+INDEX_ENTRY = struct.Struct("<QQQ")
+INDEX_ENTRY_V1 = struct.Struct("<QQ")
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+def is_binary(filename: str) -> bool:
+    """
+    Tell if a file uses the binary format
+
+    Arguments:
+        filename -- file path
+
+    Returns:
+        True if file starts with the format magic
+    """
+    try:
+        with open(filename, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except (FileNotFoundError, IsADirectoryError):
+        return False
+
+
+def pack_fields(fields: Iterable[bytes]) -> bytes:
+    """
+    Encode a record made of fields
+
+    Arguments:
+        fields -- raw fields
+
+    Returns:
+        length prefixed record
+    """
+    fields = list(fields)
+    parts = [U16.pack(len(fields))]
+    for field in fields:
+        parts.append(U32.pack(len(field)))
+        parts.append(field)
+    payload = b"".join(parts)
+    return U32.pack(len(payload)) + payload
+
+
+def unpack_fields(buffer: Buffer, offset: int) -> list[bytes]:
+    """
+    Decode a record made of fields
+
+    Arguments:
+        buffer -- file content
+        offset -- offset of record
+
+    Returns:
+        raw fields
+    """
+    pos = offset + U32.size
+    (count,) = U16.unpack_from(buffer, pos)
+    pos += U16.size
+    fields = []
+    for _ in range(count):
+        (length,) = U32.unpack_from(buffer, pos)
+        pos += U32.size
+        fields.append(buffer[pos : pos + length])
+        pos += length
+    return fields
+
+
+def record_end(buffer: Buffer, offset: int) -> int:
+    """
+    Offset following a record
+
+    Arguments:
+        buffer -- file content
+        offset -- offset of record
+
+    Returns:
+        end offset of record
+    """
+    return offset + U32.size + U32.unpack_from(buffer, offset)[0]
+
+
+def encode_user(user: "User") -> bytes:
+    """
+    Encode an user
+
+    Arguments:
+        user -- user to encode
+
+    Returns:
+        user record
+    """
+    return pack_fields([user.login.encode("utf-8"), user.password.encode("ascii")])
+
+
+def decode_user(buffer: Buffer, offset: int) -> "User":
+    """
+    Decode an user, without hashing its password again
+
+    Arguments:
+        buffer -- file content
+        offset -- offset of record
+
+    Returns:
+        User
+    """
+    from model.data import User
+
+    login, password = unpack_fields(buffer, offset)[:2]
+    user = User.__new__(User)
+    user.login = login.decode("utf-8")
+    user.password = password.decode("ascii")
+    return user
+
+
+def encode_item(item: "VaultItem") -> bytes:
+    """
+    Encode a vault item
+
+    Arguments:
+        item -- item to encode
+
+    Returns:
+        item record
+    """
+    return pack_fields(
+        field.encode("utf-8") for field in (item.name, item.login, item.password)
+    )
+
+
+def decode_item(buffer: Buffer, offset: int) -> "VaultItem":
+    """
+    Decode a vault item
+
+    Arguments:
+        buffer -- file content
+        offset -- offset of record
+
+    Returns:
+        VaultItem
+    """
+    from model.data import VaultItem
+
+    name, login, password = unpack_fields(buffer, offset)[:3]
+    return VaultItem(
+        name.decode("utf-8"), login.decode("utf-8"), password.decode("utf-8")
+    )
+
+
+def encode_vault(vault: "Vault") -> bytes:
+    """
+    Encode a vault. Its lock is only held to list its items, which are
+    encoded outside of it.
+
+    Arguments:
+        vault -- vault to encode
+
+    Returns:
+        vault record
+    """
+    with vault.lock:
+        elements = [vault.elements[name] for name in vault.list_elements()]
+    items = [encode_item(item) for item in elements]
+    table_size = U32.size * (1 + len(items))
+    offsets = []
+    pos = table_size
+    for item in items:
+        offsets.append(pos)
+        pos += len(item)
+    payload = b"".join(
+        [U32.pack(len(items))] + [U32.pack(off) for off in offsets] + items
+    )
+    return U32.pack(len(payload)) + payload
+
+
+def item_offsets(buffer: Buffer, offset: int) -> list[int]:
+    """
+    Absolute offsets of the items of a vault record
+
+    Arguments:
+        buffer -- file content
+        offset -- offset of vault record
+
+    Returns:
+        item record offsets, sorted by item name
+    """
+    start = offset + U32.size
+    (count,) = U32.unpack_from(buffer, start)
+    return [
+        start + U32.unpack_from(buffer, start + U32.size * (i + 1))[0]
+        for i in range(count)
+    ]
+
+
+def decode_vault(buffer: Buffer, offset: int) -> "Vault":
+    """
+    Decode a vault
+
+    Arguments:
+        buffer -- file content
+        offset -- offset of record
+
+    Returns:
+        Vault
+    """
+    from model.data import Vault
+
+    vault = Vault()
+    vault.elements = {
+        item.name: item
+        for item in (decode_item(buffer, off) for off in item_offsets(buffer, offset))
+    }
+    return vault
+
+
+class BinaryStore:
+    """
+    Single file store in binary format. The file is memory mapped: users are
+    decoded at load, a vault or an item only when it is read. Reads wait while
+    a save replaces the file.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Constructor. Maps the file if it exists.
+
+        Arguments:
+            path -- file path
+
+        Raises:
+            ValueError: if file is not in a supported binary format
+        """
+        self.path = path
+        self._lock = RLock()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._version = VERSION
+        self._vaults: dict[str, int] = {}
+        self._stamps: dict[str, int] = {}
+        self._open()
+
+    def _open(self) -> None:
+        """
+        Map the file and check its header
+        """
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version not in (1, VERSION):
+            self.close()
+            raise ValueError(f"{self.path}: unsupported format")
+        self._version = version
+
+    def close(self) -> None:
+        """
+        Unmap and close the file
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _index(self) -> list[tuple[int, int, int]]:
+        """
+        Read the offset index
+
+        Returns:
+            (user offset, vault offset, vault stamp) of every user
+        """
+        if self._map is None:
+            return []
+        index_offset = HEADER.unpack_from(self._map, 0)[3]
+        (count,) = U32.unpack_from(self._map, index_offset)
+        start = index_offset + U32.size
+        if self._version == 1:
+            return [
+                (
+                    *INDEX_ENTRY_V1.unpack_from(
+                        self._map, start + INDEX_ENTRY_V1.size * i
+                    ),
+                    0,
+                )
+                for i in range(count)
+            ]
+        return [
+            INDEX_ENTRY.unpack_from(self._map, start + INDEX_ENTRY.size * i)
+            for i in range(count)
+        ]
+
+    def load_users(self) -> list["User"]:
+        """
+        Read user directory
+
+        Returns:
+            All users, without their vaults
+        """
+        users = []
+        self._vaults = {}
+        self._stamps = {}
+        for user_offset, vault_offset, stamp in self._index():
+            user = decode_user(self._map, user_offset)
+            self._vaults[user.login] = vault_offset
+            self._stamps[user.login] = stamp
+            users.append(user)
+        return users
+
+    def vault_stamp(self, login: str) -> int:
+        """
+        Get the stamp of a vault record
+
+        Arguments:
+            login -- owner of vault
+
+        Returns:
+            stamp, 0 if unknown
+        """
+        return self._stamps.get(login, 0)
+
+    def load_vault(self, login: str) -> "Vault":
+        """
+        Read one vault
+
+        Arguments:
+            login -- owner of vault
+
+        Raises:
+            KeyError: if user has no vault in file
+
+        Returns:
+            Vault of user
+        """
+        with self._lock:
+            if login not in self._vaults:
+                raise KeyError(f"{login} not found")
+            offset = self._vaults[login]
+            if stats.ENABLED:
+                stats.add_bytes("read", record_end(self._map, offset) - offset)
+            return decode_vault(self._map, offset)
+
+    def read_item(self, login: str, name: str) -> "VaultItem":
+        """
+        Read one item by bisection, without decoding the rest of its vault
+
+        Arguments:
+            login -- owner of vault
+            name -- name of item
+
+        Raises:
+            KeyError: if item does’nt exists
+
+        Returns:
+            VaultItem
+        """
+        with self._lock:
+            if login not in self._vaults:
+                raise KeyError(f"{login} not found")
+            buffer = self._map
+            offsets = item_offsets(buffer, self._vaults[login])
+            key = name.encode("utf-8")
+            low, high = 0, len(offsets)
+            while low < high:
+                middle = (low + high) // 2
+                if unpack_fields(buffer, offsets[middle])[0] < key:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low < len(offsets) and unpack_fields(buffer, offsets[low])[0] == key:
+                return decode_item(buffer, offsets[low])
+            raise KeyError(f"{name} not found")
+
+    def save(
+        self,
+        users: Iterable["User"],
+        vaults: dict[str, "Vault"],
+        removed: Iterable[str] = (),
+    ) -> None:
+        """
+        Write a new file and map it. Vaults not given are copied as raw bytes
+        from the current file, without being decoded.
+
+        Arguments:
+            users -- every user
+            vaults -- vaults to write, by login
+
+        Keyword Arguments:
+            removed -- ignored, removed users are simply not written (default: {()})
+        """
+        with self._lock:
+            self._save(list(users), vaults)
+
+    def _save(self, users: list["User"], vaults: dict[str, "Vault"]) -> None:
+        """
+        Write a new file and map it
+
+        Arguments:
+            users -- every user
+            vaults -- vaults to write, by login
+        """
+        tmp_name = self.path + ".tmp"
+        index = []
+        with open(tmp_name, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+            for user in users:
+                user_offset = file.tell()
+                file.write(encode_user(user))
+                vault_offset = file.tell()
+                stamp = 0 if user.login in vaults else self._stamps.get(user.login, 0)
+                if user.login in vaults:
+                    file.write(encode_vault(vaults[user.login]))
+                else:
+                    start = self._vaults[user.login]
+                    file.write(self._map[start : record_end(self._map, start)])
+                if not stamp:
+                    stamp = int.from_bytes(os.urandom(8), "little") or 1
+                index.append((user_offset, vault_offset, stamp))
+            index_offset = file.tell()
+            file.write(U32.pack(len(index)))
+            for entry in index:
+                file.write(INDEX_ENTRY.pack(*entry))
+            file.seek(0)
+            file.write(HEADER.pack(MAGIC, VERSION, 0, index_offset))
+            file.flush()
+            os.fsync(file.fileno())
+        if stats.ENABLED:
+            stats.add_bytes("written", os.path.getsize(tmp_name))
+        self.close()
+        os.replace(tmp_name, self.path)
+        self._open()
+        self._vaults = {}
+        self._stamps = {}
+        for user, (_, vault_offset, stamp) in zip(users, index):
+            self._vaults[user.login] = vault_offset
+            self._stamps[user.login] = stamp
+
+
+def convert(source: str, destination: str) -> None:
+    """
+    Convert a pickle data file to binary format
+
+    Arguments:
+        source -- pickle file path
+        destination -- binary file path
+    """
+    from model.data import UserStorage
+
+    storage = UserStorage()
+    storage.load(source)
+    vaults = {user.login: storage.get_vault(user) for user in storage.users}
+    BinaryStore(destination).save(list(storage.users), vaults)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m model.binfmt <data.dat> <data.bin>")
+    convert(sys.argv[1], sys.argv[2])
@@ -0,0 +1,303 @@
+"""
+Offline check of passwords against a breach corpus
+
+The corpus is a text file of SHA-1 hashes, in hexadecimal and sorted, one per
+line, optionally followed by ":" and the number of breaches, as published by
+Have I Been Pwned. It can hold hundreds of millions of lines: it is memory
+mapped, never read whole, and searched by bisection on byte offsets.
+
+A Bloom filter of the corpus, built once by build_filter, is memory mapped too:
+a password it rejects is not in the corpus, without touching the corpus. Only
+the few passwords it accepts, breached ones and about FALSE_POSITIVE_RATE of
+the others, are searched for in the corpus.
+
+Filter file: MAGIC, the number of bits m and of hash functions k as
+little-endian u64 and u32, then the m bits. The k bit positions of a hash are
+h1 + i * h2 mod m, h1 and h2 being read from the hash itself: SHA-1 is
+uniform enough to need no other hashing.
+"""
+from hashlib import sha1
+import math
+import mmap
+import os
+import struct
+from typing import IO, Iterable, Optional
+
+MAGIC = b"PMBLOOM1"
+HEADER = struct.Struct("<8sQI")
+FALSE_POSITIVE_RATE = 0.001
+HASH_SIZE = 40
+# below this many bytes, the bisection gives way to a scan of the lines
+SCAN_SIZE = 4096
+READ_SIZE = 1 << 20
+
+
+def password_hash(password: str) -> bytes:
+    """
+    Hash a password as the corpus does
+
+    Arguments:
+        password -- clear password
+
+    Returns:
+        SHA-1 digest
+    """
+    return sha1(password.encode("utf-8")).digest()
+
+
+def _positions(digest: bytes, bits: int, hashes: int) -> Iterable[int]:
+    """
+    Bit positions of a hash in a filter
+
+    Arguments:
+        digest -- SHA-1 digest
+        bits -- size of filter, in bits
+        hashes -- number of hash functions
+
+    Returns:
+        positions
+    """
+    first = int.from_bytes(digest[:8], "little")
+    step = int.from_bytes(digest[8:16], "little") | 1
+    return ((first + i * step) % bits for i in range(hashes))
+
+
+def filter_size(count: int, rate: float = FALSE_POSITIVE_RATE) -> tuple[int, int]:
+    """
+    Size a Bloom filter
+
+    Arguments:
+        count -- number of hashes it holds
+
+    Keyword Arguments:
+        rate -- false positive rate (default: {FALSE_POSITIVE_RATE})
+
+    Returns:
+        number of bits, rounded up to a byte, and of hash functions
+    """
+    bits = max(8, math.ceil(-count * math.log(rate) / math.log(2) ** 2))
+    bits = -(-bits // 8) * 8
+    hashes = max(1, round(bits / max(count, 1) * math.log(2)))
+    return bits, hashes
+
+
+def _lines(file: IO[bytes]) -> Iterable[bytes]:
+    """
+    Read the hashes of a corpus, skipping blank lines
+
+    Arguments:
+        file -- corpus, open in binary mode
+
+    Returns:
+        Iterator of hexadecimal hashes
+    """
+    for line in file:
+        if len(line) >= HASH_SIZE:
+            yield line[:HASH_SIZE]
+
+
+def build_filter(
+    corpus: str, filename: str, rate: float = FALSE_POSITIVE_RATE
+) -> tuple[int, int]:
+    """
+    Build the Bloom filter of a corpus. Reads the corpus twice: once to count
+    its lines, once to fill the filter. The filter is written atomically.
+
+    Arguments:
+        corpus -- corpus file path
+        filename -- filter file path
+
+    Keyword Arguments:
+        rate -- false positive rate (default: {FALSE_POSITIVE_RATE})
+
+    Returns:
+        number of hashes and size of filter, in bytes
+    """
+    count = 0
+    with open(corpus, "rb") as file:
+        while chunk := file.read(READ_SIZE):
+            count += chunk.count(b"\n")
+    bits, hashes = filter_size(count + 1, rate)
+    array = bytearray(bits // 8)
+    count = 0
+    with open(corpus, "rb") as file:
+        for line in _lines(file):
+            for position in _positions(bytes.fromhex(line.decode()), bits, hashes):
+                array[position >> 3] |= 1 << (position & 7)
+            count += 1
+    tmp_name = filename + ".tmp"
+    with open(tmp_name, "wb") as file:
+        file.write(HEADER.pack(MAGIC, bits, hashes))
+        file.write(array)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_name, filename)
+    return count, len(array)
+
+
+class BloomFilter:
+    """
+    Memory mapped Bloom filter, built by build_filter
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        Constructor
+
+        Arguments:
+            filename -- filter file path
+
+        Raises:
+            ValueError: if file is not a filter
+        """
+        with open(filename, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            self._map.close()
+            raise ValueError(f"{filename} is not a Bloom filter")
+        magic, self.bits, self.hashes = HEADER.unpack_from(self._map)
+        if magic != MAGIC or len(self._map) < HEADER.size + self.bits // 8:
+            self._map.close()
+            raise ValueError(f"{filename} is not a Bloom filter")
+
+    def __contains__(self, digest: bytes) -> bool:
+        """
+        Tell if a hash may be in the corpus
+
+        Arguments:
+            digest -- SHA-1 digest
+
+        Returns:
+            False if surely not, True if it may be
+        """
+        bitmap = self._map
+        for position in _positions(digest, self.bits, self.hashes):
+            if not bitmap[HEADER.size + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def close(self) -> None:
+        """
+        Unmap filter
+        """
+        self._map.close()
+
+
+class BreachCorpus:
+    """
+    Memory mapped sorted corpus of breached password hashes, with its
+    optional Bloom filter
+    """
+
+    def __init__(self, filename: str, filter_name: Optional[str] = None) -> None:
+        """
+        Constructor
+
+        Arguments:
+            filename -- corpus file path
+
+        Keyword Arguments:
+            filter_name -- Bloom filter file path. If None, filename + ".bloom"
+                is used when it exists. (default: {None})
+
+        Raises:
+            OSError: if a file cannot be read
+            ValueError: if the filter file is not a filter
+        """
+        if filter_name is None and os.path.exists(filename + ".bloom"):
+            filter_name = filename + ".bloom"
+        self.filter = BloomFilter(filter_name) if filter_name else None
+        self.lookups = 0
+        with open(filename, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            self._map = (
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+            )
+        # hexadecimal hashes are compared as bytes: use the case of the corpus
+        self._lower = self._map is not None and self._map[:HASH_SIZE].islower()
+
+    def __enter__(self) -> "BreachCorpus":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def breaches(self, password: str) -> int:
+        """
+        Tell how many times a password was breached
+
+        Arguments:
+            password -- clear password
+
+        Returns:
+            number of breaches, 1 if the corpus does not count them, 0 if the
+            password is not in the corpus
+        """
+        digest = password_hash(password)
+        if self.filter is not None and digest not in self.filter:
+            return 0
+        return self._search(digest.hex() if self._lower else digest.hex().upper())
+
+    def _search(self, target_hex: str) -> int:
+        """
+        Bisect the corpus for a hash
+
+        Arguments:
+            target_hex -- hexadecimal hash, in the case of the corpus
+
+        Returns:
+            number of breaches, 0 if missing
+        """
+        self.lookups += 1
+        corpus = self._map
+        if corpus is None:
+            return 0
+        target = target_hex.encode("ascii")
+        # lines before low are lower than target, the line at high is not
+        low, high = 0, len(corpus)
+        while high - low > SCAN_SIZE:
+            start = corpus.find(b"\n", (low + high) // 2, high) + 1
+            if not low < start < high:
+                break
+            if corpus[start : start + HASH_SIZE] < target:
+                low = start
+            else:
+                high = start
+        position = low
+        while position < len(corpus):
+            end = corpus.find(b"\n", position)
+            if end < 0:
+                end = len(corpus)
+            key = corpus[position : position + HASH_SIZE]
+            if key >= target:
+                if key != target:
+                    return 0
+                _, _, count = corpus[position:end].partition(b":")
+                return int(count) if count.strip() else 1
+            position = end + 1
+        return 0
+
+    def check(self, passwords: Iterable[str]) -> dict[str, int]:
+        """
+        Check many passwords, each one once
+
+        Arguments:
+            passwords -- clear passwords
+
+        Returns:
+            number of breaches of each breached password
+        """
+        found = {}
+        for password in set(passwords):
+            if count := self.breaches(password):
+                found[password] = count
+        return found
+
+    def close(self) -> None:
+        """
+        Unmap corpus and filter
+        """
+        if self._map is not None:
+            self._map.close()
+        if self.filter is not None:
+            self.filter.close()
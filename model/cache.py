@@ -0,0 +1,207 @@
+"""
+Short-lived cache of successful password checks
+"""
+from collections import OrderedDict
+from hashlib import sha256, sha512
+import hmac
+import os
+from threading import Lock
+import time
+from typing import Optional
+
+DEFAULT_TTL = 300.0
+DEFAULT_SIZE = 1024
+
+
+class VerificationCache:
+    """
+    Remembers successful logins for a while, so a costly key derivation is not
+    run again for each of them.
+
+    Entries are keyed by an HMAC of login and password under a secret drawn at
+    start, so clear passwords are never kept. An entry also records the hash it
+    was checked against: a changed password no longer matches it.
+
+    An entry may also keep a key derived from the password, such as the key of
+    the user's items, so it is not derived again either. It is kept xored with
+    an other HMAC of login and password: only that password unseals it.
+
+    Thread safe.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, size: int = DEFAULT_SIZE) -> None:
+        """
+        Constructor
+
+        Keyword Arguments:
+            ttl -- lifetime of an entry, in seconds (default: {DEFAULT_TTL})
+            size -- maximum number of entries, least recently used are evicted
+                (default: {DEFAULT_SIZE})
+        """
+        self.ttl = ttl
+        self.size = size
+        self._secret = os.urandom(32)
+        self._entries: OrderedDict[bytes, tuple[float, str, str, Optional[bytes]]] = (
+            OrderedDict()
+        )
+        self._by_login: dict[str, set[bytes]] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _key(self, login: str, password: str) -> bytes:
+        """
+        Compute entry key
+
+        Arguments:
+            login -- user’s name
+            password -- clear password
+
+        Returns:
+            HMAC of login and password
+        """
+        message = login.encode("utf-8") + b"\0" + password.encode("utf-8")
+        return hmac.new(self._secret, message, sha256).digest()
+
+    def _pad(self, login: str, password: str) -> bytes:
+        """
+        Compute the pad sealing a derived key
+
+        Arguments:
+            login -- user’s name
+            password -- clear password
+
+        Returns:
+            HMAC of login and password, distinct from the entry key
+        """
+        message = b"key\0" + login.encode("utf-8") + b"\0" + password.encode("utf-8")
+        return hmac.new(self._secret, message, sha512).digest()
+
+    def _seal(self, login: str, password: str, key: bytes) -> bytes:
+        """
+        Seal or unseal a derived key, of at most 64 bytes
+
+        Arguments:
+            login -- user’s name
+            password -- clear password
+            key -- key, or sealed key
+
+        Returns:
+            sealed key, or key
+        """
+        pad = self._pad(login, password)
+        return bytes(a ^ b for a, b in zip(key, pad))
+
+    def check(self, login: str, password: str, encoded: str) -> bool:
+        """
+        Tell if this password was recently checked against this hash
+
+        Arguments:
+            login -- user’s name
+            password -- clear password
+            encoded -- current password hash of user
+
+        Returns:
+            True on a live entry
+        """
+        key = self._key(login, password)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            expiry, _, checked, _ = entry
+            if expiry < time.monotonic() or not hmac.compare_digest(checked, encoded):
+                self._discard(key)
+                return False
+            self._entries.move_to_end(key)
+            return True
+
+    def add(self, login: str, password: str, encoded: str) -> None:
+        """
+        Remember a successful check
+
+        Arguments:
+            login -- user’s name
+            password -- clear password
+            encoded -- password hash of user
+        """
+        key = self._key(login, password)
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (time.monotonic() + self.ttl, login, encoded, None)
+            self._by_login.setdefault(login, set()).add(key)
+            while len(self._entries) > self.size:
+                self._discard(next(iter(self._entries)))
+
+    def derived_key(self, login: str, password: str, encoded: str) -> Optional[bytes]:
+        """
+        Get the key kept with a live entry
+
+        Arguments:
+            login -- user’s name
+            password -- clear password
+            encoded -- current password hash of user
+
+        Returns:
+            the key, None if there is no live entry or it keeps no key
+        """
+        if not self.check(login, password, encoded):
+            return None
+        with self._lock:
+            entry = self._entries.get(self._key(login, password))
+        if entry is None or entry[3] is None:
+            return None
+        return self._seal(login, password, entry[3])
+
+    def keep_key(self, login: str, password: str, encoded: str, key: bytes) -> None:
+        """
+        Keep a key derived from the password with its live entry. Without
+        one, that is if the password was not checked, nothing is kept.
+
+        Arguments:
+            login -- user’s name
+            password -- clear password
+            encoded -- current password hash of user
+            key -- derived key, of at most 64 bytes
+        """
+        if not self.check(login, password, encoded):
+            return
+        entry_key = self._key(login, password)
+        sealed = self._seal(login, password, key)
+        with self._lock:
+            if (entry := self._entries.get(entry_key)) is not None:
+                self._entries[entry_key] = (*entry[:3], sealed)
+
+    def _discard(self, key: bytes) -> None:
+        """
+        Drop an entry. Called with the lock held.
+
+        Arguments:
+            key -- entry key
+        """
+        login = self._entries.pop(key)[1]
+        keys = self._by_login[login]
+        keys.discard(key)
+        if not keys:
+            del self._by_login[login]
+
+    def invalidate(self, login: str) -> None:
+        """
+        Drop every entry of a user
+
+        Arguments:
+            login -- user’s name
+        """
+        with self._lock:
+            for key in self._by_login.pop(login, ()):
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """
+        Drop every entry
+        """
+        with self._lock:
+            self._entries.clear()
+            self._by_login.clear()
@@ -0,0 +1,107 @@
+"""
+Optional compression of pickled snapshots
+
+A compressed file starts with "PMZ" and a codec byte, then the compressed
+pickle. Files without this header are plain pickles, so reading detects both.
+Pickling streams through the compressor: the whole uncompressed pickle is never
+held in memory.
+"""
+import pickle
+from typing import IO, Any, Optional
+
+MAGIC = b"PMZ"
+# zlib is written as a gzip stream: same deflate, with a file API
+CODECS = {"zlib": 1, "lzma": 2, "bz2": 3}
+CODEC_NAMES = {codec_id: codec for codec, codec_id in CODECS.items()}
+ZLIB_LEVEL = 6
+
+
+def _stream(file: IO[bytes], codec: str, mode: str) -> IO[bytes]:
+    """
+    Wrap a file in a compressing or decompressing stream. Closing the stream
+    leaves the file open. Codec modules are imported on first use.
+
+    Arguments:
+        file -- underlying binary file
+        codec -- one of CODECS
+        mode -- "rb" or "wb"
+
+    Returns:
+        stream
+    """
+    if codec == "zlib":
+        import gzip
+
+        return gzip.GzipFile(fileobj=file, mode=mode, compresslevel=ZLIB_LEVEL, mtime=0)
+    if codec == "lzma":
+        import lzma
+
+        return lzma.LZMAFile(file, mode)
+    import bz2
+
+    return bz2.BZ2File(file, mode)
+
+
+def dump(obj: Any, file: IO[bytes], codec: Optional[str] = None) -> None:
+    """
+    Pickle an object to a file, compressed
+
+    Arguments:
+        obj -- object to pickle
+        file -- binary file, open for writing
+
+    Keyword Arguments:
+        codec -- one of CODECS, None to write a plain pickle (default: {None})
+
+    Raises:
+        ValueError: if codec is unknown
+    """
+    if codec is None:
+        pickle.dump(obj, file)
+        return
+    if codec not in CODECS:
+        raise ValueError(f"unknown codec {codec}")
+    file.write(MAGIC + bytes([CODECS[codec]]))
+    with _stream(file, codec, "wb") as stream:
+        pickle.dump(obj, stream)
+
+
+def load(file: IO[bytes]) -> Any:
+    """
+    Unpickle an object from a file, compressed or not
+
+    Arguments:
+        file -- binary file, open for reading
+
+    Raises:
+        ValueError: if file uses an unknown codec
+
+    Returns:
+        unpickled object
+    """
+    start = file.tell()
+    header = file.read(len(MAGIC) + 1)
+    if header[: len(MAGIC)] != MAGIC:
+        file.seek(start)
+        return pickle.load(file)
+    if (codec := CODEC_NAMES.get(header[-1])) is None:
+        raise ValueError(f"unknown codec {header[-1]}")
+    with _stream(file, codec, "rb") as stream:
+        return pickle.load(stream)
+
+
+def detect(filename: str) -> Optional[str]:
+    """
+    Tell which codec compressed a file
+
+    Arguments:
+        filename -- file path
+
+    Returns:
+        codec, None for a plain file
+    """
+    with open(filename, "rb") as file:
+        header = file.read(len(MAGIC) + 1)
+    if len(header) <= len(MAGIC) or header[: len(MAGIC)] != MAGIC:
+        return None
+    return CODEC_NAMES.get(header[-1])
@@ -0,0 +1,247 @@
+"""
+Encryption of item passwords at rest
+
+Only the password of an item is encrypted: names and logins stay clear, so
+listing and searching never decrypt anything. The key is derived once, at
+login, from the user's password; encrypting or decrypting an item then costs
+a few BLAKE2 calls.
+
+An encrypted password is stored as "$enc$v1$" followed by the base64 of
+nonce, ciphertext and tag. The ciphertext is the password xored with a BLAKE2b
+keystream, the tag a BLAKE2b MAC of nonce, item name and ciphertext
+(encrypt-then-MAC), so a password moved to an other item does not decrypt.
+A password without the prefix was stored before encryption, and is read as is.
+"""
+from base64 import b64decode, b64encode
+from hashlib import blake2b, scrypt, sha256
+import hmac
+import os
+from typing import TYPE_CHECKING, Optional
+
+from model import kdf
+
+if TYPE_CHECKING:
+    from model.data import VaultItem
+
+PREFIX = "$enc$v1$"
+KEY_COST = kdf.DEFAULT_COST[kdf.SCRYPT]
+NONCE_SIZE = 16
+TAG_SIZE = 16
+BLOCK_SIZE = blake2b().digest_size
+
+
+def key_salt(login: str) -> bytes:
+    """
+    Salt of the key of a user. Logins are unique, and the salt differs from
+    the one of the password hash, so the stored hash tells nothing of the key.
+
+    Arguments:
+        login -- user’s name
+
+    Returns:
+        salt
+    """
+    return sha256(b"passman vault key\0" + login.encode("utf-8")).digest()
+
+
+def xor(data: bytes, stream: bytes) -> bytes:
+    """
+    Xor data with a keystream of the same size
+
+    Arguments:
+        data -- bytes to xor
+        stream -- keystream
+
+    Returns:
+        xored bytes
+    """
+    size = len(data)
+    value = int.from_bytes(data, "little") ^ int.from_bytes(stream, "little")
+    return value.to_bytes(size, "little")
+
+
+def derive_key(login: str, password: str, cost: Optional[int] = None) -> bytes:
+    """
+    Derive the key of a user's items. Costly: done once per session, or kept
+    in the verification cache.
+
+    Arguments:
+        login -- user’s name
+        password -- user’s clear password
+
+    Keyword Arguments:
+        cost -- scrypt N, KEY_COST if None (default: {None})
+
+    Returns:
+        64 bytes key
+    """
+    cost = cost or KEY_COST
+    return scrypt(
+        password.encode("utf-8"),
+        salt=key_salt(login),
+        n=cost,
+        r=kdf.SCRYPT_R,
+        p=kdf.SCRYPT_P,
+        maxmem=256 * kdf.SCRYPT_R * cost,
+        dklen=64,
+    )
+
+
+def is_encrypted(password: str) -> bool:
+    """
+    Tell if a stored password is encrypted
+
+    Arguments:
+        password -- stored password
+
+    Returns:
+        True if encrypted
+    """
+    return password.startswith(PREFIX)
+
+
+class ItemCipher:
+    """
+    Encrypts and decrypts the passwords of a user's items
+    """
+
+    __slots__ = ("_enc_key", "_mac_key")
+
+    def __init__(self, key: bytes) -> None:
+        """
+        Constructor
+
+        Arguments:
+            key -- 64 bytes: encryption key, then MAC key
+        """
+        self._enc_key = key[:32]
+        self._mac_key = key[32:]
+
+    @classmethod
+    def from_password(
+        cls, login: str, password: str, cost: Optional[int] = None
+    ) -> "ItemCipher":
+        """
+        Derive the key of a user, see derive_key
+
+        Arguments:
+            login -- user’s name
+            password -- user’s clear password
+
+        Keyword Arguments:
+            cost -- scrypt N, KEY_COST if None (default: {None})
+
+        Returns:
+            cipher of user
+        """
+        return cls(derive_key(login, password, cost))
+
+    def _keystream(self, nonce: bytes, size: int) -> bytes:
+        """
+        Generate keystream
+
+        Arguments:
+            nonce -- random nonce
+            size -- number of bytes
+
+        Returns:
+            keystream
+        """
+        blocks = []
+        for counter in range(-(-size // BLOCK_SIZE)):
+            block = blake2b(
+                counter.to_bytes(8, "little"), key=self._enc_key, salt=nonce
+            )
+            blocks.append(block.digest())
+        return b"".join(blocks)[:size]
+
+    def _tag(self, nonce: bytes, name: str, ciphertext: bytes) -> bytes:
+        """
+        Compute MAC
+
+        Arguments:
+            nonce -- random nonce
+            name -- name of item
+            ciphertext -- encrypted password
+
+        Returns:
+            tag
+        """
+        mac = blake2b(key=self._mac_key, digest_size=TAG_SIZE)
+        encoded_name = name.encode("utf-8")
+        mac.update(nonce)
+        mac.update(len(encoded_name).to_bytes(4, "little"))
+        mac.update(encoded_name)
+        mac.update(ciphertext)
+        return mac.digest()
+
+    def encrypt(self, name: str, password: str) -> str:
+        """
+        Encrypt the password of an item
+
+        Arguments:
+            name -- name of item
+            password -- clear password
+
+        Returns:
+            encrypted password
+        """
+        plain = password.encode("utf-8")
+        nonce = os.urandom(NONCE_SIZE)
+        ciphertext = xor(plain, self._keystream(nonce, len(plain)))
+        token = nonce + ciphertext + self._tag(nonce, name, ciphertext)
+        return PREFIX + b64encode(token).decode("ascii")
+
+    def decrypt(self, name: str, password: str) -> str:
+        """
+        Decrypt the password of an item
+
+        Arguments:
+            name -- name of item
+            password -- stored password, returned as is if not encrypted
+
+        Raises:
+            ValueError: if password was not encrypted by this key for this item,
+                or is corrupted
+
+        Returns:
+            clear password
+        """
+        if not is_encrypted(password):
+            return password
+        token = b64decode(password[len(PREFIX) :], validate=True)
+        if len(token) < NONCE_SIZE + TAG_SIZE:
+            raise ValueError("mot de passe chiffré tronqué")
+        nonce, ciphertext = token[:NONCE_SIZE], token[NONCE_SIZE:-TAG_SIZE]
+        if not hmac.compare_digest(
+            token[-TAG_SIZE:], self._tag(nonce, name, ciphertext)
+        ):
+            raise ValueError("mot de passe chiffré invalide")
+        stream = self._keystream(nonce, len(ciphertext))
+        return xor(ciphertext, stream).decode("utf-8")
+
+    def encrypt_item(self, item: "VaultItem") -> "VaultItem":
+        """
+        Encrypt the password of an item
+
+        Arguments:
+            item -- item with clear password
+
+        Returns:
+            new item, with encrypted password
+        """
+        password = self.encrypt(item.name, item.password)
+        return type(item)(item.name, item.login, password)
+
+    def decrypt_item(self, item: "VaultItem") -> "VaultItem":
+        """
+        Decrypt the password of an item
+
+        Arguments:
+            item -- stored item
+
+        Returns:
+            new item, with clear password
+        """
+        password = self.decrypt(item.name, item.password)
+        return type(item)(item.name, item.login, password)
@@ -1,10 +1,30 @@
 """
 Data classes
 """
-from hashlib import sha512
-import pickle
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+from threading import Event, Lock, RLock, Thread, local
 import os
-from typing import Optional
+import sys
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from model import compress, crypto, kdf, stats
+from model.binfmt import BinaryStore, is_binary
+from model.cache import VerificationCache
+from model.hamt import PersistentMap
+from model.journal import JOURNAL_THRESHOLD, Journal
+from model.rwlock import RWLock
+from model.shards import ShardStore, write_atomic
+from model.trigram import FUZZY_THRESHOLD, TrigramIndex
+
+# versions kept by a vault for undo and item history
+HISTORY_SIZE = 1000
+# a transaction adding or removing more names rebuilds the name index once,
+# instead of updating it one name at a time
+BULK_SIZE = 64
+_UNCHANGED = object()
 
 
 class DuplicateError(Exception):
@@ -16,35 +36,586 @@ class DuplicateError(Exception):
         super().__init__(message)
 
 
+class ObservedDict(dict):
+    """
+    Dictionary notifying its owner of every insertion and removal.
+
+    Used to keep secondary indexes up to date, whichever way the dictionary is
+    mutated.
+    """
+
+    # one per vault: no instance dictionary
+    __slots__ = ("on_add", "on_remove", "on_add_many", "on_remove_many")
+
+    def __init__(
+        self,
+        on_add: Callable[[Any, Any], None],
+        on_remove: Callable[[Any, Any], None],
+        data: Iterable[tuple[Any, Any]] = (),
+        on_add_many: Optional[Callable[[dict], None]] = None,
+        on_remove_many: Optional[Callable[[dict], None]] = None,
+    ) -> None:
+        """
+        Constructor
+
+        Arguments:
+            on_add -- called with (key, value) after a key is inserted
+            on_remove -- called with (key, value) after a key is removed
+
+        Keyword Arguments:
+            data -- initial (key, value) pairs (default: {()})
+            on_add_many -- called with a dictionary of new keys after update,
+                instead of on_add for each of them (default: {None})
+            on_remove_many -- called with a dictionary of removed keys after
+                remove_many, instead of on_remove for each of them
+                (default: {None})
+        """
+        super().__init__()
+        self.on_add = on_add
+        self.on_remove = on_remove
+        self.on_add_many = on_add_many
+        self.on_remove_many = on_remove_many
+        self.update(data)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        if key in self:
+            # dict would keep the old key object: drop it so the new one is stored
+            del self[key]
+        super().__setitem__(key, value)
+        self.on_add(key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        value = super().__getitem__(key)
+        super().__delitem__(key)
+        self.on_remove(key, value)
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = super().__getitem__(key)
+        del self[key]
+        return value
+
+    def popitem(self) -> tuple[Any, Any]:
+        key, value = super().popitem()
+        self.on_remove(key, value)
+        return key, value
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return super().__getitem__(key)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        if self.on_add_many is None:
+            for key, value in dict(*args, **kwargs).items():
+                self[key] = value
+            return
+        added = {}
+        for key, value in dict(*args, **kwargs).items():
+            if key in self:
+                self[key] = value
+            else:
+                added[key] = value
+        super().update(added)
+        self.on_add_many(added)
+
+    def remove_many(self, keys: Iterable[Any]) -> None:
+        """
+        Remove many keys, then notify owner once
+
+        Arguments:
+            keys -- existing keys
+
+        Raises:
+            KeyError: if a key is missing. Keys before it are removed.
+        """
+        if self.on_remove_many is None:
+            for key in keys:
+                del self[key]
+            return
+        removed = {}
+        try:
+            for key in keys:
+                removed[key] = dict.pop(self, key)
+        finally:
+            self.on_remove_many(removed)
+
+    def __ior__(self, other: Any) -> "ObservedDict":
+        self.update(other)
+        return self
+
+    def replace_value(self, key: Any, value: Any) -> None:
+        """
+        Replace the value of an existing key without notifying owner
+
+        Arguments:
+            key -- existing key
+            value -- new value
+        """
+        super().__setitem__(key, value)
+
+    def clear(self) -> None:
+        items = list(self.items())
+        super().clear()
+        for key, value in items:
+            self.on_remove(key, value)
+
+
+def restore_slots(obj: object, state: Any) -> None:
+    """
+    Pickle support for slotted classes. Accepts the state of the former
+    __dict__ based classes as well.
+
+    Arguments:
+        obj -- object to restore
+        state -- attributes dictionary, or (dict, slots dict) tuple
+    """
+    if isinstance(state, tuple):
+        state = {**(state[0] or {}), **state[1]}
+    for key, value in state.items():
+        setattr(obj, key, value)
+
+
 class VaultItem:
     """
-    Vault Item
+    Vault Item. Slotted: vaults may hold millions of them.
     """
 
+    __slots__ = ("name", "login", "password")
+
     def __init__(self, name: str, login: str, password: str) -> None:
         """
         Constructor
 
         Arguments:
             name -- name of element
-            login -- login to store
+            login -- login to store. Interned, since many items share a login.
             password -- password to store
         """
         self.name = name
-        self.login = login
+        self.login = sys.intern(login)
         self.password = password
 
+    __setstate__ = restore_slots
 
-class Vault:
+
+def _has_name(names: tuple[str, ...], name: str) -> bool:
+    """
+    Tell if a sorted tuple of names holds a name
+
+    Arguments:
+        names -- sorted names
+        name -- name to look for
+
+    Returns:
+        True if found
+    """
+    i = bisect_left(names, name)
+    return i < len(names) and names[i] == name
+
+
+class VaultHistory:
     """
-    Vault
+    Versions of a vault, from its first change: an undo log. Each version
+    maps the names changed so far to their new item, None once removed, in a
+    persistent map shared with the versions before it. The item a name had
+    before its first change is kept aside, and names added in bulk are only
+    recorded by name, in a sorted tuple searched by bisection: a name never
+    changed is read from the vault itself.
     """
 
+    __slots__ = (
+        "versions",
+        "base",
+        "additions",
+        "changes",
+        "pending",
+        "added",
+        "seq",
+        "depth",
+    )
+
     def __init__(self) -> None:
+        """
+        Constructor. Version 0 is the state before the first change.
+        """
+        self.versions: deque[
+            tuple[int, PersistentMap, frozenset[str], tuple[str, ...]]
+        ] = deque(maxlen=HISTORY_SIZE)
+        # name -> (version of its first change, item before it)
+        self.base: dict[str, tuple[int, Optional[VaultItem]]] = {}
+        self.additions: list[tuple[int, tuple[str, ...]]] = []
+        self.changes = PersistentMap()
+        self.pending: set[str] = set()
+        # names added in bulk since the last version, never changed before
+        self.added: list[str] = []
+        self.seq = 0
+        # number of nested blocks grouping changes into the next version
+        self.depth = 0
+        self.versions.append((0, self.changes, frozenset(), ()))
+
+    def track(
+        self, name: str, old_item: Optional[VaultItem], item: Optional[VaultItem]
+    ) -> None:
+        """
+        Record a change in the next version
+
+        Arguments:
+            name -- changed name
+            old_item -- item before the change, None if added
+            item -- new item, None if removed
+        """
+        if name not in self.base:
+            self.base[name] = (self.seq + 1, old_item)
+        self.changes = self.changes.set(name, item)
+        self.pending.add(name)
+
+    def track_added(self, items: dict[str, VaultItem]) -> None:
+        """
+        Record items added in bulk in the next version. Only names changed
+        before are written in the map, the others are recorded by name.
+
+        Arguments:
+            items -- new items, by name
+        """
+        for name, item in items.items():
+            if name in self.base:
+                self.changes = self.changes.set(name, item)
+                self.pending.add(name)
+            else:
+                self.added.append(name)
+
+    def commit(self) -> None:
+        """
+        Make a version of the changes recorded since the last one, if any
+        """
+        if not self.pending and not self.added:
+            return
+        self.seq += 1
+        self.added.sort()
+        added = tuple(self.added)
+        self.versions.append((self.seq, self.changes, frozenset(self.pending), added))
+        if added:
+            self.additions.append((self.seq, added))
+        # additions older than every version kept no longer matter
+        oldest = self.versions[0][0]
+        if self.additions and self.additions[0][0] <= oldest:
+            self.additions = [entry for entry in self.additions if entry[0] > oldest]
+        self.pending, self.added = set(), []
+
+    def drop(self) -> None:
+        """
+        Forget the last version, once the vault is back to the one before
+        """
+        seq, _, names, _ = self.versions.pop()
+        self.seq, self.changes = self.versions[-1][:2]
+        for name in names:
+            if self.base[name][0] == seq:
+                del self.base[name]
+        if self.additions and self.additions[-1][0] == seq:
+            self.additions.pop()
+
+    def get(
+        self,
+        version: tuple[int, PersistentMap, frozenset[str], tuple[str, ...]],
+        name: str,
+        current: dict[str, VaultItem],
+    ) -> Optional[VaultItem]:
+        """
+        Get an item as it was in a version
+
+        Arguments:
+            version -- kept version
+            name -- name of item
+            current -- items of the vault
+
+        Returns:
+            the item, None if it did not exist
+        """
+        seq, changes, _, _ = version
+        item = changes.get(name, _UNCHANGED)
+        if item is not _UNCHANGED:
+            return item
+        # not changed yet: as before its first change, or before its addition
+        first = self.base.get(name)
+        for added_seq, names in self.additions:
+            if added_seq > seq and _has_name(names, name):
+                if first is None or first[0] >= added_seq:
+                    return None
+                break
+        if first is not None:
+            return first[1]
+        return current.get(name)
+
+
+class VaultVersion:
+    """
+    Read-only past state of a vault
+    """
+
+    __slots__ = ("_history", "_version", "_current")
+
+    def __init__(
+        self,
+        history: Optional[VaultHistory],
+        version: Optional[tuple],
+        current: dict[str, VaultItem],
+    ) -> None:
         """
         Constructor
+
+        Arguments:
+            history -- history of the vault, None if it has no change yet
+            version -- kept version, None if it has no change yet
+            current -- items of the vault
         """
-        self.elements: dict[str, VaultItem] = {}
+        self._history = history
+        self._version = version
+        self._current = current
+
+    def get(self, name: str) -> Optional[VaultItem]:
+        """
+        Get an item as it was in this version
+
+        Arguments:
+            name -- name of item
+
+        Returns:
+            the item, None if it did not exist
+        """
+        if self._history is None:
+            return self._current.get(name)
+        return self._history.get(self._version, name, self._current)
+
+    def names(self) -> list[str]:
+        """
+        List the names of the items of this version
+
+        Returns:
+            sorted names
+        """
+        names = set(self._current)
+        if self._history is not None:
+            names.update(self._history.base)
+        return sorted(name for name in names if self.get(name) is not None)
+
+
+class Vault:
+    """
+    Vault. Its methods may be called from several threads: each vault has its
+    own lock, so sessions working on different vaults never wait for each
+    other.
+    """
+
+    # set by the first change: a vault never changed carries no history, not
+    # even an instance attribute
+    _history: Optional[VaultHistory] = None
+    # set once every password is known to be encrypted, cleared as soon as a
+    # password in clear is stored
+    encrypted = False
+
+    def __init__(self) -> None:
+        """
+        Constructor. A new vault is dirty until saved.
+        """
+        self.lock = RLock()
+        self._names: list[str] = []
+        self._by_login: dict[str, set[str]] = {}
+        self._trigrams: Optional[TrigramIndex] = None
+        self.dirty = True
+        self.observer: Optional[Callable[[str, Optional[VaultItem]], None]] = None
+        self.elements = {}
+
+    @property
+    def elements(self) -> dict[str, VaultItem]:
+        """
+        Getter - Items of the vault, by name
+
+        Returns:
+            Items dictionary
+        """
+        return self._elements
+
+    @elements.setter
+    def elements(self, value: dict[str, VaultItem]) -> None:
+        """
+        Setter - Replace all items and rebuild the name index
+
+        Arguments:
+            value -- Items dictionary
+        """
+        with self.lock:
+            self._names = []
+            self._by_login = {}
+            self._trigrams = None
+            if self._history is not None:
+                self._history = None
+            if self.encrypted:
+                self.encrypted = False
+            self._elements = ObservedDict(
+                self._index,
+                self._unindex,
+                value.items(),
+                self._index_many,
+                self._unindex_many,
+            )
+
+    def _index(self, name: str, item: VaultItem) -> None:
+        """
+        Add item to the name and login indexes and notify observer
+
+        Arguments:
+            name -- inserted name
+            item -- inserted item
+        """
+        insort(self._names, name)
+        self._by_login.setdefault(item.login, set()).add(name)
+        self.dirty = True
+        if self.encrypted and not crypto.is_encrypted(item.password):
+            self.encrypted = False
+        if self._trigrams is not None:
+            self._trigrams.add(name)
+        if self._history is not None:
+            self._history.track(name, None, item)
+        if self.observer is not None:
+            self.observer(name, item)
+
+    def _index_many(self, items: dict[str, VaultItem]) -> None:
+        """
+        Add many items to the indexes at once, then notify observer. Sorting
+        keeps the already sorted names as one run and merges the new ones into
+        it, instead of inserting them one at a time.
+
+        Arguments:
+            items -- inserted items, by name
+        """
+        self._names.extend(items)
+        self._names.sort()
+        for name, item in items.items():
+            self._by_login.setdefault(item.login, set()).add(name)
+        self.dirty = True
+        if self.encrypted:
+            self.encrypted = all(
+                crypto.is_encrypted(item.password) for item in items.values()
+            )
+        if self._trigrams is not None:
+            for name in items:
+                self._trigrams.add(name)
+        if self._history is not None:
+            self._history.track_added(items)
+        if self.observer is not None:
+            for name, item in items.items():
+                self.observer(name, item)
+
+    def _unindex(self, name: str, item: VaultItem) -> None:
+        """
+        Remove item from the name and login indexes and notify observer
+
+        Arguments:
+            name -- removed name
+            item -- removed item
+        """
+        del self._names[bisect_left(self._names, name)]
+        names = self._by_login[item.login]
+        names.discard(name)
+        if not names:
+            del self._by_login[item.login]
+        self.dirty = True
+        if self._trigrams is not None:
+            self._trigrams.remove(name)
+        if self._history is not None:
+            self._history.track(name, item, None)
+        if self.observer is not None:
+            self.observer(name, None)
+
+    def _unindex_many(self, items: dict[str, VaultItem]) -> None:
+        """
+        Remove many items from the indexes at once, then notify observer. The
+        name index is rebuilt from the slices between removed names, instead
+        of shifting it once per name.
+
+        Arguments:
+            items -- removed items, by name
+        """
+        positions = sorted(bisect_left(self._names, name) for name in items)
+        kept: list[str] = []
+        start = 0
+        for position in positions:
+            kept += self._names[start:position]
+            start = position + 1
+        kept += self._names[start:]
+        self._names = kept
+        for name, item in items.items():
+            names = self._by_login[item.login]
+            names.discard(name)
+            if not names:
+                del self._by_login[item.login]
+        self.dirty = True
+        for name, item in items.items():
+            if self._trigrams is not None:
+                self._trigrams.remove(name)
+            if self._history is not None:
+                self._history.track(name, item, None)
+            if self.observer is not None:
+                self.observer(name, None)
+
+    @contextmanager
+    def _versioned(self) -> Iterator[None]:
+        """
+        Group the changes made in the block into one new version, starting the
+        history if the vault has none. Called with the lock held.
+        """
+        if self._history is None:
+            self._history = VaultHistory()
+        history = self._history
+        history.depth += 1
+        try:
+            yield
+        finally:
+            history.depth -= 1
+            # nested: the outer block makes the version
+            if not history.depth:
+                history.commit()
+
+    @contextmanager
+    def _unversioned(self) -> Iterator[None]:
+        """
+        Keep the changes made in the block out of the history: versions read
+        them as if they were always there. Called with the lock held.
+        """
+        history = self._history
+        if history is None:
+            yield
+            return
+        self._history = None
+        try:
+            yield
+        finally:
+            self._history = history
+
+    def __getstate__(self) -> dict[str, Any]:
+        """
+        Pickle support: only items are stored, indexes and observer are
+        rebuilt on load.
+
+        Returns:
+            Vault state
+        """
+        with self.lock:
+            return {"elements": dict(self.elements)}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """
+        Pickle support: restore items and rebuild indexes
+
+        Arguments:
+            state -- Vault state
+        """
+        self.__init__()
+        self.elements = state["elements"]
 
     def list_elements(self) -> list[str]:
         """
@@ -53,7 +624,47 @@ class Vault:
         Returns:
             Returns a sorted list of the names of all elements stored in the vault. description
         """
-        return sorted(self.elements.keys())
+        with self.lock:
+            return list(self._names)
+
+    def iter_names(self, after: Optional[str] = None) -> Iterator[str]:
+        """
+        Lazily iterates over the names of the elements, in sorted order. Each
+        step seeks after the previous name, so the vault may change meanwhile.
+
+        Keyword Arguments:
+            after -- start after this name, None to start at the first one
+                (default: {None})
+
+        Returns:
+            Iterator of names
+        """
+        while True:
+            with self.lock:
+                i = 0 if after is None else bisect_right(self._names, after)
+                if i == len(self._names):
+                    return
+                after = self._names[i]
+            yield after
+
+    def page(self, limit: int, after: Optional[str] = None) -> list[str]:
+        """
+        Returns a page of sorted names. Seeking after the last name of a page
+        gives the next one, even if elements were added or removed meanwhile.
+
+        Arguments:
+            limit -- maximum number of names
+
+        Keyword Arguments:
+            after -- last name of the previous page, None for the first page
+                (default: {None})
+
+        Returns:
+            Up to limit names
+        """
+        with self.lock:
+            start = 0 if after is None else bisect_right(self._names, after)
+            return self._names[start : start + limit]
 
     def get_element(self, element_name: str) -> VaultItem:
         """
@@ -68,8 +679,9 @@ class Vault:
         Returns:
             The VaultItem with the given name, if it exists in the vault.
         """
-        if element_name in self.elements:
-            return self.elements[element_name]
+        with self.lock:
+            if element_name in self.elements:
+                return self.elements[element_name]
 
         raise KeyError(f"{element_name} not found")
 
@@ -83,10 +695,46 @@ class Vault:
         Raises:
             DuplicateError: if item already exists
         """
-        if item.name not in self.elements:
-            self.elements[item.name] = item
-        else:
-            raise DuplicateError(f"{item} already exists")
+        with self.lock, self._versioned():
+            if item.name not in self.elements:
+                self.elements[item.name] = item
+                return
+        raise DuplicateError(f"{item} already exists")
+
+    def add_elements(
+        self, items: Iterable[VaultItem], skip_duplicates: bool = False
+    ) -> list[str]:
+        """
+        Adds a batch of VaultItems to the vault. Duplicates are checked for the
+        whole batch before anything is added.
+
+        Arguments:
+            items -- The VaultItems to add to the vault.
+
+        Keyword Arguments:
+            skip_duplicates -- add the other items instead of raising
+                (default: {False})
+
+        Raises:
+            DuplicateError: if some items already exist, or appear twice in the
+                batch, and skip_duplicates is False. Then no item is added.
+
+        Returns:
+            Names of the skipped duplicates
+        """
+        items = list(items)
+        with self.lock, self._versioned():
+            batch: dict[str, VaultItem] = {}
+            duplicates = []
+            for item in items:
+                if item.name in self.elements or item.name in batch:
+                    duplicates.append(item.name)
+                else:
+                    batch[item.name] = item
+            if duplicates and not skip_duplicates:
+                raise DuplicateError(f"{', '.join(duplicates)} already exist")
+            self.elements.update(batch)
+        return duplicates
 
     def edit_element(self, old_item: VaultItem, new_item: VaultItem) -> None:
         """
@@ -97,10 +745,12 @@ class Vault:
             new_item -- The VaultItem to replace it with.
 
         Raises:
-            KeyError: if item are not found
+            KeyError: if old item is not found
+            DuplicateError: if new item is renamed to an existing name
         """
-        self.remove_element(old_item)
-        self.add_element(new_item)
+        transaction = self.transaction()
+        transaction.edit(old_item.name, new_item)
+        transaction.commit()
 
     def remove_element(self, item: VaultItem) -> None:
         """
@@ -108,11 +758,131 @@ class Vault:
 
         Arguments:
             item -- The VaultItem to remove from the vault.
+
+        Raises:
+            KeyError: if item is not found
         """
-        if item.name in self.elements:
-            del self.elements[item.name]
+        with self.lock, self._versioned():
+            if item.name in self.elements:
+                del self.elements[item.name]
+                return
         raise KeyError(f"{item} not found")
 
+    def transaction(self, versioned: bool = True) -> "VaultTransaction":
+        """
+        Start staging changes, to apply them all at once
+
+        Keyword Arguments:
+            versioned -- make a new version of the changes. Otherwise they
+                cannot be undone, as for changes that are not the user’s.
+                (default: {True})
+
+        Returns:
+            empty transaction
+        """
+        return VaultTransaction(self, versioned)
+
+    def _commit(self, operations: list[tuple], versioned: bool = True) -> None:
+        """
+        Check staged operations against the items, then apply them together.
+        Names changed twice are only written once, with their last value.
+
+        Arguments:
+            operations -- ("add", item), ("edit", name, item) or
+                ("remove", name) tuples, in staging order
+
+        Keyword Arguments:
+            versioned -- make a new version of the changes (default: {True})
+
+        Raises:
+            KeyError: if an edited or removed name is missing. Nothing is
+                applied.
+            DuplicateError: if an added or renamed item already exists.
+                Nothing is applied.
+        """
+        with self.lock:
+            state: dict[str, Optional[VaultItem]] = {}
+            missing: list[str] = []
+            duplicates: list[str] = []
+
+            def exists(name: str) -> bool:
+                if name in state:
+                    return state[name] is not None
+                return name in self.elements
+
+            for operation in operations:
+                match operation:
+                    case ("add", item):
+                        if exists(item.name):
+                            duplicates.append(item.name)
+                        else:
+                            state[item.name] = item
+                    case ("edit", name, item):
+                        if not exists(name):
+                            missing.append(name)
+                        elif item.name != name and exists(item.name):
+                            duplicates.append(item.name)
+                        else:
+                            state[name] = None
+                            state[item.name] = item
+                    case ("remove", name):
+                        if not exists(name):
+                            missing.append(name)
+                        else:
+                            state[name] = None
+            if missing:
+                raise KeyError(f"{', '.join(missing)} not found")
+            if duplicates:
+                raise DuplicateError(f"{', '.join(duplicates)} already exist")
+            removed, replaced, added = [], {}, {}
+            for name, item in state.items():
+                if (old_item := self.elements.get(name)) is item:
+                    continue
+                if item is None:
+                    removed.append(name)
+                elif old_item is None:
+                    added[name] = item
+                else:
+                    replaced[name] = item
+            with self._versioned() if versioned else self._unversioned():
+                if len(removed) > BULK_SIZE:
+                    self.elements.remove_many(removed)
+                else:
+                    for name in removed:
+                        del self.elements[name]
+                for name, item in replaced.items():
+                    self._replace(name, item)
+                if len(added) > BULK_SIZE:
+                    self.elements.update(added)
+                else:
+                    for name, item in added.items():
+                        self.elements[name] = item
+
+    def _replace(self, name: str, item: VaultItem) -> None:
+        """
+        Replace an item by one of the same name: the name index is left as is
+
+        Arguments:
+            name -- name of existing item
+            item -- new item
+        """
+        old_item = self._elements[name]
+        self._elements.replace_value(name, item)
+        if old_item.login != item.login:
+            names = self._by_login[old_item.login]
+            names.discard(name)
+            if not names:
+                del self._by_login[old_item.login]
+            self._by_login.setdefault(item.login, set()).add(name)
+        self.dirty = True
+        if self.encrypted and not crypto.is_encrypted(item.password):
+            self.encrypted = False
+        if self._history is not None:
+            self._history.track(name, old_item, item)
+        if self.observer is not None:
+            self.observer(name, item)
+
+    @stats.timed("vault.search_by_name")
     def search_by_name(self, search_string: str) -> list[VaultItem]:
         """
         Searches for VaultItems whose name starts with the given search string.
@@ -124,10 +894,234 @@ class Vault:
             A sorted list of VaultItems whose name starts with the given search string.
         """
         els = []
-        for element, item in self.elements.items():
-            if element.startswith(search_string):
-                els.append(item)
-        return sorted(els, key=lambda it: it.name)
+        with self.lock:
+            start = bisect_left(self._names, search_string)
+            for i in range(start, len(self._names)):
+                name = self._names[i]
+                if not name.startswith(search_string):
+                    break
+                els.append(self.elements[name])
+        return els
+
+    @stats.timed("vault.search_by_login")
+    def search_by_login(self, login: str) -> list[VaultItem]:
+        """
+        Searches for VaultItems using the given login.
+
+        Arguments:
+            login -- The login, or email, to look for.
+
+        Returns:
+            A list of VaultItems using this login, sorted by name.
+        """
+        with self.lock:
+            names = sorted(self._by_login.get(login, ()))
+            return [self.elements[name] for name in names]
+
+    def _trigram_index(self) -> TrigramIndex:
+        """
+        Get the trigram index, built on first use then kept up to date
+
+        Returns:
+            trigram index of names
+        """
+        if self._trigrams is None:
+            self._trigrams = TrigramIndex(self._names)
+        return self._trigrams
+
+    @stats.timed("vault.search_substring")
+    def search_substring(self, search_string: str) -> list[VaultItem]:
+        """
+        Searches for VaultItems whose name contains the given search string,
+        ignoring case.
+
+        Arguments:
+            search_string -- The string to search for in VaultItem names.
+
+        Returns:
+            A list of matching VaultItems, most similar names first.
+        """
+        with self.lock:
+            names = self._trigram_index().substring(search_string, self._names)
+            return [self.elements[name] for name in names]
+
+    @stats.timed("vault.search_fuzzy")
+    def search_fuzzy(
+        self, search_string: str, threshold: float = FUZZY_THRESHOLD
+    ) -> list[VaultItem]:
+        """
+        Searches for VaultItems whose name looks like the given search string.
+
+        Arguments:
+            search_string -- The string to search for in VaultItem names.
+
+        Keyword Arguments:
+            threshold -- minimal share of the search string trigrams found in
+                a name (default: {FUZZY_THRESHOLD})
+
+        Returns:
+            A list of matching VaultItems, most similar names first.
+        """
+        with self.lock:
+            names = self._trigram_index().fuzzy(search_string, threshold)
+            return [self.elements[name] for name in names]
+
+    @property
+    def versions(self) -> int:
+        """
+        Getter - Number of versions kept, the current one included. Zero
+        until the first change through add, edit or remove.
+
+        Returns:
+            number of versions
+        """
+        return 0 if self._history is None else len(self._history.versions)
+
+    def version(self, index: int = -1) -> VaultVersion:
+        """
+        Get a version of the vault, still queryable after later changes
+
+        Keyword Arguments:
+            index -- 0 for the oldest kept version, -1 for the current one
+                (default: {-1})
+
+        Raises:
+            IndexError: if there is no such version
+
+        Returns:
+            the version
+        """
+        with self.lock:
+            if self._history is None:
+                return VaultVersion(None, None, dict(self._elements))
+            return VaultVersion(
+                self._history, self._history.versions[index], self._elements
+            )
+
+    def undo(self) -> bool:
+        """
+        Revert the last add, edit or remove. The undo itself is not a version:
+        undoing again reverts the change before.
+
+        Returns:
+            True if a change was reverted, False if there is none left
+        """
+        with self.lock:
+            history = self._history
+            if history is None:
+                return False
+            history.commit()
+            if len(history.versions) < 2:
+                return False
+            _, _, names, added = history.versions[-1]
+            previous = VaultVersion(history, history.versions[-2], self._elements)
+            states = {name: previous.get(name) for name in names.union(added)}
+            # the revert is not recorded: the history forgets the version instead
+            with self._unversioned():
+                for name, item in states.items():
+                    if item is None:
+                        self.elements.pop(name, None)
+                    else:
+                        self.elements[name] = item
+            history.drop()
+            return True
+
+    def history(self, name: str) -> list[Optional[VaultItem]]:
+        """
+        List the successive states of an item, over the versions kept
+
+        Arguments:
+            name -- name of item
+
+        Returns:
+            states, oldest first: the item, or None when it was removed
+        """
+        with self.lock:
+            history = self._history
+            if history is None:
+                item = self._elements.get(name)
+                return [] if item is None else [item]
+            versions = iter(history.versions)
+            states = []
+            if (item := history.get(next(versions), name, self._elements)) is not None:
+                states.append(item)
+            for version in versions:
+                if name in version[2] or _has_name(version[3], name):
+                    states.append(history.get(version, name, self._elements))
+            return states
+
+
+class VaultTransaction:
+    """
+    Changes to a vault, staged then applied all at once: either every change
+    is valid and applied, or none is. They are checked when committed, against
+    the items of that time, and make one version of the vault. As a context
+    manager, the transaction commits at the end of the block, unless the block
+    raises.
+    """
+
+    def __init__(self, vault: Vault, versioned: bool = True) -> None:
+        """
+        Constructor
+
+        Arguments:
+            vault -- vault to change
+
+        Keyword Arguments:
+            versioned -- make a new version of the changes (default: {True})
+        """
+        self.vault = vault
+        self.versioned = versioned
+        self._operations: list[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._operations)
+
+    def __enter__(self) -> "VaultTransaction":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.commit()
+
+    def add(self, item: VaultItem) -> None:
+        """
+        Stage the addition of an item
+
+        Arguments:
+            item -- new item
+        """
+        self._operations.append(("add", item))
+
+    def edit(self, name: str, item: VaultItem) -> None:
+        """
+        Stage the replacement of an item, renamed or not
+
+        Arguments:
+            name -- name of replaced item
+            item -- new item
+        """
+        self._operations.append(("edit", name, item))
+
+    def remove(self, name: str) -> None:
+        """
+        Stage the removal of an item
+
+        Arguments:
+            name -- name of removed item
+        """
+        self._operations.append(("remove", name))
+
+    def commit(self) -> None:
+        """
+        Apply staged changes, then forget them. On error, they are kept.
+
+        Raises:
+            KeyError: if an edited or removed item is missing
+            DuplicateError: if an added or renamed item already exists
+        """
+        self.vault._commit(self._operations, self.versioned)
+        self._operations = []
 
 
 class User:
@@ -135,17 +1129,31 @@ class User:
     Simple User Class
     """
 
-    def __init__(self, login: str, password: str) -> None:
+    __slots__ = ("login", "password")
+
+    def __init__(
+        self,
+        login: str,
+        password: str,
+        scheme: str = kdf.LEGACY,
+        cost: Optional[int] = None,
+    ) -> None:
         """
         Constructor
 
         Arguments:
             login -- login of user. Must be unique
             password -- password of user
+
+        Keyword Arguments:
+            scheme -- key derivation function hashing password (default: {kdf.LEGACY})
+            cost -- cost of key derivation, its default if None (default: {None})
         """
         self.login = login
-        self.password = sha512(password.encode("utf-8")).hexdigest()
+        # derived in the process pool, like every costly derivation
+        self.password = kdf.submit_hash(password, scheme, cost).result()
 
+    @stats.timed("user.verify_password")
     def verify_password(self, password: str) -> bool:
         """
         Verify if the given password matches the user's password.
@@ -156,7 +1164,7 @@ class User:
         Returns:
             True if the given password matches the user's password, False otherwise.
         """
-        return sha512(password.encode("utf-8")).hexdigest() == self.password
+        return kdf.submit_verify(password, self.password).result()
 
     def __str__(self) -> str:
         """
@@ -176,40 +1184,410 @@ class User:
         """
         return hash(self.login)
 
+    def __eq__(self, other: object) -> bool:
+        """
+        Compare two users. Users are identified by their login.
+
+        Arguments:
+            other -- object to compare with
+
+        Returns:
+            True if both users share the same login.
+        """
+        if isinstance(other, User):
+            return self.login == other.login
+        return NotImplemented
+
+    __setstate__ = restore_slots
+
 
 class UserStorage:
     """
-    User Storage
+    User Storage. Its methods may be called from several threads: changes to
+    the user directory are guarded by a readers-writer lock, vaults by their
+    own lock. Lookups by login and password checks run outside of any lock.
     """
 
-    users: dict[User, Vault]
+    def __init__(self) -> None:
+        """
+        Constructor
+        """
+        self._logins: dict[str, User] = {}
+        self._kdf_params: tuple[str, Any] = (kdf.LEGACY, None)
+        # codec of pickled snapshots and shards, see model.compress
+        self.compression: Optional[str] = None
+        self.verification_cache: Optional[VerificationCache] = None
+        self.journal: Optional[Journal] = None
+        self.store: Optional[ShardStore | BinaryStore] = None
+        self._removed: set[str] = set()
+        self._dirty = False
+        self._save_lock = Lock()
+        self._lock = RWLock()
+        self._loaded = Event()
+        self._loaded.set()
+        self._load_error: Optional[BaseException] = None
+        # journal records of the transaction a thread is committing
+        self._pending = local()
+        self.users = {}
+
+    @property
+    def kdf_params(self) -> tuple[str, Optional[int]]:
+        """
+        Getter - Scheme and cost hashing the passwords of new users. A cost
+        still being calibrated is waited for.
+
+        Returns:
+            scheme and cost, None for its default cost
+        """
+        scheme, cost = self._kdf_params
+        if cost is not None and not isinstance(cost, int):
+            cost = cost.result()
+            self._kdf_params = (scheme, cost)
+        return scheme, cost
+
+    @kdf_params.setter
+    def kdf_params(self, value: tuple[str, Any]) -> None:
+        """
+        Setter - Scheme and cost hashing the passwords of new users
+
+        Arguments:
+            value -- scheme and cost: None for its default, or the Future of
+                a cost being calibrated
+        """
+        self._kdf_params = value
+
+    @property
+    def dirty(self) -> bool:
+        """
+        Getter - Tell if some changes are not saved yet
+
+        Returns:
+            True after a change, until next save
+        """
+        return self._dirty
+
+    @property
+    def users(self) -> dict[User, Optional[Vault]]:
+        """
+        Getter - Users and their vaults. A vault not loaded yet is None,
+        use get_vault to read it.
+
+        Returns:
+            Users dictionary, indexed by login
+        """
+        return self._users
+
+    @users.setter
+    def users(self, value: dict[User, Optional[Vault]]) -> None:
+        """
+        Setter - Replace all users and rebuild the login index
+
+        Arguments:
+            value -- Users dictionary
+        """
+        with self._lock.write():
+            self._logins = {}
+            self._users = ObservedDict(
+                self._index_user, self._unindex_user, value.items()
+            )
+
+    def _index_user(self, user: User, vault: Vault) -> None:
+        """
+        Add user to login index, watch its vault and journal the insertion
+
+        Arguments:
+            user -- inserted user
+            vault -- vault of user
+        """
+        self._logins[user.login] = user
+        self._removed.discard(user.login)
+        self._dirty = True
+        if vault is not None:
+            vault.observer = partial(self._vault_changed, user.login)
+        if self.journal is not None:
+            self.journal.append(("user", user, vault))
+
+    def _unindex_user(self, user: User, vault: Vault) -> None:
+        """
+        Remove user from login index and journal the removal
+
+        Arguments:
+            user -- removed user
+            vault -- vault of user
+        """
+        del self._logins[user.login]
+        self._removed.add(user.login)
+        self._dirty = True
+        if self.verification_cache is not None:
+            self.verification_cache.invalidate(user.login)
+        if vault is not None:
+            vault.observer = None
+        if self.journal is not None:
+            self.journal.append(("deluser", user.login))
+
+    def _vault_changed(self, login: str, name: str, item: Optional[VaultItem]) -> None:
+        """
+        Track and journal a vault mutation
+
+        Arguments:
+            login -- owner of vault
+            name -- name of changed item
+            item -- new item, None if removed
+        """
+        self._dirty = True
+        if self.journal is not None:
+            record = ("del", login, name) if item is None else ("set", login, item)
+            if (records := getattr(self._pending, "records", None)) is not None:
+                records.append(record)
+            else:
+                self.journal.append(record)
+
+    def _apply(self, record: tuple) -> None:
+        """
+        Apply a journal record. Records are idempotent, so replaying a journal
+        already folded into the snapshot is harmless.
+
+        Arguments:
+            record -- journal record
+        """
+        match record:
+            case ("user", user, vault):
+                self.users[user] = vault
+            case ("deluser", login):
+                if (user := self._logins.get(login)) is not None:
+                    del self.users[user]
+            case ("set", login, item):
+                if (user := self._logins.get(login)) is not None:
+                    self.get_vault(user).elements[item.name] = item
+            case ("del", login, name):
+                if (user := self._logins.get(login)) is not None:
+                    self.get_vault(user).elements.pop(name, None)
+            case ("batch", records):
+                for record in records:
+                    self._apply(record)
+
+    def load_in_background(self, filename: str, **options: Any) -> Thread:
+        """
+        Start loading data on a background thread. Until wait_loaded returns,
+        the storage must not be used, except by save, which waits itself.
+
+        Arguments:
+            filename -- file or directory path
+
+        Keyword Arguments:
+            options -- keyword arguments of load
+
+        Returns:
+            loading thread
+        """
+        self._loaded.clear()
+        self._load_error = None
+
+        def run() -> None:
+            try:
+                self.load(filename, **options)
+            except BaseException as error:
+                self._load_error = error
+            finally:
+                self._loaded.set()
+
+        thread = Thread(target=run, name="storage-load", daemon=True)
+        thread.start()
+        return thread
+
+    def wait_loaded(self) -> None:
+        """
+        Wait for a background load to finish
+
+        Raises:
+            Exception: the one a background load failed with
+        """
+        self._loaded.wait()
+        if self._load_error is not None:
+            raise self._load_error
 
-    def load(self, filename: str) -> None:
+    @stats.timed("storage.load")
+    def load(
+        self,
+        filename: str,
+        journaled: bool = False,
+        journal_threshold: int = JOURNAL_THRESHOLD,
+        sharded: bool = False,
+        binary: bool = False,
+    ) -> None:
         """
-        Load data
+        Load data. For a directory of per-user shards, or a binary file, only the
+        user directory is read: each vault is read on its first get_vault.
+        The format of an existing file is detected, keywords only choose the
+        format of a new one. Compressed files are detected as well.
 
         Arguments:
-            filename -- file path
+            filename -- file or directory path
+
+        Keyword Arguments:
+            journaled -- replay and keep appending mutations to filename.journal
+                (default: {False})
+            journal_threshold -- journal size triggering compaction on save
+                (default: {JOURNAL_THRESHOLD})
+            sharded -- store data as a directory of per-user files
+                (default: {False})
+            binary -- store data as a memory mapped binary file
+                (default: {False})
+        """
+        with self._lock.write():
+            self._load(filename, journaled, journal_threshold, sharded, binary)
+
+    def _load(
+        self,
+        filename: str,
+        journaled: bool,
+        journal_threshold: int,
+        sharded: bool,
+        binary: bool,
+    ) -> None:
         """
-        if os.path.exists(filename):
+        Load data, holding the directory lock. See load.
+        """
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if isinstance(self.store, BinaryStore):
+            self.store.close()
+        self.store = None
+        if os.path.isdir(filename) or (sharded and not os.path.exists(filename)):
+            self.store = ShardStore(filename, self.compression)
+        elif is_binary(filename) or (binary and not os.path.exists(filename)):
+            self.store = BinaryStore(filename)
+
+        if self.store is not None:
+            self.users = dict.fromkeys(self.store.load_users())
+        elif os.path.exists(filename):
             with open(filename, "br") as file:
-                self.users = pickle.load(file)
+                self.users = compress.load(file)
+                if stats.ENABLED:
+                    stats.add_bytes("read", file.tell())
         else:
             self.users = {}
+        self._removed.clear()
+        if journaled:
+            journal = Journal(filename + ".journal", journal_threshold)
+            for record in journal.replay():
+                self._apply(record)
+            self.journal = journal
+        self._dirty = False
 
+    @stats.timed("storage.save")
     def save(self, filename: str) -> None:
         """
-        Save data to file
+        Save data to file. In journaled mode, only pending mutations are written,
+        unless the journal grew past its threshold and gets compacted.
+
+        Can run on a background thread while an other one changes data: each
+        vault is only locked while its items are listed, then written.
+
+        Arguments:
+            filename -- file or directory path
+        """
+        # saving before the end of a background load would overwrite the file
+        self.wait_loaded()
+        with self._save_lock:
+            journal = self.journal
+            if journal is not None and journal.filename == filename + ".journal":
+                if journal.needs_compaction():
+                    self._compact(filename)
+                else:
+                    self._dirty = False
+                    journal.flush()
+            else:
+                self._write_snapshot(filename)
+
+    def compact(self, filename: str) -> None:
+        """
+        Fold journal into a fresh snapshot
+
+        Arguments:
+            filename -- file or directory path
+        """
+        self.wait_loaded()
+        with self._save_lock:
+            self._compact(filename)
+
+    def _compact(self, filename: str) -> None:
+        """
+        Fold journal into a fresh snapshot. Records appended while the snapshot
+        is written are kept: replaying them again is harmless.
+
+        Arguments:
+            filename -- file or directory path
+        """
+        if self.journal is None:
+            self._write_snapshot(filename)
+            return
+        self.journal.flush()
+        mark = self.journal.size
+        self._write_snapshot(filename)
+        self.journal.drop_before(mark)
+
+    def _write_snapshot(self, filename: str) -> None:
+        """
+        Write every user to file, or to directory for a sharded storage.
+        Only loaded vaults changed since last save are written back to their own
+        store; an other destination gets every vault, in the format it already
+        has. Pickled files and shards are compressed with the compression codec,
+        the binary format never is. Files are replaced atomically.
 
         Arguments:
-            filename -- file path
+            filename -- file or directory path
         """
-        with open(filename, "wb") as file:
-            pickle.dump(self.users, file)
+        own_store = self.store is not None and self.store.path == filename
+        # flags are cleared before writing: a change made meanwhile marks the
+        # data dirty again instead of being lost
+        with self._lock.read():
+            self._dirty = False
+            removed, self._removed = self._removed, set()
+            users = dict(self.users)
+        # vaults are not copied whole: Vault.__getstate__ and encode_vault only
+        # list the items of each one under its lock, then write them
+        vaults = {}
+        for user, vault in users.items():
+            if vault is None and not own_store:
+                vault = self.get_vault(user)
+            if vault is None:
+                continue
+            with vault.lock:
+                if vault.dirty or not own_store:
+                    vault.dirty = False
+                    vaults[user.login] = vault
+
+        try:
+            if own_store:
+                if isinstance(self.store, ShardStore):
+                    self.store.codec = self.compression
+                self.store.save(list(users), vaults, removed)
+            elif os.path.isdir(filename):
+                ShardStore(filename, self.compression).save(list(users), vaults)
+            elif is_binary(filename):
+                store = BinaryStore(filename)
+                store.save(list(users), vaults)
+                store.close()
+            else:
+                write_atomic(
+                    filename,
+                    {user: vaults[user.login] for user in users},
+                    self.compression,
+                )
+        except BaseException:
+            with self._lock.write():
+                self._dirty = True
+                self._removed |= removed - set(self._logins)
+            for vault in vaults.values():
+                vault.dirty = True
+            raise
 
     def get_user(self, username: str) -> Optional[User]:
         """
-        Get user from data
+        Get user from data. Takes no lock: the login index is only changed
+        by writers, one key at a time, and a dict lookup is atomic.
 
         Arguments:
             username -- User name to find
@@ -217,11 +1595,7 @@ class UserStorage:
         Returns:
             an User
         """
-        for user in self.users:
-            if user.login == username:
-                return user
-
-        return None
+        return self._logins.get(username)
 
     def remove_user(self, username: str, userpass: str) -> bool:
         """
@@ -234,12 +1608,86 @@ class UserStorage:
         Returns:
             True if success, False elsewhere
         """
-        user = self.get_user(username)
-        if user is not None and user.verify_password(userpass):
+        user = self.authenticate(username, userpass)
+        if user is None:
+            return False
+        with self._lock.write():
+            # an other session may have removed, or replaced, it meanwhile
+            if self._logins.get(username) is not user:
+                return False
             del self.users[user]
             return True
-        else:
-            return False
+
+    def authenticate(self, username: str, userpass: str) -> Optional[User]:
+        """
+        Check user’s password. With a verification cache, a recent successful
+        check is reused instead of deriving the password hash again.
+
+        Arguments:
+            username -- user’s name
+            userpass -- user’s password
+
+        Returns:
+            the User if password matches, None elsewhere
+        """
+        if (user := self.get_user(username)) is None:
+            return None
+        cache = self.verification_cache
+        if cache is not None and cache.check(username, userpass, user.password):
+            return user
+        if not user.verify_password(userpass):
+            return None
+        if cache is not None:
+            cache.add(username, userpass, user.password)
+        return user
+
+    def item_key(self, username: str, userpass: str) -> bytes:
+        """
+        Derive the key of the items of an authenticated user. With a
+        verification cache, the key is kept with the entry of the password
+        check: a cached login derives no key either.
+
+        Arguments:
+            username -- user’s name
+            userpass -- user’s password
+
+        Returns:
+            key of items
+        """
+        cache = self.verification_cache
+        user = self.get_user(username)
+        derive = partial(
+            kdf.submit, crypto.derive_key, username, userpass, crypto.KEY_COST
+        )
+        if cache is None or user is None:
+            return derive().result()
+        key = cache.derived_key(username, userpass, user.password)
+        if key is None:
+            key = derive().result()
+            cache.keep_key(username, userpass, user.password, key)
+        return key
+
+    def verify_many(self, credentials: Iterable[tuple[str, str]]) -> list[bool]:
+        """
+        Check many logins at once. Key derivations run in parallel in the
+        process pool.
+
+        Arguments:
+            credentials -- (user’s name, user’s password) pairs
+
+        Returns:
+            True for each pair whose user exists and password matches
+        """
+        credentials = list(credentials)
+        with self._lock.read():
+            users = [self._logins.get(username) for username, _ in credentials]
+        known = [
+            (userpass, user.password)
+            for user, (_, userpass) in zip(users, credentials)
+            if user is not None
+        ]
+        results = iter(kdf.verify_many(known))
+        return [user is not None and next(results) for user in users]
 
     def create_user(self, username: str, userpass: str) -> bool:
         """
@@ -252,12 +1700,58 @@ class UserStorage:
         Returns:
             True if User is successfully created, False elsewhere
         """
-        if (user := self.get_user(username)) is None:
-            user = User(username, userpass)
+        if self.get_user(username) is not None:
+            return False
+        # hashing is slow: done before taking the lock, then checked again
+        user = User(username, userpass, *self.kdf_params)
+        with self._lock.write():
+            if username in self._logins:
+                return False
             self.users[user] = Vault()
             return True
 
-        return False
+    def commit(self, transaction: VaultTransaction) -> None:
+        """
+        Commit a transaction on a vault of this storage. In journaled mode,
+        its changes are journaled as one record, flushed once: after a crash,
+        either all of them are replayed or none is.
+
+        Arguments:
+            transaction -- staged changes
+
+        Raises:
+            KeyError: if an edited or removed item is missing
+            DuplicateError: if an added or renamed item already exists
+        """
+        records: list[tuple] = []
+        self._pending.records = records
+        try:
+            transaction.commit()
+        finally:
+            self._pending.records = None
+            if records and (journal := self.journal) is not None:
+                journal.append(("batch", records))
+                journal.flush()
+
+    @contextmanager
+    def transaction(self, user: User) -> Iterator[VaultTransaction]:
+        """
+        Stage changes to the vault of a user, committed at the end of the
+        block unless it raises. See commit.
+
+        Arguments:
+            user -- owner of vault
+
+        Raises:
+            KeyError: if user not exists, or an edited or removed item is missing
+            DuplicateError: if an added or renamed item already exists
+
+        Returns:
+            transaction to stage changes in
+        """
+        transaction = self.get_vault(user).transaction()
+        yield transaction
+        self.commit(transaction)
 
     def get_vault(self, user: User) -> Vault:
         """
@@ -273,5 +1767,35 @@ class UserStorage:
             Vault associated to User
         """
         if user is not None:
-            return self.users[user]
+            with self._lock.read():
+                vault = self.users[user]
+            if vault is None:
+                with self._lock.write():
+                    # an other session may have loaded it meanwhile
+                    if (vault := self.users[user]) is None:
+                        vault = self._load_vault(user)
+            return vault
         raise KeyError(f"{user} not found")
+
+    @stats.timed("storage.load_vault")
+    def _load_vault(self, user: User) -> Vault:
+        """
+        Read a vault from its store and attach it to its user. Called with
+        the directory lock held for writing.
+
+        Arguments:
+            user -- User associated to vault
+
+        Raises:
+            KeyError: if storage has no store or vault is missing
+
+        Returns:
+            Vault associated to User
+        """
+        if self.store is None:
+            raise KeyError(f"{user} not found")
+        vault = self.store.load_vault(user.login)
+        vault.dirty = False
+        vault.observer = partial(self._vault_changed, user.login)
+        self._users.replace_value(user, vault)
+        return vault
@@ -0,0 +1,343 @@
+"""
+Persistent map: a hash array mapped trie (HAMT)
+
+Setting or deleting a key returns a new map and leaves the old one untouched.
+Both share every node but the O(log n) ones on the path to the key, so keeping
+many versions of a large map costs little memory.
+
+Each node holds up to 32 children, indexed by 5 bits of the key hash, and a
+bitmap telling which are present. A child is a node, a leaf (hash, key, value)
+tuple, or a collision node holding keys whose whole hash is equal.
+"""
+from typing import Any, Iterable, Iterator, Optional
+
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+HASH_MASK = (1 << 64) - 1
+_MISSING = object()
+
+
+class _Node:
+    """
+    Inner node
+    """
+
+    __slots__ = ("bitmap", "children")
+
+    def __init__(self, bitmap: int, children: tuple) -> None:
+        self.bitmap = bitmap
+        self.children = children
+
+
+class _Collision:
+    """
+    Keys sharing the same hash
+    """
+
+    __slots__ = ("hash", "pairs")
+
+    def __init__(self, key_hash: int, pairs: tuple[tuple[Any, Any], ...]) -> None:
+        self.hash = key_hash
+        self.pairs = pairs
+
+
+def _hash_of(child: Any) -> int:
+    """
+    Hash of a leaf or collision node
+    """
+    return child[0] if type(child) is tuple else child.hash
+
+
+def _merge(first: Any, second: Any, shift: int) -> Any:
+    """
+    Build the smallest subtree holding two leaves or collision nodes of
+    different keys
+
+    Arguments:
+        first -- leaf or collision node
+        second -- leaf
+        shift -- depth of the subtree, in bits
+
+    Returns:
+        node or collision node
+    """
+    first_hash, second_hash = _hash_of(first), _hash_of(second)
+    if first_hash == second_hash:
+        return _Collision(first_hash, (first[1:], second[1:]))
+    first_index = (first_hash >> shift) & MASK
+    second_index = (second_hash >> shift) & MASK
+    if first_index == second_index:
+        return _Node(1 << first_index, (_merge(first, second, shift + BITS),))
+    children = (first, second) if first_index < second_index else (second, first)
+    return _Node((1 << first_index) | (1 << second_index), children)
+
+
+def _set(node: _Node, key_hash: int, key: Any, value: Any, shift: int) -> _Node:
+    """
+    Set a key in a subtree
+
+    Returns:
+        new node, or the same one if value was already there
+    """
+    bit = 1 << ((key_hash >> shift) & MASK)
+    index = (node.bitmap & (bit - 1)).bit_count()
+    children = node.children
+    if not node.bitmap & bit:
+        leaf = (key_hash, key, value)
+        return _Node(node.bitmap | bit, children[:index] + (leaf,) + children[index:])
+    child = children[index]
+    if type(child) is tuple:
+        if child[0] == key_hash and child[1] == key:
+            if child[2] is value:
+                return node
+            new_child: Any = (key_hash, key, value)
+        else:
+            new_child = _merge(child, (key_hash, key, value), shift + BITS)
+    elif type(child) is _Collision:
+        if child.hash != key_hash:
+            new_child = _merge(child, (key_hash, key, value), shift + BITS)
+        else:
+            pairs = tuple(pair for pair in child.pairs if pair[0] != key)
+            new_child = _Collision(key_hash, pairs + ((key, value),))
+    else:
+        new_child = _set(child, key_hash, key, value, shift + BITS)
+        if new_child is child:
+            return node
+    return _Node(node.bitmap, children[:index] + (new_child,) + children[index + 1 :])
+
+
+def _delete(node: _Node, key_hash: int, key: Any, shift: int) -> Any:
+    """
+    Delete a key from a subtree
+
+    Returns:
+        new node, the same one if key is missing, None if the subtree becomes
+        empty, or the last leaf or collision node left, to be pulled up
+    """
+    bit = 1 << ((key_hash >> shift) & MASK)
+    if not node.bitmap & bit:
+        return node
+    index = (node.bitmap & (bit - 1)).bit_count()
+    child = node.children[index]
+    if type(child) is tuple:
+        if child[0] != key_hash or child[1] != key:
+            return node
+        new_child = None
+    elif type(child) is _Collision:
+        if child.hash != key_hash:
+            return node
+        pairs = tuple(pair for pair in child.pairs if pair[0] != key)
+        if len(pairs) == len(child.pairs):
+            return node
+        if len(pairs) == 1:
+            new_child = (key_hash, *pairs[0])
+        else:
+            new_child = _Collision(key_hash, pairs)
+    else:
+        new_child = _delete(child, key_hash, key, shift + BITS)
+        if new_child is child:
+            return node
+    children = node.children
+    if new_child is None:
+        if len(children) == 1:
+            return None
+        bitmap = node.bitmap & ~bit
+        children = children[:index] + children[index + 1 :]
+        if shift and len(children) == 1 and type(children[0]) is not _Node:
+            return children[0]
+        return _Node(bitmap, children)
+    if shift and len(children) == 1 and type(new_child) is not _Node:
+        return new_child
+    return _Node(node.bitmap, children[:index] + (new_child,) + children[index + 1 :])
+
+
+def _build(leaves: list[tuple[int, Any, Any]], shift: int) -> Any:
+    """
+    Build a subtree from leaves of distinct keys at once, instead of setting
+    them one at a time
+
+    Arguments:
+        leaves -- (hash, key, value) leaves
+        shift -- depth of the subtree, in bits
+
+    Returns:
+        node, or a leaf or collision node when they all share their hash
+    """
+    if len(leaves) == 1:
+        return leaves[0]
+    if shift >= 64:
+        return _Collision(leaves[0][0], tuple(leaf[1:] for leaf in leaves))
+    buckets: dict[int, list] = {}
+    for leaf in leaves:
+        buckets.setdefault((leaf[0] >> shift) & MASK, []).append(leaf)
+    bitmap = 0
+    children = []
+    for index in sorted(buckets):
+        bitmap |= 1 << index
+        children.append(_build(buckets[index], shift + BITS))
+    if shift and len(children) == 1 and type(children[0]) is not _Node:
+        return children[0]
+    return _Node(bitmap, tuple(children))
+
+
+def _items(node: _Node) -> Iterator[tuple[Any, Any]]:
+    """
+    Iterate over the pairs of a subtree
+    """
+    for child in node.children:
+        if type(child) is tuple:
+            yield child[1], child[2]
+        elif type(child) is _Collision:
+            yield from child.pairs
+        else:
+            yield from _items(child)
+
+
+class PersistentMap:
+    """
+    Immutable mapping; set and delete return a new map sharing structure with
+    this one.
+    """
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, items: Iterable[tuple[Any, Any]] = ()) -> None:
+        """
+        Constructor
+
+        Keyword Arguments:
+            items -- initial (key, value) pairs (default: {()})
+        """
+        pairs = dict(items)
+        self._size = len(pairs)
+        self._root: Optional[_Node] = None
+        if pairs:
+            leaves = [
+                (hash(key) & HASH_MASK, key, value) for key, value in pairs.items()
+            ]
+            root = _build(leaves, 0)
+            if type(root) is not _Node:
+                root = _Node(1 << (_hash_of(root) & MASK), (root,))
+            self._root = root
+
+    @classmethod
+    def _make(cls, root: Optional[_Node], size: int) -> "PersistentMap":
+        """
+        Wrap a root node
+        """
+        new = cls.__new__(cls)
+        new._root = root
+        new._size = size
+        return new
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: Any) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[Any]:
+        for key, _ in self.items():
+            yield key
+
+    def items(self) -> Iterator[tuple[Any, Any]]:
+        """
+        Iterate over (key, value) pairs, in no particular order
+
+        Returns:
+            Iterator of pairs
+        """
+        if self._root is not None:
+            yield from _items(self._root)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """
+        Get the value of a key
+
+        Arguments:
+            key -- key to look for
+
+        Keyword Arguments:
+            default -- returned if key is missing (default: {None})
+
+        Returns:
+            value of key, or default
+        """
+        key_hash = hash(key) & HASH_MASK
+        node: Any = self._root
+        shift = 0
+        while node is not None:
+            bit = 1 << ((key_hash >> shift) & MASK)
+            if not node.bitmap & bit:
+                return default
+            node = node.children[(node.bitmap & (bit - 1)).bit_count()]
+            if type(node) is tuple:
+                if node[0] == key_hash and node[1] == key:
+                    return node[2]
+                return default
+            if type(node) is _Collision:
+                for pair_key, value in node.pairs:
+                    if pair_key == key:
+                        return value
+                return default
+            shift += BITS
+        return default
+
+    def set(self, key: Any, value: Any) -> "PersistentMap":
+        """
+        Set a key
+
+        Arguments:
+            key -- key to set
+            value -- its value
+
+        Returns:
+            new map, or this one if key already had this value
+        """
+        key_hash = hash(key) & HASH_MASK
+        if self._root is None:
+            bit = 1 << (key_hash & MASK)
+            return self._make(_Node(bit, ((key_hash, key, value),)), 1)
+        added = key not in self
+        root = _set(self._root, key_hash, key, value, 0)
+        if root is self._root:
+            return self
+        return self._make(root, self._size + added)
+
+    def update(self, items: dict[Any, Any]) -> "PersistentMap":
+        """
+        Set many keys. A batch larger than the map is built at once, which is
+        cheaper than setting keys one at a time.
+
+        Arguments:
+            items -- keys and their values
+
+        Returns:
+            new map
+        """
+        if len(items) > self._size:
+            pairs = dict(self.items())
+            pairs.update(items)
+            return type(self)(pairs.items())
+        new = self
+        for key, value in items.items():
+            new = new.set(key, value)
+        return new
+
+    def delete(self, key: Any) -> "PersistentMap":
+        """
+        Delete a key
+
+        Arguments:
+            key -- key to delete
+
+        Returns:
+            new map, or this one if key is missing
+        """
+        if self._root is None:
+            return self
+        root = _delete(self._root, hash(key) & HASH_MASK, key, 0)
+        if root is self._root:
+            return self
+        return self._make(root, self._size - 1)
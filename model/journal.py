@@ -0,0 +1,158 @@
+"""
+Append-only journal of storage mutations
+"""
+import os
+import pickle
+import struct
+from threading import RLock
+from typing import Any, Iterator
+
+from model import stats
+
+HEADER = struct.Struct("<I")
+JOURNAL_THRESHOLD = 1 << 20
+
+
+class Journal:
+    """
+    Append-only log of length-prefixed pickled records.
+
+    A record cut short by a crash is ignored on replay, so the log is always
+    readable up to the last complete write. Records can be appended from one
+    thread while an other one flushes or compacts.
+    """
+
+    def __init__(self, filename: str, threshold: int = JOURNAL_THRESHOLD) -> None:
+        """
+        Constructor. Opens (or creates) the journal file for appending.
+
+        Arguments:
+            filename -- journal file path
+
+        Keyword Arguments:
+            threshold -- size in bytes past which compaction is advised
+                (default: {JOURNAL_THRESHOLD})
+        """
+        self.filename = filename
+        self.threshold = threshold
+        self._lock = RLock()
+        self._file = open(filename, "ab")
+        self._drop_partial_tail()
+
+    def _drop_partial_tail(self) -> None:
+        """
+        Truncate an incomplete last record so new records are appended after
+        the last complete one.
+        """
+        end = 0
+        for end, _ in self._scan():
+            pass
+        if end != self._file.seek(0, os.SEEK_END):
+            self._file.truncate(end)
+
+    def _scan(self) -> Iterator[tuple[int, Any]]:
+        """
+        Read complete records from start of file
+
+        Returns:
+            Iterator of (offset after record, record)
+        """
+        with open(self.filename, "rb") as file:
+            while len(header := file.read(HEADER.size)) == HEADER.size:
+                (length,) = HEADER.unpack(header)
+                payload = file.read(length)
+                if len(payload) != length:
+                    return
+                yield file.tell(), pickle.loads(payload)
+
+    def replay(self) -> Iterator[Any]:
+        """
+        Iterate over journaled records, oldest first
+
+        Returns:
+            Iterator of records
+        """
+        with self._lock:
+            self._file.flush()
+        end = 0
+        for end, record in self._scan():
+            yield record
+        if stats.ENABLED:
+            stats.add_bytes("read", end)
+
+    def append(self, record: Any) -> None:
+        """
+        Append a record. It is durable only after flush().
+
+        Arguments:
+            record -- picklable record
+        """
+        payload = pickle.dumps(record)
+        with self._lock:
+            self._file.write(HEADER.pack(len(payload)) + payload)
+        if stats.ENABLED:
+            stats.add_bytes("written", HEADER.size + len(payload))
+
+    def flush(self) -> None:
+        """
+        Write buffered records to disk
+        """
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    @property
+    def size(self) -> int:
+        """
+        Getter - Journal size, in bytes
+
+        Returns:
+            Size of journal, buffered records included
+        """
+        with self._lock:
+            return self._file.tell()
+
+    def needs_compaction(self) -> bool:
+        """
+        Tell if journal grew past its threshold
+
+        Returns:
+            True if a snapshot should be written
+        """
+        return self.size > self.threshold
+
+    def truncate(self) -> None:
+        """
+        Drop every record, once they are folded into a snapshot
+        """
+        self.drop_before(self.size)
+
+    def drop_before(self, mark: int) -> None:
+        """
+        Drop the records written before mark, once they are folded into a
+        snapshot. Records appended since are kept.
+
+        Arguments:
+            mark -- journal size when the snapshot started
+        """
+        with self._lock:
+            self._file.flush()
+            with open(self.filename, "rb") as file:
+                file.seek(mark)
+                tail = file.read()
+            tmp_name = self.filename + ".tmp"
+            with open(tmp_name, "wb") as file:
+                file.write(tail)
+                file.flush()
+                os.fsync(file.fileno())
+            self._file.close()
+            os.replace(tmp_name, self.filename)
+            self._file = open(self.filename, "ab")
+
+    def close(self) -> None:
+        """
+        Flush and close journal
+        """
+        with self._lock:
+            self.flush()
+            self._file.close()
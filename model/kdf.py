@@ -0,0 +1,310 @@
+"""
+Password hashing with a configurable key derivation function
+
+Hashes are stored with their parameters, as "$scheme$cost$salt$hash", so each
+user keeps the cost it was created with. A bare sha512 hex digest is the
+legacy format and is still accepted.
+"""
+import atexit
+from hashlib import pbkdf2_hmac, scrypt, sha512
+import hmac
+import os
+import sys
+from threading import Lock
+import time
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional, Union
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+LEGACY = "sha512"
+PBKDF2 = "pbkdf2_sha256"
+SCRYPT = "scrypt"
+SCHEMES = (LEGACY, PBKDF2, SCRYPT)
+
+DEFAULT_COST = {PBKDF2: 600_000, SCRYPT: 2**14}
+MIN_COST = {PBKDF2: 1_000, SCRYPT: 2**10}
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_SIZE = 16
+
+_pool: Optional["ProcessPoolExecutor"] = None
+_pool_lock = Lock()
+
+
+def _derive(password: str, scheme: str, cost: int, salt: bytes) -> bytes:
+    """
+    Run the key derivation function
+
+    Arguments:
+        password -- clear password
+        scheme -- PBKDF2 or SCRYPT
+        cost -- iterations for PBKDF2, N for SCRYPT
+        salt -- random salt
+
+    Raises:
+        ValueError: if scheme is unknown
+
+    Returns:
+        derived key
+    """
+    secret = password.encode("utf-8")
+    if scheme == PBKDF2:
+        return pbkdf2_hmac("sha256", secret, salt, cost)
+    if scheme == SCRYPT:
+        return scrypt(
+            secret,
+            salt=salt,
+            n=cost,
+            r=SCRYPT_R,
+            p=SCRYPT_P,
+            maxmem=256 * SCRYPT_R * cost,
+        )
+    raise ValueError(f"unknown scheme {scheme}")
+
+
+def hash_password(
+    password: str, scheme: str = LEGACY, cost: Optional[int] = None
+) -> str:
+    """
+    Hash a password
+
+    Arguments:
+        password -- clear password
+
+    Keyword Arguments:
+        scheme -- one of SCHEMES (default: {LEGACY})
+        cost -- iterations for PBKDF2, N for SCRYPT, DEFAULT_COST if None
+            (default: {None})
+
+    Returns:
+        encoded hash, holding its parameters
+    """
+    if scheme == LEGACY:
+        return sha512(password.encode("utf-8")).hexdigest()
+    cost = cost or DEFAULT_COST[scheme]
+    salt = os.urandom(SALT_SIZE)
+    digest = _derive(password, scheme, cost, salt)
+    return f"${scheme}${cost}${salt.hex()}${digest.hex()}"
+
+
+def is_slow(encoded: str) -> bool:
+    """
+    Tell if checking a hash runs a costly key derivation
+
+    Arguments:
+        encoded -- encoded hash
+
+    Returns:
+        True unless hash uses the legacy format
+    """
+    return encoded.startswith("$")
+
+
+def verify(password: str, encoded: str) -> bool:
+    """
+    Check a password against an encoded hash, in constant time
+
+    Arguments:
+        password -- clear password
+        encoded -- encoded hash
+
+    Returns:
+        True if password matches
+    """
+    if not is_slow(encoded):
+        expected = sha512(password.encode("utf-8")).hexdigest()
+        return hmac.compare_digest(expected, encoded)
+    _, scheme, cost, salt, digest = encoded.split("$")
+    derived = _derive(password, scheme, int(cost), bytes.fromhex(salt))
+    return hmac.compare_digest(derived.hex(), digest)
+
+
+def get_pool() -> "ProcessPoolExecutor":
+    """
+    Get the process pool running key derivations, one worker per core
+
+    Returns:
+        shared process pool
+    """
+    # imported on first use: multiprocessing is slow to import
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor()
+            atexit.register(shutdown_pool)
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """
+    Stop the process pool, if started
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def submit(function: Callable, *args: Any) -> "Future":
+    """
+    Run a costly derivation in the process pool: the calling thread only waits
+    for it, and sessions derive keys on every core.
+
+    Arguments:
+        function -- module level function, picklable as its arguments
+
+    Returns:
+        Future of its result
+    """
+    return get_pool().submit(function, *args)
+
+
+def _done(result: Any) -> "Future":
+    """
+    Wrap a result computed at once
+
+    Arguments:
+        result -- result
+
+    Returns:
+        Future holding it
+    """
+    from concurrent.futures import Future
+
+    future: Future = Future()
+    future.set_result(result)
+    return future
+
+
+def submit_hash(
+    password: str, scheme: str = LEGACY, cost: Optional[int] = None
+) -> "Future":
+    """
+    Hash a password in the process pool, see hash_password. Legacy hashes are
+    cheap and computed at once.
+
+    Arguments:
+        password -- clear password
+
+    Keyword Arguments:
+        scheme -- one of SCHEMES (default: {LEGACY})
+        cost -- iterations for PBKDF2, N for SCRYPT, DEFAULT_COST if None
+            (default: {None})
+
+    Returns:
+        Future of the encoded hash
+    """
+    if scheme == LEGACY:
+        return _done(hash_password(password))
+    return submit(hash_password, password, scheme, cost)
+
+
+def submit_verify(password: str, encoded: str) -> "Future":
+    """
+    Check a password in the process pool, so the caller is not blocked.
+    Legacy hashes are cheap and checked at once.
+
+    Arguments:
+        password -- clear password
+        encoded -- encoded hash
+
+    Returns:
+        Future of the check result
+    """
+    if is_slow(encoded):
+        return submit(verify, password, encoded)
+    return _done(verify(password, encoded))
+
+
+def verify_many(credentials: Iterable[tuple[str, str]]) -> list[bool]:
+    """
+    Check many passwords at once, spread over every core
+
+    Arguments:
+        credentials -- (clear password, encoded hash) pairs
+
+    Returns:
+        check results, in the same order
+    """
+    futures = [submit_verify(password, encoded) for password, encoded in credentials]
+    return [future.result() for future in futures]
+
+
+def calibrate(scheme: str, target: float = 0.25) -> int:
+    """
+    Find the cost making one derivation last about target seconds on this host
+
+    Arguments:
+        scheme -- PBKDF2 or SCRYPT
+
+    Keyword Arguments:
+        target -- wanted duration, in seconds (default: {0.25})
+
+    Returns:
+        cost to use with hash_password
+    """
+    cost = MIN_COST[scheme]
+    salt = os.urandom(SALT_SIZE)
+    while True:
+        start = time.perf_counter()
+        _derive("calibration", scheme, cost, salt)
+        elapsed = time.perf_counter() - start
+        if elapsed * 2 > target:
+            break
+        cost *= 2
+    if scheme == PBKDF2:
+        # cost is linear in iterations
+        return max(MIN_COST[scheme], int(cost * target / elapsed))
+    return cost
+
+
+def _calibrate_and_keep(filename: str, scheme: str) -> int:
+    """
+    Calibrate a scheme, never below its default cost, and keep the cost in a
+    file. Runs in the process pool.
+
+    Arguments:
+        filename -- file keeping the cost
+        scheme -- PBKDF2 or SCRYPT
+
+    Returns:
+        cost
+    """
+    cost = max(calibrate(scheme), DEFAULT_COST[scheme])
+    tmp_name = filename + ".tmp"
+    with open(tmp_name, "w", encoding="utf-8") as file:
+        file.write(f"{scheme} {cost}\n")
+    os.replace(tmp_name, filename)
+    return cost
+
+
+def host_cost(filename: str, scheme: str) -> Union[int, "Future"]:
+    """
+    Get the cost of a scheme on this host: calibrated once, in the process
+    pool, then read back from a file
+
+    Arguments:
+        filename -- file keeping the cost
+        scheme -- PBKDF2 or SCRYPT
+
+    Returns:
+        kept cost, or Future of the cost while calibrating
+    """
+    try:
+        with open(filename, encoding="utf-8") as file:
+            kept_scheme, cost = file.read().split()
+        if kept_scheme == scheme and int(cost) >= MIN_COST[scheme]:
+            return int(cost)
+    except (OSError, ValueError):
+        pass
+    return submit(_calibrate_and_keep, filename, scheme)
+
+
+if __name__ == "__main__":
+    target = float(sys.argv[1]) if len(sys.argv) > 1 else 0.25
+    for name in (PBKDF2, SCRYPT):
+        print(f"{name}: cost {calibrate(name, target)} for {target} s")
@@ -0,0 +1,72 @@
+"""
+Readers-writer lock
+"""
+from contextlib import contextmanager
+from threading import Condition, Lock, get_ident
+from typing import Iterator, Optional
+
+
+class RWLock:
+    """
+    Lock shared by any number of readers, or held by a single writer.
+
+    Waiting writers go first: new readers wait behind them, so a steady flow
+    of lookups cannot starve a writer. The writer may take the lock again,
+    for reading or writing. A reader must not: it would wait behind a writer
+    waiting for it.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor
+        """
+        self._cond = Condition(Lock())
+        self._readers = 0
+        self._writers_waiting = 0
+        self._writer: Optional[int] = None
+        self._depth = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """
+        Hold the lock for reading
+        """
+        if self._writer == get_ident():
+            yield
+            return
+        with self._cond:
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """
+        Hold the lock for writing
+        """
+        me = get_ident()
+        with self._cond:
+            if self._writer != me:
+                self._writers_waiting += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._cond.wait()
+                finally:
+                    self._writers_waiting -= 1
+                self._writer = me
+            self._depth += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._depth -= 1
+                if not self._depth:
+                    self._writer = None
+                    self._cond.notify_all()
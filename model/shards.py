@@ -0,0 +1,139 @@
+"""
+Sharded storage: one user directory file and one file per vault
+"""
+from hashlib import sha256
+import os
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+from model import compress, stats
+
+if TYPE_CHECKING:
+    from model.data import User, Vault
+
+USERS_FILE = "users.pkl"
+VAULTS_DIR = "vaults"
+
+
+def write_atomic(filename: str, obj: Any, codec: Optional[str] = None) -> None:
+    """
+    Pickle an object to a temporary file, then rename it over filename,
+    so a crash never leaves a half written file.
+
+    Arguments:
+        filename -- file path
+        obj -- object to pickle
+
+    Keyword Arguments:
+        codec -- compression codec, None for a plain pickle (default: {None})
+    """
+    tmp_name = filename + ".tmp"
+    with open(tmp_name, "wb") as file:
+        compress.dump(obj, file, codec)
+        if stats.ENABLED:
+            stats.add_bytes("written", file.tell())
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_name, filename)
+
+
+class ShardStore:
+    """
+    Directory holding the user directory and one vault file per user.
+
+    The user directory is small and read at once; a vault file is read only
+    when its vault is needed.
+    """
+
+    def __init__(self, path: str, codec: Optional[str] = None) -> None:
+        """
+        Constructor
+
+        Arguments:
+            path -- store directory
+
+        Keyword Arguments:
+            codec -- compression of written files, any is read
+                (default: {None})
+        """
+        self.path = path
+        self.codec = codec
+
+    def vault_path(self, login: str) -> str:
+        """
+        Path of the file holding a vault. Logins are hashed, so any login
+        gives a valid file name.
+
+        Arguments:
+            login -- owner of vault
+
+        Returns:
+            vault file path
+        """
+        name = sha256(login.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, VAULTS_DIR, name + ".vault")
+
+    def load_users(self) -> list["User"]:
+        """
+        Read user directory
+
+        Returns:
+            All users, without their vaults
+        """
+        path = os.path.join(self.path, USERS_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path, "rb") as file:
+            users = compress.load(file)
+            if stats.ENABLED:
+                stats.add_bytes("read", file.tell())
+            return users
+
+    def load_vault(self, login: str) -> "Vault":
+        """
+        Read one vault
+
+        Arguments:
+            login -- owner of vault
+
+        Raises:
+            KeyError: if vault file does’nt exists
+
+        Returns:
+            Vault of user
+        """
+        try:
+            with open(self.vault_path(login), "rb") as file:
+                vault = compress.load(file)
+                if stats.ENABLED:
+                    stats.add_bytes("read", file.tell())
+                return vault
+        except FileNotFoundError as error:
+            raise KeyError(f"{login} not found") from error
+
+    def save(
+        self,
+        users: Iterable["User"],
+        vaults: dict[str, "Vault"],
+        removed: Iterable[str] = (),
+    ) -> None:
+        """
+        Write user directory and the given vaults. Vaults not given are left
+        untouched on disk.
+
+        Arguments:
+            users -- every user
+            vaults -- vaults to write, by login
+
+        Keyword Arguments:
+            removed -- logins whose vault file must be deleted (default: {()})
+        """
+        os.makedirs(os.path.join(self.path, VAULTS_DIR), exist_ok=True)
+        for login, vault in vaults.items():
+            write_atomic(self.vault_path(login), vault, self.codec)
+        write_atomic(os.path.join(self.path, USERS_FILE), list(users), self.codec)
+        for login in removed:
+            if login not in vaults:
+                try:
+                    os.remove(self.vault_path(login))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,190 @@
+"""
+Instrumentation: call counts, latencies and bytes read or written
+
+Enabled by setting PASSMAN_STATS, read once at import: its value is the JSON
+file the statistics are dumped to on exit. When disabled, timed returns the
+function itself and callers skip add_bytes behind ENABLED, so nothing is
+measured nor stored.
+"""
+from collections import deque
+from functools import wraps
+import json
+import os
+from threading import Lock
+import time
+from typing import Any, Callable, TypeVar
+
+FILE = os.environ.get("PASSMAN_STATS", "")
+ENABLED = bool(FILE)
+# percentiles are computed over the last SAMPLES calls of an operation
+SAMPLES = 4096
+PERCENTILES = (50, 90, 99)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Recorder:
+    """
+    Collects measures, from any thread
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor
+        """
+        self._lock = Lock()
+        self._calls: dict[str, list] = {}
+        self._bytes: dict[str, int] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        """
+        Record a call
+
+        Arguments:
+            name -- operation
+            seconds -- duration of call
+        """
+        with self._lock:
+            calls = self._calls.get(name)
+            if calls is None:
+                calls = self._calls[name] = [0, 0.0, deque(maxlen=SAMPLES)]
+            calls[0] += 1
+            calls[1] += seconds
+            calls[2].append(seconds)
+
+    def add_bytes(self, name: str, size: int) -> None:
+        """
+        Count bytes
+
+        Arguments:
+            name -- counter, e.g. "read" or "written"
+            size -- number of bytes
+        """
+        with self._lock:
+            self._bytes[name] = self._bytes.get(name, 0) + size
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Get statistics
+
+        Returns:
+            "calls": count, total and percentile latencies in milliseconds by
+            operation, "bytes": byte counters
+        """
+        with self._lock:
+            calls = {
+                name: (count, total, sorted(samples))
+                for name, (count, total, samples) in self._calls.items()
+            }
+            counters = dict(self._bytes)
+        result = {}
+        for name, (count, total, samples) in sorted(calls.items()):
+            entry = {"count": count, "total_ms": total * 1e3}
+            for p in PERCENTILES:
+                rank = min(len(samples) - 1, len(samples) * p // 100)
+                entry[f"p{p}_ms"] = samples[rank] * 1e3
+            entry["max_ms"] = samples[-1] * 1e3
+            result[name] = entry
+        return {"calls": result, "bytes": counters}
+
+    def report(self) -> list[str]:
+        """
+        Format statistics for display
+
+        Returns:
+            one line per operation and byte counter
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f"{'opération':<32} {'appels':>8} {'total ms':>10} "
+            f"{'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+        ]
+        for name, entry in snapshot["calls"].items():
+            lines.append(
+                f"{name:<32} {entry['count']:>8} {entry['total_ms']:>10.2f} "
+                f"{entry['p50_ms']:>9.3f} {entry['p99_ms']:>9.3f} "
+                f"{entry['max_ms']:>9.3f}"
+            )
+        for name, size in sorted(snapshot["bytes"].items()):
+            lines.append(f"{'octets ' + name:<32} {size:>8}")
+        return lines
+
+    def dump(self, filename: str) -> None:
+        """
+        Write statistics as JSON
+
+        Arguments:
+            filename -- file path
+        """
+        with open(filename, "w", encoding="utf-8") as file:
+            json.dump(self.snapshot(), file, indent=2)
+
+    def clear(self) -> None:
+        """
+        Drop every measure
+        """
+        with self._lock:
+            self._calls.clear()
+            self._bytes.clear()
+
+
+recorder = Recorder()
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """
+    Decorator timing each call of a function, when enabled
+
+    Arguments:
+        name -- operation
+
+    Returns:
+        decorator, returning the function itself when disabled
+    """
+
+    def decorator(func: F) -> F:
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                recorder.record(name, time.perf_counter() - start)
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def add_bytes(name: str, size: int) -> None:
+    """
+    Count bytes. Guard calls with ENABLED, so nothing runs when disabled.
+
+    Arguments:
+        name -- counter, e.g. "read" or "written"
+        size -- number of bytes
+    """
+    recorder.add_bytes(name, size)
+
+
+def report() -> list[str]:
+    """
+    Format statistics for display
+
+    Returns:
+        lines, a notice when disabled
+    """
+    if not ENABLED:
+        return ["Statistiques désactivées: définir PASSMAN_STATS=stats.json."]
+    return recorder.report()
+
+
+def dump() -> None:
+    """
+    Write statistics to the PASSMAN_STATS file, when enabled
+    """
+    if ENABLED:
+        recorder.dump(FILE)
@@ -0,0 +1,888 @@
+"""
+Synchronisation of two copies of the data, offline, between two local files
+
+Each copy is summed up by Merkle trees. An item digest hashes its name, login
+and stored password. The items of a vault are spread over a trie by the hash
+of their names, each node hashing its children; users are spread the same way
+by login, the digest of a user covering its password hash and the root of its
+vault. Comparing two trees only descends into subtrees whose digests differ:
+once both trees are built, finding the changed items costs O(changes · log n)
+instead of comparing every item.
+
+Trees are saved next to the data files they sum up, and as base: a tree file
+holds, for each user, its password hash, the root of its vault and the
+digests of its items, with the stamp of the vault record in the binary store.
+A vault whose stamp is unchanged and which was not changed since its load is
+taken from the saved tree, without being loaded or hashed: a synchronisation
+only rebuilds the trees of vaults changed since the last one. Tree files are
+memory mapped, and the digests of a vault only read when its tree differs.
+
+Tree file (little endian): magic "PMTREE01", index offset u64, then for each
+user a record of fields login, password hash, vault stamp and vault root as
+binfmt encodes users, followed by a record of its item digests: count u32,
+then for each item its u32 length prefixed name and its digest. The index is
+a user count u32, then (user offset u64, digests offset u64) per user.
+
+Merging is two-way, or three-way when the state of the last synchronisation
+is given as base:
+- without base nothing is removed: an item or user on one side only is kept,
+  or added to the other side;
+- with base, a change made on one side only is taken, removals included.
+An item changed differently on both sides is a conflict, settled by policy:
+OURS keeps our side, THEIRS takes theirs. Passwords of items are encrypted
+with a key derived from the password of their user, so a user whose password
+changed is taken as a whole, vault included, and never mixed item by item.
+"""
+from functools import partial
+from hashlib import blake2b
+import mmap
+import os
+import struct
+from typing import Callable, Iterator, Optional, Union
+
+from model import compress
+from model.binfmt import U32, BinaryStore, pack_fields, record_end, unpack_fields
+from model.data import User, UserStorage, Vault, VaultItem
+
+OURS = "ours"
+THEIRS = "theirs"
+POLICIES = (OURS, THEIRS)
+DIGEST_SIZE = 16
+# a trie node splits its keys over 16 children by 4 bits of their hash, until
+# at most LEAF_SIZE keys are left
+FANOUT_BITS = 4
+LEAF_SIZE = 16
+_KEY_BITS = 64
+TREE_MAGIC = b"PMTREE01"
+TREE_HEADER = struct.Struct("<8sQ")
+TREE_ENTRY = struct.Struct("<QQ")
+# tree file kept next to a data file
+TREE_SUFFIX = ".tree"
+
+
+def _field(digest: blake2b, value: str) -> None:
+    """
+    Hash a length prefixed string, so that fields cannot run into each other
+
+    Arguments:
+        digest -- hash object
+        value -- string to hash
+    """
+    encoded = value.encode("utf-8")
+    digest.update(len(encoded).to_bytes(4, "little"))
+    digest.update(encoded)
+
+
+def item_digest(item: VaultItem) -> bytes:
+    """
+    Digest of the content of an item
+
+    Arguments:
+        item -- vault item
+
+    Returns:
+        digest
+    """
+    digest = blake2b(digest_size=DIGEST_SIZE)
+    _field(digest, item.name)
+    _field(digest, item.login)
+    _field(digest, item.password)
+    return digest.digest()
+
+
+def user_digest(login: str, password: str, vault_root: bytes) -> bytes:
+    """
+    Digest of a user and of its vault
+
+    Arguments:
+        login -- user’s name
+        password -- user’s password hash
+        vault_root -- root digest of the tree of its vault
+
+    Returns:
+        digest
+    """
+    digest = blake2b(digest_size=DIGEST_SIZE)
+    _field(digest, login)
+    _field(digest, password)
+    digest.update(vault_root)
+    return digest.digest()
+
+
+def _key_hash(key: str) -> int:
+    """
+    Position of a key in the trie
+
+    Arguments:
+        key -- item name or login
+
+    Returns:
+        64 bits hash
+    """
+    return int.from_bytes(blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class MerkleNode:
+    """
+    Node of a Merkle trie: a leaf maps its keys to their digests, an inner
+    node maps 4 bits of key hash to its children.
+    """
+
+    __slots__ = ("digest", "children", "leaves")
+
+    def __init__(
+        self,
+        digest: bytes,
+        children: Optional[dict[int, "MerkleNode"]] = None,
+        leaves: Optional[dict[str, bytes]] = None,
+    ) -> None:
+        """
+        Constructor
+
+        Arguments:
+            digest -- digest of subtree
+
+        Keyword Arguments:
+            children -- children of an inner node (default: {None})
+            leaves -- digests of a leaf, by key (default: {None})
+        """
+        self.digest = digest
+        self.children = children
+        self.leaves = leaves
+
+    def entries(self) -> dict[str, bytes]:
+        """
+        Collect the digests of the subtree
+
+        Returns:
+            digests, by key
+        """
+        if self.leaves is not None:
+            return self.leaves
+        entries: dict[str, bytes] = {}
+        for child in self.children.values():  # type: ignore
+            entries.update(child.entries())
+        return entries
+
+
+def _build(entries: list[tuple[int, str, bytes]], depth: int) -> MerkleNode:
+    """
+    Build a subtree
+
+    Arguments:
+        entries -- (key hash, key, digest) triples
+        depth -- bits of key hash already used
+
+    Returns:
+        subtree
+    """
+    digest = blake2b(digest_size=DIGEST_SIZE)
+    if len(entries) <= LEAF_SIZE or depth >= _KEY_BITS:
+        leaves = {key: value for _, key, value in sorted(entries, key=_by_key)}
+        for key, value in leaves.items():
+            _field(digest, key)
+            digest.update(value)
+        return MerkleNode(digest.digest(), leaves=leaves)
+    shift = _KEY_BITS - depth - FANOUT_BITS
+    mask = (1 << FANOUT_BITS) - 1
+    buckets: dict[int, list[tuple[int, str, bytes]]] = {}
+    for entry in entries:
+        buckets.setdefault((entry[0] >> shift) & mask, []).append(entry)
+    children = {}
+    for index in sorted(buckets):
+        children[index] = child = _build(buckets[index], depth + FANOUT_BITS)
+        digest.update(bytes([index]))
+        digest.update(child.digest)
+    return MerkleNode(digest.digest(), children=children)
+
+
+def _by_key(entry: tuple[int, str, bytes]) -> str:
+    """
+    Sort key of trie entries
+    """
+    return entry[1]
+
+
+def build_tree(digests: dict[str, bytes]) -> MerkleNode:
+    """
+    Build a Merkle trie. Its shape and root only depend on its content.
+
+    Arguments:
+        digests -- digests, by key
+
+    Returns:
+        root
+    """
+    return _build([(_key_hash(key), key, value) for key, value in digests.items()], 0)
+
+
+def diff(ours: Optional[MerkleNode], theirs: Optional[MerkleNode]) -> Iterator[str]:
+    """
+    Find the keys whose digests differ, or present in one tree only. Subtrees
+    with equal digests are skipped.
+
+    Arguments:
+        ours -- a tree, None if empty
+        theirs -- an other tree, None if empty
+
+    Returns:
+        Iterator of keys
+    """
+    if ours is None or theirs is None:
+        if (node := ours or theirs) is not None:
+            yield from node.entries()
+        return
+    if ours.digest == theirs.digest:
+        return
+    if ours.children is not None and theirs.children is not None:
+        for index in sorted(ours.children.keys() | theirs.children.keys()):
+            yield from diff(ours.children.get(index), theirs.children.get(index))
+        return
+    # trees of different sizes: a leaf holds few keys, compare them directly
+    our_entries, their_entries = ours.entries(), theirs.entries()
+    for key in our_entries.keys() | their_entries.keys():
+        if our_entries.get(key) != their_entries.get(key):
+            yield key
+
+
+def encode_digests(digests: dict[str, bytes]) -> bytes:
+    """
+    Encode the item digests of a vault, as in tree files
+
+    Arguments:
+        digests -- digests, by item name
+
+    Returns:
+        length prefixed record
+    """
+    parts = [U32.pack(len(digests))]
+    for name in sorted(digests):
+        encoded = name.encode("utf-8")
+        parts += [U32.pack(len(encoded)), encoded, digests[name]]
+    payload = b"".join(parts)
+    return U32.pack(len(payload)) + payload
+
+
+class SavedTree:
+    """
+    Tree file written by StorageTree.save, memory mapped: users are read at
+    once, the item digests of a vault only when asked for
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        Constructor
+
+        Arguments:
+            filename -- tree file path
+
+        Raises:
+            OSError: if file cannot be read
+            ValueError: if file is not a tree file
+        """
+        with open(filename, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < TREE_HEADER.size:
+                raise ValueError(f"{filename} is not a tree file")
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_offset = TREE_HEADER.unpack_from(self._map)
+        if magic != TREE_MAGIC:
+            self._map.close()
+            raise ValueError(f"{filename} is not a tree file")
+        # login -> (password hash, vault stamp, vault root, digests offset)
+        self.users: dict[str, tuple[str, int, bytes, int]] = {}
+        (count,) = U32.unpack_from(self._map, index_offset)
+        start = index_offset + U32.size
+        for i in range(count):
+            user_offset, digests_offset = TREE_ENTRY.unpack_from(
+                self._map, start + TREE_ENTRY.size * i
+            )
+            login, password, stamp, root = unpack_fields(self._map, user_offset)
+            self.users[login.decode("utf-8")] = (
+                password.decode("utf-8"),
+                int.from_bytes(stamp, "little"),
+                bytes(root),
+                digests_offset,
+            )
+
+    def entries(self, login: str) -> dict[str, bytes]:
+        """
+        Read the item digests of a vault
+
+        Arguments:
+            login -- owner of vault
+
+        Returns:
+            digests, by item name
+        """
+        buffer = self._map
+        position = self.users[login][3] + U32.size
+        (count,) = U32.unpack_from(buffer, position)
+        position += U32.size
+        entries = {}
+        for _ in range(count):
+            (size,) = U32.unpack_from(buffer, position)
+            position += U32.size
+            name = buffer[position : position + size].decode("utf-8")
+            position += size
+            entries[name] = buffer[position : position + DIGEST_SIZE]
+            position += DIGEST_SIZE
+        return entries
+
+    def entries_record(self, login: str) -> bytes:
+        """
+        Get the item digests of a vault, as encoded by encode_digests
+
+        Arguments:
+            login -- owner of vault
+
+        Returns:
+            raw record
+        """
+        offset = self.users[login][3]
+        return self._map[offset : record_end(self._map, offset)]
+
+    def close(self) -> None:
+        """
+        Unmap file
+        """
+        self._map.close()
+
+
+def open_tree(filename: str) -> Optional[SavedTree]:
+    """
+    Open a tree file, if there is one
+
+    Arguments:
+        filename -- tree file path
+
+    Returns:
+        saved tree, None if file is missing or not a tree file
+    """
+    try:
+        return SavedTree(filename)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def vault_stamp(storage: UserStorage, login: str) -> int:
+    """
+    Get the stamp of a vault, if its content is the one of its record
+
+    Arguments:
+        storage -- storage holding vault
+        login -- owner of vault
+
+    Returns:
+        stamp of the record in the binary store, 0 if there is none, or if the
+        vault changed since it was loaded
+    """
+    store = storage.store
+    user = storage.get_user(login)
+    if not isinstance(store, BinaryStore) or user is None:
+        return 0
+    # a vault not loaded yet is None
+    vault = storage.users.get(user)
+    if vault is not None and vault.dirty:
+        return 0
+    return store.vault_stamp(login)
+
+
+class StorageTree:
+    """
+    Merkle trees of a storage, or of a saved tree. The tree of a vault is
+    built from the digests of its items on first use. Digests come from the
+    items, or from a previous or saved tree for unchanged vaults: those are
+    neither loaded nor hashed.
+    """
+
+    __slots__ = (
+        "users",
+        "passwords",
+        "roots",
+        "digests",
+        "root",
+        "_storage",
+        "_sources",
+        "_entries",
+        "_vaults",
+        "_items",
+    )
+
+    def __init__(
+        self,
+        storage: Optional[UserStorage],
+        previous: Optional["StorageTree"] = None,
+        changed: frozenset[str] = frozenset(),
+        saved: Optional[SavedTree] = None,
+    ) -> None:
+        """
+        Constructor. Loads and hashes the vaults of storage changed since
+        previous or saved.
+
+        Arguments:
+            storage -- storage to sum up, None for the saved tree itself
+
+        Keyword Arguments:
+            previous -- tree of the same storage, whose vaults are reused
+                (default: {None})
+            changed -- logins whose vaults changed since previous, and are
+                built again (default: {frozenset()})
+            saved -- tree saved with the stamps of the store of storage, whose
+                vaults are reused when their stamps match (default: {None})
+        """
+        self.users: dict[str, User] = {}
+        self.passwords: dict[str, str] = {}
+        self.roots: dict[str, bytes] = {}
+        self.digests: dict[str, bytes] = {}
+        self._storage = storage
+        self._sources: dict[str, Union["StorageTree", SavedTree]] = {}
+        self._entries: dict[str, dict[str, bytes]] = {}
+        self._vaults: dict[str, MerkleNode] = {}
+        self._items: dict[str, dict[str, VaultItem]] = {}
+        if storage is None:
+            for login, (password, _, root, _) in saved.users.items():  # type: ignore
+                self.passwords[login] = password
+                self.roots[login] = root
+                self._sources[login] = saved  # type: ignore
+        else:
+            for user in list(storage.users):
+                self._add_user(storage, user, previous, changed, saved)
+        for login, root in self.roots.items():
+            self.digests[login] = user_digest(login, self.passwords[login], root)
+        self.root = build_tree(self.digests)
+
+    def _add_user(
+        self,
+        storage: UserStorage,
+        user: User,
+        previous: Optional["StorageTree"],
+        changed: frozenset[str],
+        saved: Optional[SavedTree],
+    ) -> None:
+        """
+        Sum up a user and its vault
+
+        Arguments:
+            storage -- storage summed up
+            user -- user
+            previous -- tree of the same storage, or None
+            changed -- logins whose vaults changed since previous
+            saved -- tree saved with the stamps of the store, or None
+        """
+        login = user.login
+        self.users[login] = user
+        self.passwords[login] = user.password
+        if previous is not None and login in previous.roots and login not in changed:
+            self.roots[login] = previous.roots[login]
+            self._sources[login] = previous
+            return
+        entry = saved.users.get(login) if saved is not None else None
+        if entry is not None and entry[1] and entry[1] == vault_stamp(storage, login):
+            self.roots[login] = entry[2]
+            self._sources[login] = saved  # type: ignore
+            return
+        vault = storage.get_vault(user)
+        with vault.lock:
+            items = dict(vault.elements)
+        self._items[login] = items
+        self._entries[login] = {name: item_digest(item) for name, item in items.items()}
+        self._vaults[login] = build_tree(self._entries[login])
+        self.roots[login] = self._vaults[login].digest
+
+    def entries(self, login: str) -> dict[str, bytes]:
+        """
+        Get the item digests of a vault
+
+        Arguments:
+            login -- owner of vault
+
+        Returns:
+            digests, by item name
+        """
+        if (entries := self._entries.get(login)) is None:
+            entries = self._entries[login] = self._sources[login].entries(login)
+        return entries
+
+    def entries_record(self, login: str) -> bytes:
+        """
+        Get the item digests of a vault, as encoded by encode_digests. Those
+        of a saved tree are copied as is.
+
+        Arguments:
+            login -- owner of vault
+
+        Returns:
+            raw record
+        """
+        if (source := self._sources.get(login)) is not None:
+            return source.entries_record(login)
+        return encode_digests(self._entries[login])
+
+    def vault(self, login: str) -> MerkleNode:
+        """
+        Get the tree of a vault
+
+        Arguments:
+            login -- owner of vault
+
+        Returns:
+            root
+        """
+        if (node := self._vaults.get(login)) is None:
+            node = self._vaults[login] = build_tree(self.entries(login))
+        return node
+
+    def items(self, login: str) -> dict[str, VaultItem]:
+        """
+        Get the items of a vault. Only for the tree of a storage.
+
+        Arguments:
+            login -- owner of vault
+
+        Returns:
+            items, by name
+        """
+        if (items := self._items.get(login)) is None:
+            vault = self._storage.get_vault(self.users[login])  # type: ignore
+            with vault.lock:
+                items = self._items[login] = dict(vault.elements)
+        return items
+
+    def changes(self, other: "StorageTree") -> dict[str, set[str]]:
+        """
+        Compare with an other tree
+
+        Arguments:
+            other -- tree of an other storage
+
+        Returns:
+            names of differing items, by login of differing user
+        """
+        return {
+            login: set(
+                diff(
+                    self.vault(login) if login in self.roots else None,
+                    other.vault(login) if login in other.roots else None,
+                )
+            )
+            for login in diff(self.root, other.root)
+        }
+
+    def save(self, filename: str, stamp: Optional[Callable[[str], int]] = None) -> None:
+        """
+        Write the tree to a file, atomically
+
+        Arguments:
+            filename -- tree file path
+
+        Keyword Arguments:
+            stamp -- gives the stamp of the vault of a login in the store the
+                file is kept with. If None, no stamp is written and the file is
+                only fit as base. (default: {None})
+        """
+        tmp_name = filename + ".tmp"
+        index = []
+        with open(tmp_name, "wb") as file:
+            file.write(TREE_HEADER.pack(TREE_MAGIC, 0))
+            for login, root in self.roots.items():
+                user_offset = file.tell()
+                value = stamp(login) if stamp is not None else 0
+                fields = [
+                    login.encode("utf-8"),
+                    self.passwords[login].encode("utf-8"),
+                    value.to_bytes(8, "little"),
+                    root,
+                ]
+                file.write(pack_fields(fields))
+                digests_offset = file.tell()
+                file.write(self.entries_record(login))
+                index.append((user_offset, digests_offset))
+            index_offset = file.tell()
+            file.write(U32.pack(len(index)))
+            for entry in index:
+                file.write(TREE_ENTRY.pack(*entry))
+            file.seek(0)
+            file.write(TREE_HEADER.pack(TREE_MAGIC, index_offset))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_name, filename)
+
+
+class SyncReport:
+    """
+    Changes made by a merge
+    """
+
+    __slots__ = ("added", "updated", "removed", "conflicts")
+
+    def __init__(self) -> None:
+        """
+        Constructor
+        """
+        self.added = 0
+        self.updated = 0
+        self.removed = 0
+        # (login, item name), an empty name for a user as a whole
+        self.conflicts: list[tuple[str, str]] = []
+
+    def __str__(self) -> str:
+        return (
+            f"{self.added} ajouté(s), {self.updated} modifié(s), "
+            f"{self.removed} supprimé(s), {len(self.conflicts)} conflit(s)."
+        )
+
+
+def _pick(
+    ours: Optional[bytes],
+    theirs: Optional[bytes],
+    base: Optional[bytes],
+    has_base: bool,
+    policy: str,
+) -> Optional[bool]:
+    """
+    Decide which side of a differing key wins
+
+    Arguments:
+        ours -- digest on our side, None if missing
+        theirs -- digest on their side, None if missing
+        base -- digest in base, None if missing
+        has_base -- tell if there is a base
+        policy -- OURS or THEIRS
+
+    Returns:
+        True to take theirs, False to keep ours, None to keep ours on a conflict
+        settled by policy OURS
+    """
+    if has_base:
+        if ours == base:
+            return True
+        if theirs == base:
+            return False
+    elif ours is None:
+        return True
+    elif theirs is None:
+        return False
+    return True if policy == THEIRS else None
+
+
+def merge(
+    storage: UserStorage,
+    ours: StorageTree,
+    theirs: StorageTree,
+    base: Optional[StorageTree] = None,
+    policy: str = OURS,
+) -> SyncReport:
+    """
+    Merge their side into storage. The storage must not be used meanwhile.
+
+    Arguments:
+        storage -- our storage, changed in place
+        ours -- its tree
+        theirs -- tree of their storage
+
+    Keyword Arguments:
+        base -- tree of the last synchronised state, for a three-way merge
+            (default: {None})
+        policy -- OURS or THEIRS, settles conflicts (default: {OURS})
+
+    Raises:
+        ValueError: if policy is unknown
+
+    Returns:
+        report of changes and conflicts
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"politique inconnue {policy}")
+    report = SyncReport()
+    for login, names in ours.changes(theirs).items():
+        our_user, their_user = ours.users.get(login), theirs.users.get(login)
+        base_password = base.passwords.get(login) if base is not None else None
+        if our_user is None or their_user is None:
+            # user on one side only: added on one side, or removed on one side
+            take = _pick(
+                ours.digests.get(login),
+                theirs.digests.get(login),
+                base.digests.get(login) if base is not None else None,
+                base is not None,
+                policy,
+            )
+            if take is None:
+                report.conflicts.append((login, ""))
+            elif take and their_user is not None:
+                _take_user(storage, their_user, theirs.items(login))
+                report.added += 1
+            elif take and our_user is not None:
+                del storage.users[our_user]
+                report.removed += 1
+            continue
+        if our_user.password != their_user.password:
+            take = _pick(
+                our_user.password,
+                their_user.password,
+                base_password,
+                base is not None and base_password is not None,
+                policy,
+            )
+            if take is None:
+                report.conflicts.append((login, ""))
+            elif take:
+                _take_user(storage, their_user, theirs.items(login))
+                report.updated += 1
+            continue
+        _merge_vault(
+            storage.get_vault(our_user),
+            login,
+            names,
+            ours,
+            theirs,
+            base if base_password is not None else None,
+            policy,
+            report,
+        )
+    return report
+
+
+def _take_user(storage: UserStorage, user: User, items: dict[str, VaultItem]) -> None:
+    """
+    Add or replace a user, with its vault
+
+    Arguments:
+        storage -- storage changed
+        user -- user to add
+        items -- items of its vault
+    """
+    vault = Vault()
+    vault.elements = dict(items)
+    vault.dirty = True
+    if (existing := storage.get_user(user.login)) is not None:
+        del storage.users[existing]
+    storage.users[user] = vault
+
+
+def _merge_vault(
+    vault: Vault,
+    login: str,
+    names: set[str],
+    ours: StorageTree,
+    theirs: StorageTree,
+    base: Optional[StorageTree],
+    policy: str,
+    report: SyncReport,
+) -> None:
+    """
+    Merge the differing items of a vault
+
+    Arguments:
+        vault -- our vault, changed in place
+        login -- owner of vault
+        names -- names of differing items
+        ours -- our tree
+        theirs -- their tree
+        base -- base tree, None for a two-way merge or a user not in base
+        policy -- OURS or THEIRS
+        report -- receives changes and conflicts
+    """
+    our_digests = ours.entries(login)
+    their_digests = theirs.entries(login)
+    base_digests = base.entries(login) if base is not None else {}
+    their_items = theirs.items(login)
+    with vault.lock:
+        for name in sorted(names):
+            take = _pick(
+                our_digests.get(name),
+                their_digests.get(name),
+                base_digests.get(name),
+                base is not None,
+                policy,
+            )
+            if take is None:
+                report.conflicts.append((login, name))
+            elif take and name in their_items:
+                if name in vault.elements:
+                    report.updated += 1
+                else:
+                    report.added += 1
+                vault.elements[name] = their_items[name]
+            elif take and name in vault.elements:
+                del vault.elements[name]
+                report.removed += 1
+
+
+def open_storage(filename: str) -> UserStorage:
+    """
+    Load a storage the way the application does: its journal is replayed and
+    kept, and the compression of a pickled file is kept.
+
+    Arguments:
+        filename -- file or directory path
+
+    Returns:
+        loaded storage
+    """
+    storage = UserStorage()
+    if os.path.isfile(filename):
+        storage.compression = compress.detect(filename)
+    storage.load(filename, journaled=os.path.exists(filename + ".journal"))
+    return storage
+
+
+def sync_files(
+    our_file: str, their_file: str, base_file: Optional[str] = None, policy: str = OURS
+) -> SyncReport:
+    """
+    Synchronise two data files: both hold the merged data afterwards. Their
+    trees are saved next to them, with suffix TREE_SUFFIX, so the next
+    synchronisation only loads and hashes the vaults changed meanwhile.
+
+    Arguments:
+        our_file -- our data file or directory
+        their_file -- their data file or directory
+
+    Keyword Arguments:
+        base_file -- tree of the last synchronisation for a three-way merge,
+            written back after merging; two-way merge if None or missing. A data
+            file, as written before trees were saved, is read as well.
+            (default: {None})
+        policy -- OURS or THEIRS, settles conflicts (default: {OURS})
+
+    Raises:
+        ValueError: if policy is unknown
+
+    Returns:
+        report of the changes made to our side
+    """
+    ours, theirs = open_storage(our_file), open_storage(their_file)
+    saved = [open_tree(our_file + TREE_SUFFIX), open_tree(their_file + TREE_SUFFIX)]
+    base = None
+    if base_file is not None and os.path.exists(base_file):
+        saved.append(open_tree(base_file))
+        if saved[-1] is not None:
+            base = StorageTree(None, saved=saved[-1])
+        else:
+            base = StorageTree(open_storage(base_file))
+    our_tree = StorageTree(ours, saved=saved[0])
+    their_tree = StorageTree(theirs, saved=saved[1])
+    changes = our_tree.changes(their_tree)
+    report = merge(ours, our_tree, their_tree, base, policy)
+    merged = StorageTree(ours, our_tree, frozenset(changes))
+    # every remaining difference is taken from the merged side: with their own
+    # tree as base, none is a conflict
+    merge(theirs, their_tree, merged, their_tree, THEIRS)
+    ours.save(our_file)
+    theirs.save(their_file)
+    # both sides now hold the merged tree, each with the stamps of its store
+    for storage, filename in ((theirs, their_file), (ours, our_file)):
+        if isinstance(storage.store, BinaryStore):
+            merged.save(filename + TREE_SUFFIX, partial(vault_stamp, storage))
+    if base_file is not None:
+        merged.save(base_file)
+    for tree in saved:
+        if tree is not None:
+            tree.close()
+    for storage in (ours, theirs):
+        if storage.journal is not None:
+            storage.journal.close()
+        if isinstance(storage.store, BinaryStore):
+            storage.store.close()
+    return report
@@ -0,0 +1,230 @@
+"""
+Streaming import and export of vault items, in CSV or JSONL
+"""
+import csv
+import json
+import os
+from itertools import islice
+from typing import IO, Callable, Iterable, Iterator, Optional
+
+from model.data import Vault, VaultItem
+
+BATCH_SIZE = 10_000
+FIELDS = ("name", "login", "password")
+
+# column names used by other password managers exports
+ALIASES = {
+    "name": ("name", "title"),
+    "login": ("login", "username", "login_username", "user", "email"),
+    "password": ("password", "login_password"),
+}
+
+
+def _column(header: list[str], field: str) -> str:
+    """
+    Find the CSV column holding a field
+
+    Arguments:
+        header -- CSV column names
+        field -- one of FIELDS
+
+    Raises:
+        ValueError: if no column matches
+
+    Returns:
+        column name
+    """
+    lowered = {column.strip().lower(): column for column in header}
+    for alias in ALIASES[field]:
+        if alias in lowered:
+            return lowered[alias]
+    raise ValueError(f"no {field} column")
+
+
+def read_csv(file: IO[str]) -> Iterator[VaultItem]:
+    """
+    Read items from CSV, one row at a time
+
+    Arguments:
+        file -- text file with a header row
+
+    Returns:
+        Iterator of VaultItems
+    """
+    reader = csv.DictReader(file)
+    columns = [_column(list(reader.fieldnames or []), field) for field in FIELDS]
+    for row in reader:
+        yield VaultItem(*(row[column] or "" for column in columns))
+
+
+def read_jsonl(file: IO[str]) -> Iterator[VaultItem]:
+    """
+    Read items from JSONL, one line at a time
+
+    Arguments:
+        file -- text file holding one JSON object per line
+
+    Raises:
+        ValueError: if a line is not an object with the item fields
+
+    Returns:
+        Iterator of VaultItems
+    """
+    for line in file:
+        if line.strip():
+            obj = json.loads(line)
+            try:
+                yield VaultItem(*(str(obj[field]) for field in FIELDS))
+            except (KeyError, TypeError) as error:
+                raise ValueError(f"invalid item: {line.strip()}") from error
+
+
+def write_csv(file: IO[str], items: Iterable[VaultItem]) -> int:
+    """
+    Write items as CSV
+
+    Arguments:
+        file -- text file
+        items -- items to write
+
+    Returns:
+        number of written items
+    """
+    writer = csv.writer(file)
+    writer.writerow(FIELDS)
+    count = 0
+    for item in items:
+        writer.writerow((item.name, item.login, item.password))
+        count += 1
+    return count
+
+
+def write_jsonl(file: IO[str], items: Iterable[VaultItem]) -> int:
+    """
+    Write items as JSONL
+
+    Arguments:
+        file -- text file
+        items -- items to write
+
+    Returns:
+        number of written items
+    """
+    count = 0
+    for item in items:
+        obj = {"name": item.name, "login": item.login, "password": item.password}
+        file.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def iter_items(vault: Vault) -> Iterator[VaultItem]:
+    """
+    Iterate over the items of a vault, sorted by name
+
+    Arguments:
+        vault -- vault to read
+
+    Returns:
+        Iterator of VaultItems
+    """
+    for name in vault.list_elements():
+        yield vault.elements[name]
+
+
+def import_items(
+    vault: Vault, items: Iterable[VaultItem], batch_size: int = BATCH_SIZE
+) -> tuple[int, int]:
+    """
+    Add items to a vault by batches, skipping duplicates
+
+    Arguments:
+        vault -- destination vault
+        items -- items to add
+
+    Keyword Arguments:
+        batch_size -- items added at once (default: {BATCH_SIZE})
+
+    Returns:
+        (number of imported items, number of skipped duplicates)
+    """
+    imported = skipped = 0
+    items = iter(items)
+    while batch := list(islice(items, batch_size)):
+        duplicates = vault.add_elements(batch, skip_duplicates=True)
+        imported += len(batch) - len(duplicates)
+        skipped += len(duplicates)
+    return imported, skipped
+
+
+def _format(filename: str) -> str:
+    """
+    Get format of a file from its extension
+
+    Arguments:
+        filename -- file path
+
+    Raises:
+        ValueError: if extension is neither .csv nor .jsonl
+
+    Returns:
+        "csv" or "jsonl"
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in (".csv", ".jsonl"):
+        raise ValueError(f"{filename}: unsupported format")
+    return extension[1:]
+
+
+def import_file(
+    vault: Vault,
+    filename: str,
+    convert: Optional[Callable[[VaultItem], VaultItem]] = None,
+) -> tuple[int, int]:
+    """
+    Import a CSV or JSONL file into a vault
+
+    Arguments:
+        vault -- destination vault
+        filename -- .csv or .jsonl file path
+
+    Keyword Arguments:
+        convert -- applied to each item before it is stored, e.g. to encrypt
+            it (default: {None})
+
+    Returns:
+        (number of imported items, number of skipped duplicates)
+    """
+    reader = read_csv if _format(filename) == "csv" else read_jsonl
+    with open(filename, encoding="utf-8", newline="") as file:
+        items = reader(file)
+        if convert is not None:
+            items = map(convert, items)
+        return import_items(vault, items)
+
+
+def export_file(
+    vault: Vault,
+    filename: str,
+    convert: Optional[Callable[[VaultItem], VaultItem]] = None,
+) -> int:
+    """
+    Export a vault to a CSV or JSONL file
+
+    Arguments:
+        vault -- vault to export
+        filename -- .csv or .jsonl file path
+
+    Keyword Arguments:
+        convert -- applied to each item before it is written, e.g. to decrypt
+            it (default: {None})
+
+    Returns:
+        number of exported items
+    """
+    writer = write_csv if _format(filename) == "csv" else write_jsonl
+    with open(filename, "w", encoding="utf-8", newline="") as file:
+        items = iter_items(vault)
+        if convert is not None:
+            items = map(convert, items)
+        return writer(file, items)
@@ -0,0 +1,146 @@
+"""
+Trigram index for substring and fuzzy search on names
+"""
+from collections import Counter
+from typing import Iterable
+
+FUZZY_THRESHOLD = 0.3
+
+
+def trigrams(text: str, padded: bool = True) -> set[str]:
+    """
+    Trigrams of a text, case insensitive
+
+    Arguments:
+        text -- text to split
+
+    Keyword Arguments:
+        padded -- add spaces around text, so its start and end weigh more
+            (default: {True})
+
+    Returns:
+        set of trigrams
+    """
+    text = text.lower()
+    if padded:
+        text = f"  {text} "
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def similarity(query: set[str], name: set[str]) -> float:
+    """
+    Jaccard similarity of two trigram sets
+
+    Arguments:
+        query -- trigrams of query
+        name -- trigrams of name
+
+    Returns:
+        similarity, from 0 to 1
+    """
+    if not query or not name:
+        return 0.0
+    shared = len(query & name)
+    return shared / (len(query) + len(name) - shared)
+
+
+class TrigramIndex:
+    """
+    Maps each trigram to the names holding it. Names are indexed padded, so
+    the index answers both substring and fuzzy queries.
+    """
+
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        """
+        Constructor
+
+        Keyword Arguments:
+            names -- names to index (default: {()})
+        """
+        self._postings: dict[str, set[str]] = {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str) -> None:
+        """
+        Index a name
+
+        Arguments:
+            name -- name to index
+        """
+        for trigram in trigrams(name):
+            self._postings.setdefault(trigram, set()).add(name)
+
+    def remove(self, name: str) -> None:
+        """
+        Remove a name from index
+
+        Arguments:
+            name -- indexed name
+        """
+        for trigram in trigrams(name):
+            names = self._postings[trigram]
+            names.discard(name)
+            if not names:
+                del self._postings[trigram]
+
+    def _rank(self, query: str, names: Iterable[str]) -> list[str]:
+        """
+        Sort names by decreasing similarity with query, then by name
+
+        Arguments:
+            query -- searched text
+            names -- names to sort
+
+        Returns:
+            sorted names
+        """
+        wanted = trigrams(query)
+        return sorted(
+            names, key=lambda name: (-similarity(wanted, trigrams(name)), name)
+        )
+
+    def substring(self, query: str, names: Iterable[str]) -> list[str]:
+        """
+        Find names containing query, case insensitive
+
+        Arguments:
+            query -- searched text
+            names -- every name, scanned only for queries shorter than a trigram
+
+        Returns:
+            matching names, most similar first
+        """
+        wanted = trigrams(query, padded=False)
+        lowered = query.lower()
+        if not wanted:
+            candidates: Iterable[str] = names
+        else:
+            postings = sorted(
+                (self._postings.get(trigram, set()) for trigram in wanted), key=len
+            )
+            candidates = set.intersection(*postings)
+        return self._rank(query, (n for n in candidates if lowered in n.lower()))
+
+    def fuzzy(self, query: str, threshold: float = FUZZY_THRESHOLD) -> list[str]:
+        """
+        Find names sharing enough trigrams with query
+
+        Arguments:
+            query -- searched text
+
+        Keyword Arguments:
+            threshold -- minimal share of the query trigrams found in a name
+                (default: {FUZZY_THRESHOLD})
+
+        Returns:
+            matching names, most similar first
+        """
+        wanted = trigrams(query)
+        shared = Counter(
+            name for trigram in wanted for name in self._postings.get(trigram, ())
+        )
+        minimum = threshold * len(wanted)
+        return self._rank(
+            query, (name for name, count in shared.items() if count >= minimum)
+        )
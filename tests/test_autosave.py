@@ -0,0 +1,172 @@
+"""
+Testing dirty tracking and autosave
+"""
+import os
+import time
+import pytest
+from model.autosave import AutoSaver
+from model.data import UserStorage, Vault, VaultItem
+from model.shards import ShardStore
+
+
+class TestDirty:
+    """
+    _summary_
+    """
+
+    @pytest.fixture
+    def dirname(self, tmp_path) -> str:
+        """
+        _summary_
+
+        Arguments:
+            tmp_path -- _description_
+
+        Returns:
+            _description_
+        """
+        dirname = str(tmp_path / "data")
+        storage = UserStorage()
+        storage.load(dirname, sharded=True)
+        storage.create_user("test", "test")
+        storage.create_user("toto", "toto")
+        storage.save(dirname)
+        return dirname
+
+    def test_vault_dirty(self):
+        """
+        _summary_
+        """
+        vault = Vault()
+        assert vault.dirty
+        vault.dirty = False
+        vault.add_element(VaultItem("item1", "it1", "1234"))
+        assert vault.dirty
+
+    def test_storage_dirty(self, dirname):
+        """
+        _summary_
+
+        Arguments:
+            dirname -- _description_
+        """
+        storage = UserStorage()
+        storage.load(dirname)
+        assert not storage.dirty
+        vault = storage.get_vault(storage.get_user("test"))
+        assert not storage.dirty and not vault.dirty
+        vault.add_element(VaultItem("item1", "it1", "1234"))
+        assert storage.dirty
+        storage.save(dirname)
+        assert not storage.dirty and not vault.dirty
+        storage.remove_user("toto", "toto")
+        assert storage.dirty
+
+    def test_clean_vaults_are_not_written(self, dirname):
+        """
+        _summary_
+
+        Arguments:
+            dirname -- _description_
+        """
+        storage = UserStorage()
+        storage.load(dirname)
+        storage.get_vault(storage.get_user("toto"))
+        storage.get_vault(storage.get_user("test")).add_element(
+            VaultItem("item1", "it1", "1234")
+        )
+        for login in ("test", "toto"):
+            os.remove(ShardStore(dirname).vault_path(login))
+        storage.save(dirname)
+        assert os.path.exists(ShardStore(dirname).vault_path("test"))
+        assert not os.path.exists(ShardStore(dirname).vault_path("toto"))
+
+    def test_failed_save_stays_dirty(self, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            tmp_path -- _description_
+        """
+        storage = UserStorage()
+        storage.create_user("test", "test")
+        with pytest.raises(OSError):
+            storage.save(str(tmp_path / "missing" / "data.dat"))
+        assert storage.dirty
+        assert storage.users[storage.get_user("test")].dirty
+
+    def test_compaction_keeps_concurrent_records(self, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            tmp_path -- _description_
+        """
+        filename = str(tmp_path / "data.dat")
+        storage = UserStorage()
+        storage.load(filename, journaled=True, journal_threshold=0)
+        storage.create_user("test", "test")
+        vault = storage.get_vault(storage.get_user("test"))
+        write_snapshot = storage._write_snapshot
+
+        def write_then_change(name):
+            write_snapshot(name)
+            vault.add_element(VaultItem("late", "it1", "1234"))
+
+        storage._write_snapshot = write_then_change
+        storage.save(filename)
+
+        storage = UserStorage()
+        storage.load(filename, journaled=True)
+        assert storage.get_vault(storage.get_user("test")).list_elements() == ["late"]
+
+
+class TestAutoSaver:
+    """
+    _summary_
+    """
+
+    def test_saves_when_dirty(self, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            tmp_path -- _description_
+        """
+        filename = str(tmp_path / "data.bin")
+        storage = UserStorage()
+        storage.load(filename, binary=True)
+        saver = AutoSaver(storage, filename, interval=0.01)
+        assert not saver.save_if_dirty()
+        saver.start()
+        storage.create_user("test", "test")
+        deadline = time.monotonic() + 5
+        while storage.dirty and time.monotonic() < deadline:
+            time.sleep(0.01)
+        saver.stop()
+        assert saver.error is None
+        storage.load(filename)
+        assert storage.get_user("test") is not None
+
+    def test_concurrent_changes(self, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            tmp_path -- _description_
+        """
+        filename = str(tmp_path / "data.bin")
+        storage = UserStorage()
+        storage.load(filename, binary=True)
+        storage.create_user("test", "test")
+        vault = storage.get_vault(storage.get_user("test"))
+        saver = AutoSaver(storage, filename, interval=0.001)
+        saver.start()
+        for i in range(2000):
+            vault.add_element(VaultItem(f"item{i}", "it", "1234"))
+        saver.stop()
+        storage.save(filename)
+        assert saver.error is None
+
+        storage.load(filename)
+        assert len(storage.get_vault(storage.get_user("test")).elements) == 2000
@@ -0,0 +1,116 @@
+"""
+Testing batch mode
+"""
+import io
+import json
+from model.data import UserStorage
+from view.batch import run
+
+COMMANDS = """\
+# comment, then a blank line
+
+create_user test "pass word"
+login test "pass word"
+{"id": "add", "op": "add_element", "args": ["item1", "it1", "1234"]}
+add_element item2 it2 5678
+add_element item1 it1 1234
+search_by_name item
+{"op": "get_element", "args": {"element_name": "item2"}}
+remove_user
+unknown
+"""
+
+
+class TestBatch:
+    """
+    _summary_
+    """
+
+    def test_run(self):
+        """
+        _summary_
+        """
+        storage = UserStorage()
+        output = io.StringIO()
+        failed = run(storage, io.StringIO(COMMANDS), output)
+        replies = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [reply["id"] for reply in replies] == [3, 4, "add", 6, 7, 8, 9, 10, 11]
+        assert [reply["ok"] for reply in replies] == [
+            True,
+            True,
+            True,
+            True,
+            False,
+            True,
+            True,
+            False,
+            False,
+        ]
+        assert replies[1]["result"] is True
+        assert replies[5]["result"] == ["item1", "item2"]
+        assert replies[6]["result"] == ["item2", "it2", "5678"]
+        assert failed == 3
+        vault = storage.get_vault(storage.get_user("test"))
+        assert vault.list_elements() == ["item1", "item2"]
+
+    def test_undo_and_history(self):
+        """
+        _summary_
+        """
+        storage = UserStorage()
+        commands = [
+            'create_user test "pass word"',
+            'login test "pass word"',
+            "add_element item1 it1 1234",
+            "add_element item2 it2 5678",
+            "remove_element item2",
+            "item_history item2",
+            "undo",
+            "undo",
+            "item_history item2",
+            "item_history item1",
+            "undo",
+            "undo",
+        ]
+        output = io.StringIO()
+        failed = run(storage, commands, output)
+        replies = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [reply["ok"] for reply in replies[4:]] == [
+            True,
+            True,
+            True,
+            True,
+            False,
+            True,
+            True,
+            False,
+        ]
+        assert replies[5]["result"] == [["item2", "it2", "5678"], ["", "", ""]]
+        assert replies[9]["result"] == [["item1", "it1", "1234"]]
+        assert failed == 2
+        vault = storage.get_vault(storage.get_user("test"))
+        assert vault.list_elements() == []
+
+    def test_apply_changes(self):
+        """
+        _summary_
+        """
+        storage = UserStorage()
+        changes = [["edit", "item1", "site1", "it1", "new"], ["remove", "item2"]]
+        commands = [
+            'create_user test "pass word"',
+            'login test "pass word"',
+            "add_element item1 it1 1234",
+            "add_element item2 it2 5678",
+            json.dumps({"op": "apply_changes", "args": [changes + [["remove", "x"]]]}),
+            json.dumps({"op": "apply_changes", "args": [changes]}),
+            "get_element site1",
+        ]
+        output = io.StringIO()
+        failed = run(storage, commands, output)
+        replies = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [reply["result"] for reply in replies[4:6]] == [False, True]
+        assert replies[6]["result"] == ["site1", "it1", "new"]
+        assert failed == 1
+        vault = storage.get_vault(storage.get_user("test"))
+        assert vault.list_elements() == ["site1"]
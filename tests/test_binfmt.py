@@ -0,0 +1,200 @@
+"""
+Testing binary format
+"""
+import pytest
+from model.binfmt import (
+    BinaryStore,
+    convert,
+    decode_item,
+    decode_user,
+    decode_vault,
+    encode_item,
+    encode_user,
+    encode_vault,
+    is_binary,
+)
+from model.data import User, UserStorage, Vault, VaultItem
+
+
+class TestRecords:
+    """
+    _summary_
+    """
+
+    def test_user(self):
+        """
+        _summary_
+        """
+        user = decode_user(encode_user(User("test", "test")), 0)
+        assert user.login == "test" and user.verify_password("test")
+
+    def test_item(self):
+        """
+        _summary_
+        """
+        item = decode_item(encode_item(VaultItem("é", "it1", "1234")), 0)
+        assert (item.name, item.login, item.password) == ("é", "it1", "1234")
+
+    def test_vault(self):
+        """
+        _summary_
+        """
+        vault = Vault()
+        for name in ("item2", "item1", "item3"):
+            vault.add_element(VaultItem(name, name, "1234"))
+        assert decode_vault(encode_vault(vault), 0).list_elements() == [
+            "item1",
+            "item2",
+            "item3",
+        ]
+
+
+class TestBinaryStorage:
+    """
+    _summary_
+    """
+
+    @pytest.fixture
+    def filename(self, tmp_path) -> str:
+        """
+        _summary_
+
+        Arguments:
+            tmp_path -- _description_
+
+        Returns:
+            _description_
+        """
+        filename = str(tmp_path / "data.bin")
+        storage = UserStorage()
+        storage.load(filename, binary=True)
+        for login in ("test", "toto"):
+            storage.create_user(login, login)
+            vault = storage.get_vault(storage.get_user(login))
+            for name in ("b", "a", "é", "c"):
+                vault.add_element(VaultItem(f"{login}-{name}", login, name))
+        storage.save(filename)
+        return filename
+
+    def test_is_binary(self, filename, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+            tmp_path -- _description_
+        """
+        assert is_binary(filename)
+        assert not is_binary(str(tmp_path / "missing"))
+
+    def test_vaults_are_lazy(self, filename):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+        """
+        storage = UserStorage()
+        storage.load(filename)
+        assert all(vault is None for vault in storage.users.values())
+        assert storage.get_user("toto").verify_password("toto")
+        assert storage.get_vault(storage.get_user("toto")).list_elements() == [
+            "toto-a",
+            "toto-b",
+            "toto-c",
+            "toto-é",
+        ]
+
+    def test_read_item(self, filename):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+        """
+        store = BinaryStore(filename)
+        store.load_users()
+        for name in ("a", "b", "c", "é"):
+            assert store.read_item("toto", f"toto-{name}").password == name
+        store.close()
+
+    @pytest.mark.xfail(raises=KeyError)
+    def test_read_missing_item(self, filename):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+        """
+        store = BinaryStore(filename)
+        store.load_users()
+        store.read_item("toto", "toto-d")
+
+    def test_save_copies_unloaded_vaults(self, filename):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+        """
+        storage = UserStorage()
+        storage.load(filename)
+        storage.get_vault(storage.get_user("test")).elements.pop("test-a")
+        storage.create_user("titi", "titi")
+        storage.save(filename)
+
+        storage.load(filename)
+        assert len(storage.users) == 3
+        assert "test-a" not in storage.get_vault(storage.get_user("test")).elements
+        assert len(storage.get_vault(storage.get_user("toto")).elements) == 4
+
+    def test_journaled(self, filename):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+        """
+        storage = UserStorage()
+        storage.load(filename, journaled=True, journal_threshold=0)
+        storage.remove_user("test", "test")
+        storage.save(filename)
+        storage.load(filename, journaled=True)
+        assert storage.get_user("test") is None and is_binary(filename)
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_bad_version(self, filename):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+        """
+        with open(filename, "r+b") as file:
+            file.seek(4)
+            file.write(b"\xff")
+        BinaryStore(filename)
+
+    def test_convert(self, filename, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+            tmp_path -- _description_
+        """
+        source = str(tmp_path / "data.dat")
+        storage = UserStorage()
+        storage.load(filename)
+        storage.save(source)
+        assert not is_binary(source)
+
+        destination = str(tmp_path / "converted.bin")
+        convert(source, destination)
+        storage.load(destination)
+        assert storage.get_vault(storage.get_user("test")).list_elements() == [
+            "test-a",
+            "test-b",
+            "test-c",
+            "test-é",
+        ]
@@ -0,0 +1,111 @@
+"""
+Testing offline breached password check
+"""
+from hashlib import sha1
+import io
+import json
+import pytest
+from model.breach import BloomFilter, BreachCorpus, build_filter, password_hash
+from model.data import UserStorage
+from view.batch import run
+
+PASSWORDS = [f"password{i}" for i in range(2000)]
+
+
+def write_corpus(path, lower: bool = False, counts: bool = True) -> str:
+    """
+    _summary_
+
+    Returns:
+        _description_
+    """
+    lines = []
+    for i, password in enumerate(PASSWORDS):
+        digest = sha1(password.encode()).hexdigest()
+        digest = digest if lower else digest.upper()
+        lines.append(f"{digest}:{i + 1}" if counts else digest)
+    path.write_bytes(("\r\n".join(sorted(lines)) + "\r\n").encode())
+    return str(path)
+
+
+class TestBreachCorpus:
+    """
+    _summary_
+    """
+
+    @pytest.mark.parametrize("lower", [False, True])
+    def test_breaches(self, tmp_path, lower):
+        """
+        _summary_
+        """
+        corpus = write_corpus(tmp_path / "corpus.txt", lower)
+        with BreachCorpus(corpus) as breaches:
+            assert breaches.filter is None
+            assert breaches.breaches("password0") == 1
+            assert breaches.breaches("password1999") == 2000
+            assert all(breaches.breaches(password) for password in PASSWORDS)
+            assert breaches.breaches("not breached") == 0
+            assert breaches.breaches("") == 0
+
+    def test_without_counts(self, tmp_path):
+        """
+        _summary_
+        """
+        corpus = write_corpus(tmp_path / "corpus.txt", counts=False)
+        with BreachCorpus(corpus) as breaches:
+            assert breaches.check(["password7", "password7", "other"]) == {
+                "password7": 1
+            }
+
+    def test_filter(self, tmp_path):
+        """
+        _summary_
+        """
+        corpus = write_corpus(tmp_path / "corpus.txt")
+        assert build_filter(corpus, corpus + ".bloom")[0] == len(PASSWORDS)
+        bloom = BloomFilter(corpus + ".bloom")
+        assert all(password_hash(password) in bloom for password in PASSWORDS)
+        bloom.close()
+        others = [f"other{i}" for i in range(2000)]
+        with BreachCorpus(corpus) as breaches:
+            assert breaches.filter is not None
+            assert breaches.check(others + ["password3"]) == {"password3": 4}
+            # the filter spares the corpus most lookups
+            assert breaches.lookups < 20
+
+    def test_bad_filter(self, tmp_path):
+        """
+        _summary_
+        """
+        corpus = write_corpus(tmp_path / "corpus.txt")
+        (tmp_path / "corpus.txt.bloom").write_bytes(b"not a filter")
+        with pytest.raises(ValueError):
+            BreachCorpus(corpus)
+
+    def test_empty_corpus(self, tmp_path):
+        """
+        _summary_
+        """
+        (tmp_path / "corpus.txt").write_bytes(b"")
+        with BreachCorpus(str(tmp_path / "corpus.txt")) as breaches:
+            assert breaches.breaches("password0") == 0
+
+    def test_audit_passwords(self, tmp_path):
+        """
+        _summary_
+        """
+        corpus = write_corpus(tmp_path / "corpus.txt")
+        build_filter(corpus, corpus + ".bloom")
+        commands = [
+            "create_user test test",
+            "login test test",
+            "add_element site1 it1 password41",
+            "add_element site2 it2 strong",
+            json.dumps({"op": "audit_passwords", "args": [corpus]}),
+            json.dumps({"op": "audit_passwords", "args": ["missing.txt"]}),
+        ]
+        output = io.StringIO()
+        run(UserStorage(), commands, output)
+        replies = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert replies[4]["ok"] and replies[4]["result"] == [["site1", 42]]
+        assert replies[5]["result"] == [] and not replies[5]["ok"]
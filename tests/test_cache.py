@@ -0,0 +1,215 @@
+"""
+Testing verification cache
+"""
+import pytest
+from controller.tui_controller import TuiController
+from model import crypto, kdf
+from model.cache import VerificationCache
+from model.data import User, UserStorage, VaultItem
+
+
+class TestVerificationCache:
+    """
+    _summary_
+    """
+
+    @pytest.fixture
+    def cache(self) -> VerificationCache:
+        """
+        _summary_
+
+        Returns:
+            _description_
+        """
+        return VerificationCache(ttl=60, size=2)
+
+    def test_check(self, cache):
+        """
+        _summary_
+
+        Arguments:
+            cache -- _description_
+        """
+        assert not cache.check("test", "test", "hash")
+        cache.add("test", "test", "hash")
+        assert cache.check("test", "test", "hash")
+        assert not cache.check("test", "toto", "hash")
+
+    def test_no_plaintext(self, cache):
+        """
+        _summary_
+
+        Arguments:
+            cache -- _description_
+        """
+        cache.add("test", "secret", "hash")
+        assert all(b"secret" not in key for key in cache._entries)
+
+    def test_changed_hash(self, cache):
+        """
+        _summary_
+
+        Arguments:
+            cache -- _description_
+        """
+        cache.add("test", "test", "hash")
+        assert not cache.check("test", "test", "other hash")
+        assert len(cache) == 0
+
+    def test_ttl(self, cache):
+        """
+        _summary_
+
+        Arguments:
+            cache -- _description_
+        """
+        cache.ttl = -1
+        cache.add("test", "test", "hash")
+        assert not cache.check("test", "test", "hash")
+
+    def test_lru(self, cache):
+        """
+        _summary_
+
+        Arguments:
+            cache -- _description_
+        """
+        cache.add("test", "test", "hash")
+        cache.add("toto", "toto", "hash")
+        cache.check("test", "test", "hash")
+        cache.add("titi", "titi", "hash")
+        assert cache.check("test", "test", "hash")
+        assert not cache.check("toto", "toto", "hash")
+
+    def test_invalidate(self, cache):
+        """
+        _summary_
+
+        Arguments:
+            cache -- _description_
+        """
+        cache.add("test", "test", "hash")
+        cache.add("test", "other", "hash")
+        cache.invalidate("test")
+        assert len(cache) == 0 and not cache.check("test", "test", "hash")
+
+    def test_derived_key(self, cache):
+        """
+        _summary_
+
+        Arguments:
+            cache -- _description_
+        """
+        key = bytes(range(64))
+        cache.keep_key("test", "test", "hash", key)
+        # no key without a checked password
+        assert cache.derived_key("test", "test", "hash") is None
+        cache.add("test", "test", "hash")
+        assert cache.derived_key("test", "test", "hash") is None
+        cache.keep_key("test", "test", "hash", key)
+        assert key not in cache._entries[cache._key("test", "test")][3]
+        assert cache.derived_key("test", "test", "hash") == key
+        assert cache.derived_key("test", "toto", "hash") is None
+        assert cache.derived_key("test", "test", "other hash") is None
+
+
+class TestCachedStorage:
+    """
+    _summary_
+    """
+
+    @pytest.fixture
+    def storage(self) -> UserStorage:
+        """
+        _summary_
+
+        Returns:
+            _description_
+        """
+        storage = UserStorage()
+        storage.kdf_params = (kdf.PBKDF2, 1000)
+        storage.verification_cache = VerificationCache()
+        storage.create_user("test", "test")
+        return storage
+
+    def test_authenticate_uses_cache(self, storage, monkeypatch):
+        """
+        _summary_
+
+        Arguments:
+            storage -- _description_
+            monkeypatch -- _description_
+        """
+        assert storage.authenticate("test", "test") is not None
+        monkeypatch.setattr(User, "verify_password", lambda *_: False)
+        assert storage.authenticate("test", "test") is not None
+        assert storage.authenticate("test", "toto") is None
+
+    def test_remove_user_invalidates(self, storage):
+        """
+        _summary_
+
+        Arguments:
+            storage -- _description_
+        """
+        storage.authenticate("test", "test")
+        assert storage.remove_user("test", "test")
+        assert len(storage.verification_cache) == 0
+        storage.create_user("test", "other")
+        assert storage.authenticate("test", "test") is None
+
+    def test_password_change_invalidates(self, storage):
+        """
+        _summary_
+
+        Arguments:
+            storage -- _description_
+        """
+        storage.authenticate("test", "test")
+        storage.get_user("test").password = kdf.hash_password("new", kdf.PBKDF2, 1000)
+        assert storage.authenticate("test", "test") is None
+        assert storage.authenticate("test", "new") is not None
+
+    def test_item_key_uses_cache(self, storage, monkeypatch):
+        """
+        _summary_
+
+        Arguments:
+            storage -- _description_
+            monkeypatch -- _description_
+        """
+        monkeypatch.setattr(crypto, "KEY_COST", kdf.MIN_COST[kdf.SCRYPT])
+        storage.authenticate("test", "test")
+        key = storage.item_key("test", "test")
+        assert key == crypto.derive_key("test", "test")
+        monkeypatch.setattr(crypto, "derive_key", lambda *_: b"")
+        assert storage.item_key("test", "test") == key
+
+    def test_login_encrypts_clear_passwords(self, storage, monkeypatch):
+        """
+        _summary_
+
+        Arguments:
+            storage -- _description_
+            monkeypatch -- _description_
+        """
+        monkeypatch.setattr(crypto, "KEY_COST", kdf.MIN_COST[kdf.SCRYPT])
+        vault = storage.get_vault(storage.get_user("test"))
+        vault.add_elements([VaultItem("item1", "it1", "1234")])
+        versions = vault.versions
+        controller = TuiController(None, storage)
+        assert controller.login("test", "test")
+        assert crypto.is_encrypted(vault.get_element("item1").password)
+        assert controller.show_details("item1") == ("item1", "it1", "1234")
+        # the migration is no version: no state of the item is in clear, undo
+        # reverts the add
+        assert vault.versions == versions and vault.encrypted
+        assert all(
+            crypto.is_encrypted(item.password) for item in vault.history("item1")
+        )
+        assert vault.undo() and "item1" not in vault.elements
+        # a password stored in clear makes the next login scan again
+        vault.add_element(VaultItem("item2", "it2", "5678"))
+        assert not vault.encrypted
+        assert controller.login("test", "test")
+        assert crypto.is_encrypted(vault.get_element("item2").password)
@@ -0,0 +1,91 @@
+"""
+Testing snapshot compression
+"""
+import io
+import os
+import pickle
+import pytest
+from model import compress
+from model.data import UserStorage, VaultItem
+from model.shards import USERS_FILE, ShardStore
+
+
+class TestCompress:
+    """
+    _summary_
+    """
+
+    @pytest.mark.parametrize("codec", [None, *compress.CODECS])
+    def test_round_trip(self, codec):
+        """
+        _summary_
+
+        Arguments:
+            codec -- _description_
+        """
+        obj = {"name": ["item"] * 1000}
+        file = io.BytesIO()
+        compress.dump(obj, file, codec)
+        if codec is not None:
+            assert len(file.getvalue()) < len(pickle.dumps(obj))
+        file.seek(0)
+        assert compress.load(file) == obj
+
+    def test_plain_pickle(self):
+        """
+        _summary_
+        """
+        assert compress.load(io.BytesIO(pickle.dumps([1, 2]))) == [1, 2]
+
+    def test_unknown_codec(self):
+        """
+        _summary_
+        """
+        with pytest.raises(ValueError):
+            compress.dump([], io.BytesIO(), "zip")
+        with pytest.raises(ValueError):
+            compress.load(io.BytesIO(compress.MAGIC + b"\xff"))
+
+    @pytest.mark.parametrize("codec", list(compress.CODECS))
+    def test_storage(self, tmp_path, codec):
+        """
+        _summary_
+
+        Arguments:
+            tmp_path -- _description_
+            codec -- _description_
+        """
+        filename = str(tmp_path / "data.dat")
+        storage = UserStorage()
+        storage.compression = codec
+        storage.create_user("test", "test")
+        storage.get_vault(storage.get_user("test")).add_element(
+            VaultItem("item1", "it1", "1234")
+        )
+        storage.save(filename)
+        assert compress.detect(filename) == codec
+
+        storage = UserStorage()
+        storage.load(filename)
+        vault = storage.get_vault(storage.get_user("test"))
+        assert vault.get_element("item1").password == "1234"
+
+    def test_shards(self, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            tmp_path -- _description_
+        """
+        dirname = str(tmp_path / "data")
+        storage = UserStorage()
+        storage.compression = "lzma"
+        storage.load(dirname, sharded=True)
+        storage.create_user("test", "test")
+        storage.save(dirname)
+        assert compress.detect(os.path.join(dirname, USERS_FILE)) == "lzma"
+        assert compress.detect(ShardStore(dirname).vault_path("test")) == "lzma"
+
+        storage = UserStorage()
+        storage.load(dirname)
+        assert storage.get_vault(storage.get_user("test")).list_elements() == []
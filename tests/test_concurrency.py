@@ -0,0 +1,112 @@
+"""
+Stress testing storage shared by many threads
+"""
+from concurrent.futures import ThreadPoolExecutor
+import random
+from model.data import DuplicateError, UserStorage, Vault, VaultItem
+
+THREADS = 16
+ROUNDS = 200
+
+
+def check_vault(vault: Vault) -> None:
+    """
+    Check vault indexes agree with its items
+
+    Arguments:
+        vault -- vault to check
+    """
+    assert vault._names == sorted(vault.elements)
+    by_login = {}
+    for name, item in vault.elements.items():
+        by_login.setdefault(item.login, set()).add(name)
+    assert vault._by_login == by_login
+
+
+class TestConcurrency:
+    """
+    _summary_
+    """
+
+    def test_shared_vault(self):
+        """
+        _summary_
+        """
+        vault = Vault()
+        vault.search_substring("item")
+
+        def session(n):
+            rng = random.Random(n)
+            for i in range(ROUNDS):
+                name = f"item{rng.randrange(ROUNDS)}"
+                try:
+                    vault.add_element(VaultItem(name, f"login{n % 3}", "1234"))
+                except DuplicateError:
+                    pass
+                vault.add_elements(
+                    [VaultItem(f"batch{n}-{i}", "batch", "1234")],
+                    skip_duplicates=True,
+                )
+                vault.search_by_name("item1")
+                vault.search_by_login("login1")
+                if i % 10 == 0:
+                    vault.search_substring("tem")
+                names = vault.page(10, name)
+                assert names == sorted(names)
+                if name in vault.elements and rng.random() < 0.3:
+                    try:
+                        vault.remove_element(vault.get_element(name))
+                    except KeyError:
+                        pass
+
+        with ThreadPoolExecutor(THREADS) as pool:
+            list(pool.map(session, range(THREADS)))
+        check_vault(vault)
+        assert len(vault.search_by_login("batch")) == THREADS * ROUNDS
+        assert {item.name for item in vault.search_substring("item")} == {
+            name for name in vault.elements if name.startswith("item")
+        }
+
+    def test_shared_storage(self, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            tmp_path -- _description_
+        """
+        filename = str(tmp_path / "data.bin")
+        storage = UserStorage()
+        storage.load(filename, journaled=True, journal_threshold=4096, binary=True)
+        created = []
+
+        def session(n):
+            login = f"user{n}"
+            assert storage.create_user(login, login)
+            created.append(storage.create_user("shared", str(n)))
+            user = storage.authenticate(login, login)
+            vault = storage.get_vault(user)
+            for i in range(ROUNDS):
+                vault.add_element(VaultItem(f"item{i}", login, "1234"))
+                if i % 50 == 0:
+                    storage.save(filename)
+            if n % 4 == 0:
+                assert storage.remove_user(login, login)
+                assert not storage.remove_user(login, login)
+
+        with ThreadPoolExecutor(THREADS) as pool:
+            list(pool.map(session, range(THREADS)))
+        storage.save(filename)
+        assert created.count(True) == 1
+        assert set(storage._logins) == {user.login for user in storage.users}
+
+        storage = UserStorage()
+        storage.load(filename, journaled=True)
+        for n in range(THREADS):
+            user = storage.get_user(f"user{n}")
+            if n % 4 == 0:
+                assert user is None
+                continue
+            vault = storage.get_vault(user)
+            check_vault(vault)
+            assert len(vault.elements) == ROUNDS
+        assert storage.get_user("shared") is not None
@@ -0,0 +1,91 @@
+"""
+Testing item encryption
+"""
+import os
+import pytest
+from model import kdf
+from model.crypto import ItemCipher, is_encrypted
+from model.data import VaultItem
+
+
+class TestItemCipher:
+    """
+    _summary_
+    """
+
+    @pytest.fixture
+    def cipher(self) -> ItemCipher:
+        """
+        _summary_
+
+        Returns:
+            _description_
+        """
+        return ItemCipher(os.urandom(64))
+
+    def test_round_trip(self, cipher):
+        """
+        _summary_
+
+        Arguments:
+            cipher -- _description_
+        """
+        for password in ("", "1234", "mot de passe très long " * 10):
+            encrypted = cipher.encrypt("item1", password)
+            assert is_encrypted(encrypted)
+            assert password == "" or password not in encrypted
+            assert cipher.decrypt("item1", encrypted) == password
+        assert cipher.encrypt("item1", "1234") != cipher.encrypt("item1", "1234")
+
+    def test_items(self, cipher):
+        """
+        _summary_
+
+        Arguments:
+            cipher -- _description_
+        """
+        item = cipher.encrypt_item(VaultItem("item1", "it1", "1234"))
+        assert (item.name, item.login) == ("item1", "it1")
+        assert is_encrypted(item.password)
+        assert cipher.decrypt_item(item).password == "1234"
+
+    def test_clear_password(self, cipher):
+        """
+        _summary_
+
+        Arguments:
+            cipher -- _description_
+        """
+        assert cipher.decrypt("item1", "1234") == "1234"
+
+    def test_rejected(self, cipher):
+        """
+        _summary_
+
+        Arguments:
+            cipher -- _description_
+        """
+        encrypted = cipher.encrypt("item1", "1234")
+        with pytest.raises(ValueError):
+            cipher.decrypt("item2", encrypted)
+        with pytest.raises(ValueError):
+            ItemCipher(os.urandom(64)).decrypt("item1", encrypted)
+        with pytest.raises(ValueError):
+            cipher.decrypt("item1", encrypted[:-4] + "AAA=")
+        with pytest.raises(ValueError):
+            cipher.decrypt("item1", encrypted[:12])
+
+    def test_from_password(self):
+        """
+        _summary_
+        """
+        cost = kdf.MIN_COST[kdf.SCRYPT]
+        cipher = ItemCipher.from_password("test", "test", cost)
+        encrypted = cipher.encrypt("item1", "1234")
+        same = ItemCipher.from_password("test", "test", cost)
+        assert same.decrypt("item1", encrypted) == "1234"
+        for login, password in (("toto", "test"), ("test", "toto")):
+            with pytest.raises(ValueError):
+                ItemCipher.from_password(login, password, cost).decrypt(
+                    "item1", encrypted
+                )
@@ -2,6 +2,7 @@
 Testing classes    
 """
 from hashlib import sha512
+import pickle
 import pytest
 from model.data import DuplicateError, User, UserStorage, Vault, VaultItem
 
@@ -83,6 +84,24 @@ class TestUser:
         """
         assert hash(user) == hash("test")
 
+    def test_eq(self, user):
+        """
+        _summary_
+
+        Arguments:
+            user -- _description_
+        """
+        assert user == User("test", "other")
+
+    def test_not_eq(self, user):
+        """
+        _summary_
+
+        Arguments:
+            user -- _description_
+        """
+        assert user != User("toto", "test") and user != "test"
+
 
 class TestVaultItem:
     """
@@ -100,6 +119,23 @@ class TestVaultItem:
             and vault_item.password == "test"
         )
 
+    def test_slots(self):
+        """
+        _summary_
+        """
+        assert not hasattr(VaultItem("test", "test", "test"), "__dict__")
+
+    def test_pickle(self):
+        """
+        _summary_
+        """
+        vault_item = pickle.loads(pickle.dumps(VaultItem("test", "it", "1234")))
+        assert (vault_item.name, vault_item.login, vault_item.password) == (
+            "test",
+            "it",
+            "1234",
+        )
+
 
 class TestVault:
     """
@@ -273,7 +309,50 @@ class TestVault:
         filled_vault.add_element(one_item)
         assert len(filled_vault.elements) == 3
 
-    @pytest.mark.xfail(raises=KeyError)
+    def test_add_elements(self, filled_vault, item4):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+            item4 -- _description_
+        """
+        assert filled_vault.add_elements([item4, VaultItem("item0", "it0", "1")]) == []
+        assert filled_vault.list_elements() == [
+            "item0",
+            "item1",
+            "item2",
+            "item3",
+            "item4",
+        ]
+
+    def test_add_elements_duplicates(self, filled_vault, one_item, item4):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+            one_item -- _description_
+            item4 -- _description_
+        """
+        with pytest.raises(DuplicateError):
+            filled_vault.add_elements([item4, one_item])
+        assert len(filled_vault.elements) == 3
+
+    def test_add_elements_skip_duplicates(self, filled_vault, one_item, item4):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+            one_item -- _description_
+            item4 -- _description_
+        """
+        skipped = filled_vault.add_elements([item4, one_item, item4], True)
+        assert skipped == ["item3", "item4"]
+        assert filled_vault.elements["item4"] == item4
+        assert len(filled_vault.elements) == 4
+
     def test_edit_element(self, filled_vault, one_item, item4):
         """
         _summary_
@@ -289,7 +368,6 @@ class TestVault:
             and one_item.name not in filled_vault.elements
         )
 
-    @pytest.mark.xfail(raises=KeyError)
     def test_remove_element(self, filled_vault, one_item):
         """
         _summary_
@@ -347,6 +425,267 @@ class TestVault:
         """
         assert filled_vault.search_by_name("test") == []
 
+    def test_list_elements_after_add(self, empty_vault, items):
+        """
+        _summary_
+
+        Arguments:
+            empty_vault -- _description_
+            items -- _description_
+        """
+        for i in items:
+            empty_vault.add_element(i)
+        assert empty_vault.list_elements() == ["item1", "item2", "item3"]
+
+    def test_list_elements_after_delete(self, filled_vault):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+        """
+        del filled_vault.elements["item2"]
+        assert filled_vault.list_elements() == ["item1", "item3"]
+        assert filled_vault.search_by_name("item2") == []
+
+    def test_search_by_name_prefix_bounds(self, filled_vault, item4):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+            item4 -- _description_
+        """
+        filled_vault.add_element(VaultItem("a", "a", "a"))
+        filled_vault.add_element(VaultItem("z", "z", "z"))
+        filled_vault.add_element(item4)
+        names = [it.name for it in filled_vault.search_by_name("item")]
+        assert names == ["item1", "item2", "item3", "item4"]
+
+    def test_search_by_name_empty_query(self, filled_vault):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+        """
+        assert len(filled_vault.search_by_name("")) == 3
+
+    def test_search_by_login(self, filled_vault, item4):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+            item4 -- _description_
+        """
+        filled_vault.add_element(VaultItem("item0", "it4", "1234"))
+        filled_vault.add_elements([item4, VaultItem("item5", "it4", "1234")])
+        names = [it.name for it in filled_vault.search_by_login("it4")]
+        assert names == ["item0", "item4", "item5"]
+
+    def test_search_by_login_after_delete(self, filled_vault):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+        """
+        del filled_vault.elements["item1"]
+        filled_vault.elements["item2"] = VaultItem("item2", "it1", "1234")
+        assert filled_vault.search_by_login("it2") == []
+        assert [it.name for it in filled_vault.search_by_login("it1")] == ["item2"]
+
+    def test_iter_names(self, filled_vault):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+        """
+        assert list(filled_vault.iter_names()) == ["item1", "item2", "item3"]
+        assert list(filled_vault.iter_names("item1")) == ["item2", "item3"]
+        assert list(filled_vault.iter_names("item10")) == ["item2", "item3"]
+
+    def test_page(self, filled_vault, item4):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+            item4 -- _description_
+        """
+        first = filled_vault.page(2)
+        assert first == ["item1", "item2"]
+        filled_vault.add_element(item4)
+        del filled_vault.elements["item1"]
+        assert filled_vault.page(2, first[-1]) == ["item3", "item4"]
+        assert filled_vault.page(2, "item4") == []
+
+    def test_pickle_rebuilds_index(self, filled_vault):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+        """
+        vault = pickle.loads(pickle.dumps(filled_vault))
+        assert vault.list_elements() == ["item1", "item2", "item3"]
+        assert type(vault.__getstate__()["elements"]) is dict
+
+    def test_undo(self, filled_vault, one_item, item4):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+            one_item -- _description_
+            item4 -- _description_
+        """
+        assert not filled_vault.undo()
+        filled_vault.add_element(item4)
+        filled_vault.remove_element(one_item)
+        assert filled_vault.versions == 3
+        assert filled_vault.undo()
+        assert filled_vault.list_elements() == ["item1", "item2", "item3", "item4"]
+        assert filled_vault.undo()
+        assert filled_vault.list_elements() == ["item1", "item2", "item3"]
+        assert not filled_vault.undo()
+        assert filled_vault.search_by_login("it4") == []
+
+    def test_history(self, filled_vault, one_item):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+            one_item -- _description_
+        """
+        assert filled_vault.history("item3") == [one_item]
+        assert filled_vault.history("item9") == []
+        edited = VaultItem("item3", "new", "5678")
+        filled_vault.remove_element(one_item)
+        filled_vault.add_element(edited)
+        filled_vault.remove_element(edited)
+        assert filled_vault.history("item3") == [one_item, None, edited, None]
+        assert filled_vault.history("item1") == [filled_vault.elements["item1"]]
+
+    def test_version(self, filled_vault, one_item, item4):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+            one_item -- _description_
+            item4 -- _description_
+        """
+        filled_vault.add_element(item4)
+        first = filled_vault.version(0)
+        filled_vault.remove_element(one_item)
+        assert first.names() == ["item1", "item2", "item3"]
+        assert first.get("item4") is None
+        assert filled_vault.version(1).get("item4") == item4
+        assert filled_vault.version().names() == ["item1", "item2", "item4"]
+        assert filled_vault.version().get("item3") is None
+
+    def test_bulk_history(self, empty_vault, item4):
+        """
+        _summary_
+
+        Arguments:
+            empty_vault -- _description_
+            item4 -- _description_
+        """
+        empty_vault.add_elements(VaultItem(f"item{i}", "it", "1") for i in range(3))
+        # a bulk add can be undone, even as the first change of a vault
+        assert empty_vault.versions == 2 and empty_vault.undo()
+        assert empty_vault.list_elements() == [] and not empty_vault.undo()
+        empty_vault.add_elements(VaultItem(f"item{i}", "it", "1") for i in range(3))
+        empty_vault.remove_element(empty_vault.elements["item1"])
+        empty_vault.add_elements([VaultItem("item1", "it", "2"), item4])
+        assert empty_vault.version(0).names() == []
+        assert empty_vault.version(1).names() == ["item0", "item1", "item2"]
+        assert empty_vault.version(2).get("item4") is None
+        assert empty_vault.version(3).get("item1").password == "2"
+        empty_vault.edit_element(item4, VaultItem("item4", "it", "new"))
+        assert empty_vault.version(3).get("item4") is item4
+        assert empty_vault.history("item1")[1:] == [None, empty_vault.elements["item1"]]
+        assert empty_vault.undo() and empty_vault.undo()
+        assert empty_vault.list_elements() == ["item0", "item2"]
+        assert empty_vault.undo()
+        assert empty_vault.list_elements() == ["item0", "item1", "item2"]
+        assert empty_vault.undo() and empty_vault.list_elements() == []
+
+    def test_edit_element_duplicate(self, filled_vault, one_item):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+            one_item -- _description_
+        """
+        with pytest.raises(DuplicateError):
+            filled_vault.edit_element(one_item, VaultItem("item1", "it", "1234"))
+        assert filled_vault.get_element("item3") is one_item
+        renamed = VaultItem("item3", "new", "5678")
+        filled_vault.edit_element(one_item, renamed)
+        assert filled_vault.get_element("item3") is renamed
+        assert filled_vault.search_by_login("new") == [renamed]
+
+    def test_transaction(self, filled_vault, item4):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+            item4 -- _description_
+        """
+        versions = filled_vault.versions
+        with filled_vault.transaction() as transaction:
+            transaction.edit("item1", VaultItem("item5", "it1", "1234"))
+            transaction.edit("item5", VaultItem("item6", "it1", "1234"))
+            transaction.edit("item2", VaultItem("item2", "it2", "5678"))
+            transaction.remove("item3")
+            transaction.add(item4)
+            transaction.add(VaultItem("item3", "it3", "new"))
+        assert filled_vault.list_elements() == ["item2", "item3", "item4", "item6"]
+        assert filled_vault.get_element("item2").password == "5678"
+        assert filled_vault.get_element("item3").password == "new"
+        assert filled_vault.search_by_login("it1")[0].name == "item6"
+        assert filled_vault.search_by_name("item") == [
+            filled_vault.elements[name] for name in filled_vault.list_elements()
+        ]
+        # one version for the whole transaction
+        assert filled_vault.versions == versions + 2
+        assert filled_vault.undo()
+        assert filled_vault.list_elements() == ["item1", "item2", "item3"]
+
+    def test_transaction_all_or_nothing(self, filled_vault, item4):
+        """
+        _summary_
+
+        Arguments:
+            filled_vault -- _description_
+            item4 -- _description_
+        """
+        transaction = filled_vault.transaction()
+        transaction.add(item4)
+        transaction.remove("item1")
+        transaction.remove("item1")
+        with pytest.raises(KeyError):
+            transaction.commit()
+        transaction = filled_vault.transaction()
+        transaction.add(item4)
+        transaction.edit("item1", VaultItem("item2", "it", "1234"))
+        with pytest.raises(DuplicateError):
+            transaction.commit()
+        with pytest.raises(ValueError):
+            with filled_vault.transaction() as transaction:
+                transaction.add(item4)
+                raise ValueError()
+        assert filled_vault.list_elements() == ["item1", "item2", "item3"]
+        assert filled_vault.versions == 0
+
 
 class TestUserStorage:
     """
@@ -438,6 +777,69 @@ class TestUserStorage:
         """
         pass
 
+    def test_load_legacy_pickle(self, storage, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            storage -- _description_
+            tmp_path -- _description_
+        """
+        # written by the first, __dict__ based, version of the classes
+        legacy = (
+            b"\x80\x04\x95\x1a\x01\x00\x00\x00\x00\x00\x00}\x94\x8c\nmodel.dat"
+            b"a\x94\x8c\x04User\x94\x93\x94)\x81\x94}\x94(\x8c\x05login"
+            b"\x94\x8c\x04test\x94\x8c\x08password\x94\x8c\x80ee2"
+            b"6b0dd4af7e749aa1a8ee3c10"
+            b"ae9923f618980772e473f881"
+            b"9a5d4940e0db27ac185f8a0e"
+            b"1d5f84f88bc887fd67b14373"
+            b"2c304cc5fa9ad8e6f57f5002"
+            b"8a8ff\x94ubh\x01\x8c\x05Vault\x94\x93\x94)\x81\x94}"
+            b"\x94\x8c\x08elements\x94}\x94\x8c\x05item1\x94h\x01"
+            b"\x8c\tVaultItem\x94\x93\x94)\x81\x94}\x94(\x8c\x04na"
+            b"me\x94h\x10h\x06\x8c\x03it1\x94h\x08\x8c\x041234\x94ub"
+            b"ssbs."
+        )
+        (tmp_path / "data.dat").write_bytes(legacy)
+        storage.load(str(tmp_path / "data.dat"))
+        user = storage.get_user("test")
+        assert user.verify_password("test")
+        assert storage.get_vault(user).get_element("item1").login == "it1"
+
+    def test_load_in_background(self, full_storage, user, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            full_storage -- _description_
+            user -- _description_
+            tmp_path -- _description_
+        """
+        filename = str(tmp_path / "data.bin")
+        full_storage.save(filename)
+        storage = UserStorage()
+        storage.load_in_background(filename, journaled=True)
+        storage.save(filename)
+        storage.wait_loaded()
+        assert storage.get_vault(storage.get_user(user.login)).list_elements() == [
+            "item1",
+            "item2",
+        ]
+
+    def test_load_in_background_error(self, storage, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            storage -- _description_
+            tmp_path -- _description_
+        """
+        (tmp_path / "data.dat").write_bytes(b"not a pickle")
+        storage.load_in_background(str(tmp_path / "data.dat"))
+        with pytest.raises(pickle.UnpicklingError):
+            storage.wait_loaded()
+
     def test_save(self, storage):
         """
         _summary_
@@ -485,6 +887,27 @@ class TestUserStorage:
         assert full_storage.remove_user("toto", "toto") is False
         assert len(full_storage.users) == 1
 
+    def test_get_user_after_remove(self, full_storage):
+        """
+        _summary_
+
+        Arguments:
+            full_storage -- _description_
+        """
+        full_storage.remove_user("test", "test")
+        assert full_storage.get_user("test") is None
+
+    def test_get_user_after_create(self, storage):
+        """
+        _summary_
+
+        Arguments:
+            storage -- _description_
+        """
+        storage.create_user("toto", "toto")
+        user = storage.get_user("toto")
+        assert user is not None and user.verify_password("toto")
+
     def test_create_user(self, storage):
         """
         _summary_
@@ -0,0 +1,112 @@
+"""
+Testing persistent map
+"""
+import random
+from model.hamt import PersistentMap
+
+
+class Colliding:
+    """
+    Key whose hash collides with other keys
+    """
+
+    def __init__(self, name: str, key_hash: int) -> None:
+        self.name = name
+        self.key_hash = key_hash
+
+    def __hash__(self) -> int:
+        return self.key_hash
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Colliding) and self.name == other.name
+
+    def __repr__(self) -> str:
+        return f"Colliding({self.name!r})"
+
+
+class TestPersistentMap:
+    """
+    _summary_
+    """
+
+    def test_set_get_delete(self):
+        """
+        _summary_
+        """
+        empty = PersistentMap()
+        one = empty.set("a", 1)
+        two = one.set("b", 2)
+        assert len(empty) == 0 and "a" not in empty
+        assert one.get("a") == 1 and one.get("b") is None
+        assert dict(two.items()) == {"a": 1, "b": 2}
+        assert dict(two.delete("a").items()) == {"b": 2}
+        assert dict(two.items()) == {"a": 1, "b": 2}
+        assert len(two.delete("a").delete("b")) == 0
+
+    def test_unchanged(self):
+        """
+        _summary_
+        """
+        value = object()
+        mapping = PersistentMap([("a", value)])
+        assert mapping.set("a", value) is mapping
+        assert mapping.delete("missing") is mapping
+
+    def test_versions(self):
+        """
+        _summary_
+        """
+        versions = [PersistentMap()]
+        for i in range(1000):
+            versions.append(versions[-1].set(f"key{i}", i))
+        for i in (0, 10, 500, 1000):
+            assert len(versions[i]) == i
+            assert f"key{i}" not in versions[i]
+            if i:
+                assert versions[i].get(f"key{i - 1}") == i - 1
+
+    def test_against_dict(self):
+        """
+        _summary_
+        """
+        rng = random.Random(0)
+        keys = [f"key{i}" for i in range(300)]
+        keys += [Colliding(f"c{i}", rng.randrange(4)) for i in range(40)]
+        keys += [Colliding(f"d{i}", 1 << 40) for i in range(3)]
+        mapping, expected = PersistentMap(), {}
+        for step in range(5000):
+            key = rng.choice(keys)
+            if rng.random() < 0.4:
+                mapping = mapping.delete(key)
+                expected.pop(key, None)
+            else:
+                mapping = mapping.set(key, step)
+                expected[key] = step
+            assert len(mapping) == len(expected)
+        assert dict(mapping.items()) == expected
+        built = PersistentMap(expected.items())
+        assert len(built) == len(expected)
+        assert dict(built.delete(keys[0]).set(keys[-1], -1).items()) == {
+            **{key: value for key, value in expected.items() if key != keys[0]},
+            keys[-1]: -1,
+        }
+        for key in keys:
+            assert mapping.get(key, None) == expected.get(key)
+        for key in list(expected):
+            mapping = mapping.delete(key)
+        assert len(mapping) == 0 and list(mapping) == []
+
+    def test_update(self):
+        """
+        _summary_
+        """
+        small = PersistentMap([("a", 1), ("b", 2), ("c", 3)])
+        assert dict(small.update({"a": 0, "d": 4}).items()) == {
+            "a": 0,
+            "b": 2,
+            "c": 3,
+            "d": 4,
+        }
+        large = {f"key{i}": i for i in range(100)}
+        assert dict(small.update(large).items()) == {**dict(small.items()), **large}
+        assert dict(small.items()) == {"a": 1, "b": 2, "c": 3}
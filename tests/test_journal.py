@@ -0,0 +1,227 @@
+"""
+Testing journal
+"""
+import os
+import pytest
+from controller.tui_controller import TuiController
+from model.data import UserStorage, VaultItem
+from model.journal import Journal
+
+
+class TestJournal:
+    """
+    _summary_
+    """
+
+    @pytest.fixture
+    def journal(self, tmp_path) -> Journal:
+        """
+        _summary_
+
+        Arguments:
+            tmp_path -- _description_
+
+        Returns:
+            _description_
+        """
+        return Journal(str(tmp_path / "data.dat.journal"), threshold=64)
+
+    def test_replay(self, journal):
+        """
+        _summary_
+
+        Arguments:
+            journal -- _description_
+        """
+        journal.append(("del", "test", "item1"))
+        journal.append(("deluser", "test"))
+        assert list(journal.replay()) == [("del", "test", "item1"), ("deluser", "test")]
+
+    def test_partial_record_is_dropped(self, journal):
+        """
+        _summary_
+
+        Arguments:
+            journal -- _description_
+        """
+        journal.append(("deluser", "test"))
+        journal.close()
+        with open(journal.filename, "ab") as file:
+            file.write(b"\x20\x00\x00\x00abc")
+        reopened = Journal(journal.filename)
+        reopened.append(("deluser", "toto"))
+        assert list(reopened.replay()) == [("deluser", "test"), ("deluser", "toto")]
+
+    def test_needs_compaction(self, journal):
+        """
+        _summary_
+
+        Arguments:
+            journal -- _description_
+        """
+        assert not journal.needs_compaction()
+        journal.append(("set", "test", VaultItem("item1", "it1", "1234")))
+        assert journal.needs_compaction()
+
+    def test_truncate(self, journal):
+        """
+        _summary_
+
+        Arguments:
+            journal -- _description_
+        """
+        journal.append(("deluser", "test"))
+        journal.truncate()
+        assert journal.size == 0 and list(journal.replay()) == []
+
+
+class TestJournaledStorage:
+    """
+    _summary_
+    """
+
+    @pytest.fixture
+    def filename(self, tmp_path) -> str:
+        """
+        _summary_
+
+        Arguments:
+            tmp_path -- _description_
+
+        Returns:
+            _description_
+        """
+        return str(tmp_path / "data.dat")
+
+    def reload(self, filename) -> UserStorage:
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+
+        Returns:
+            _description_
+        """
+        storage = UserStorage()
+        storage.load(filename, journaled=True)
+        return storage
+
+    def test_save_appends_only(self, filename):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+        """
+        storage = self.reload(filename)
+        storage.create_user("test", "test")
+        storage.save(filename)
+        assert not os.path.exists(filename)
+        assert self.reload(filename).get_user("test") is not None
+
+    def test_replay_vault_mutations(self, filename):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+        """
+        storage = self.reload(filename)
+        storage.create_user("test", "test")
+        vault = storage.get_vault(storage.get_user("test"))
+        vault.add_element(VaultItem("item1", "it1", "1234"))
+        vault.add_element(VaultItem("item2", "it2", "1234"))
+        del vault.elements["item1"]
+        storage.save(filename)
+
+        vault = self.reload(filename).get_vault(storage.get_user("test"))
+        assert vault.list_elements() == ["item2"]
+
+    def test_replay_remove_user(self, filename):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+        """
+        storage = self.reload(filename)
+        storage.create_user("test", "test")
+        storage.remove_user("test", "test")
+        storage.save(filename)
+        assert self.reload(filename).users == {}
+
+    def test_compaction(self, filename):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+        """
+        storage = UserStorage()
+        storage.load(filename, journaled=True, journal_threshold=0)
+        storage.create_user("test", "test")
+        storage.save(filename)
+        assert os.path.exists(filename)
+        assert os.path.getsize(filename + ".journal") == 0
+        assert self.reload(filename).get_user("test") is not None
+
+    def test_replay_after_compaction_is_idempotent(self, filename):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+        """
+        storage = self.reload(filename)
+        storage.create_user("test", "test")
+        vault = storage.get_vault(storage.get_user("test"))
+        vault.add_element(VaultItem("item1", "it1", "1234"))
+        storage.journal.flush()
+        # crash between snapshot and journal truncation
+        storage._write_snapshot(filename)
+
+        vault = self.reload(filename).get_vault(storage.get_user("test"))
+        assert vault.list_elements() == ["item1"]
+
+    def test_transaction_is_one_record(self, filename):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+        """
+        storage = self.reload(filename)
+        storage.create_user("test", "test")
+        user = storage.get_user("test")
+        storage.get_vault(user).add_element(VaultItem("item1", "it1", "1234"))
+        size = storage.journal.size
+        with storage.transaction(user) as transaction:
+            transaction.edit("item1", VaultItem("renamed", "it1", "5678"))
+            transaction.add(VaultItem("item2", "it2", "1234"))
+        records = list(Journal(filename + ".journal").replay())
+        assert records[-1][0] == "batch" and len(records[-1][1]) == 3
+        # flushed at commit, without save: a crash now loses nothing
+        assert os.path.getsize(filename + ".journal") > size
+
+        vault = self.reload(filename).get_vault(user)
+        assert vault.list_elements() == ["item2", "renamed"]
+        assert vault.get_element("renamed").password == "5678"
+
+    def test_controller_edit_is_one_record(self, filename):
+        """
+        _summary_
+
+        Arguments:
+            filename -- _description_
+        """
+        storage = self.reload(filename)
+        storage.create_user("test", "test")
+        user = storage.get_user("test")
+        controller = TuiController(None, storage)
+        controller.vault = storage.get_vault(user)
+        controller.vault.add_element(VaultItem("item1", "it1", "1234"))
+        controller.edit_element("item1", "renamed", "it1", "5678")
+        records = list(Journal(filename + ".journal").replay())
+        assert records[-1][0] == "batch" and len(records[-1][1]) == 2
+        assert self.reload(filename).get_vault(user).list_elements() == ["renamed"]
@@ -0,0 +1,122 @@
+"""
+Testing key derivation
+"""
+from hashlib import sha512
+import pytest
+from model import kdf
+from model.data import User, UserStorage
+
+
+@pytest.fixture(scope="module", autouse=True)
+def pool():
+    """
+    _summary_
+    """
+    yield
+    kdf.shutdown_pool()
+
+
+class TestKdf:
+    """
+    _summary_
+    """
+
+    @pytest.mark.parametrize("scheme,cost", [(kdf.PBKDF2, 1000), (kdf.SCRYPT, 1024)])
+    def test_hash_and_verify(self, scheme, cost):
+        """
+        _summary_
+
+        Arguments:
+            scheme -- _description_
+            cost -- _description_
+        """
+        encoded = kdf.hash_password("test", scheme, cost)
+        assert encoded.startswith(f"${scheme}${cost}$")
+        assert kdf.verify("test", encoded) and not kdf.verify("toto", encoded)
+
+    def test_salted(self):
+        """
+        _summary_
+        """
+        assert kdf.hash_password("test", kdf.PBKDF2, 1000) != kdf.hash_password(
+            "test", kdf.PBKDF2, 1000
+        )
+
+    def test_legacy(self):
+        """
+        _summary_
+        """
+        encoded = sha512("test".encode("utf-8")).hexdigest()
+        assert kdf.hash_password("test") == encoded
+        assert kdf.verify("test", encoded) and not kdf.is_slow(encoded)
+
+    def test_host_cost(self, tmp_path):
+        """
+        _summary_
+        """
+        filename = str(tmp_path / "kdf.cost")
+        calibration = kdf.host_cost(filename, kdf.SCRYPT)
+        storage = UserStorage()
+        storage.kdf_params = (kdf.SCRYPT, calibration)
+        scheme, cost = storage.kdf_params
+        assert scheme == kdf.SCRYPT and cost >= kdf.DEFAULT_COST[kdf.SCRYPT]
+        # kept: the next launch does not calibrate again
+        assert kdf.host_cost(filename, kdf.SCRYPT) == cost
+
+    def test_verify_many(self):
+        """
+        _summary_
+        """
+        encoded = kdf.hash_password("test", kdf.PBKDF2, 1000)
+        legacy = kdf.hash_password("test")
+        assert kdf.verify_many(
+            [("test", encoded), ("toto", encoded), ("test", legacy)]
+        ) == [True, False, True]
+
+    def test_submit_hash(self):
+        """
+        _summary_
+        """
+        encoded = kdf.submit_hash("test", kdf.PBKDF2, 1000).result()
+        assert kdf.submit_verify("test", encoded).result()
+        assert kdf.submit_hash("test").result() == kdf.hash_password("test")
+
+    def test_calibrate(self):
+        """
+        _summary_
+        """
+        assert kdf.calibrate(kdf.PBKDF2, 0.01) >= kdf.MIN_COST[kdf.PBKDF2]
+
+
+class TestUserKdf:
+    """
+    _summary_
+    """
+
+    def test_user_scheme(self):
+        """
+        _summary_
+        """
+        user = User("test", "test", kdf.SCRYPT, 1024)
+        assert user.verify_password("test") and not user.verify_password("toto")
+
+    def test_storage_kdf_params(self):
+        """
+        _summary_
+        """
+        storage = UserStorage()
+        storage.kdf_params = (kdf.PBKDF2, 1000)
+        storage.create_user("test", "test")
+        assert storage.get_user("test").password.startswith(f"${kdf.PBKDF2}$1000$")
+
+    def test_verify_many(self):
+        """
+        _summary_
+        """
+        storage = UserStorage()
+        storage.kdf_params = (kdf.PBKDF2, 1000)
+        storage.create_user("test", "test")
+        storage.create_user("toto", "toto")
+        assert storage.verify_many(
+            [("test", "test"), ("titi", "titi"), ("toto", "test"), ("toto", "toto")]
+        ) == [True, False, False, True]
@@ -0,0 +1,88 @@
+"""
+Testing readers-writer lock
+"""
+from threading import Barrier, Thread
+import time
+from model.rwlock import RWLock
+
+
+class TestRWLock:
+    """
+    _summary_
+    """
+
+    def test_shared_readers(self):
+        """
+        _summary_
+        """
+        lock = RWLock()
+        barrier = Barrier(3, timeout=5)
+
+        def reader():
+            with lock.read():
+                barrier.wait()
+
+        threads = [Thread(target=reader) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        with lock.read():
+            barrier.wait()
+        for thread in threads:
+            thread.join()
+
+    def test_writer_excludes_readers(self):
+        """
+        _summary_
+        """
+        lock = RWLock()
+        seen = []
+
+        def reader():
+            with lock.read():
+                seen.append("read")
+
+        with lock.write():
+            thread = Thread(target=reader)
+            thread.start()
+            time.sleep(0.05)
+            seen.append("write")
+        thread.join()
+        assert seen == ["write", "read"]
+
+    def test_waiting_writer_goes_first(self):
+        """
+        _summary_
+        """
+        lock = RWLock()
+        seen = []
+
+        def writer():
+            with lock.write():
+                seen.append("write")
+
+        def reader():
+            with lock.read():
+                seen.append("read")
+
+        with lock.read():
+            first = Thread(target=writer)
+            first.start()
+            time.sleep(0.05)
+            second = Thread(target=reader)
+            second.start()
+            time.sleep(0.05)
+        first.join()
+        second.join()
+        assert seen == ["write", "read"]
+
+    def test_writer_reenters(self):
+        """
+        _summary_
+        """
+        lock = RWLock()
+        with lock.write():
+            with lock.write():
+                with lock.read():
+                    pass
+        with lock.read():
+            pass
@@ -0,0 +1,148 @@
+"""
+Testing socket server
+"""
+import asyncio
+import json
+import pytest
+from model.crypto import is_encrypted
+from model.data import UserStorage
+from view.server import Server
+
+
+async def exchange(address: str, *requests: dict) -> list[dict]:
+    """
+    Send requests on one connection
+
+    Arguments:
+        address -- socket path
+
+    Returns:
+        replies
+    """
+    reader, writer = await asyncio.open_unix_connection(address)
+    replies = []
+    for request in requests:
+        line = request if isinstance(request, bytes) else json.dumps(request).encode()
+        writer.write(line + b"\n")
+        await writer.drain()
+        replies.append(json.loads(await reader.readline()))
+    writer.close()
+    await writer.wait_closed()
+    return replies
+
+
+class TestServer:
+    """
+    _summary_
+    """
+
+    @pytest.fixture
+    def storage(self) -> UserStorage:
+        """
+        _summary_
+
+        Returns:
+            _description_
+        """
+        storage = UserStorage()
+        storage.create_user("test", "test")
+        storage.create_user("toto", "toto")
+        return storage
+
+    def run(self, storage, address, *sessions):
+        """
+        Serve storage while sessions run concurrently
+
+        Returns:
+            replies of each session
+        """
+
+        async def main():
+            server = Server(storage)
+            await server.start(address)
+            try:
+                return await asyncio.gather(
+                    *(exchange(address, *session) for session in sessions)
+                )
+            finally:
+                server.server.close()
+                await server.server.wait_closed()
+
+        return asyncio.run(main())
+
+    def test_session(self, storage, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            storage -- _description_
+            tmp_path -- _description_
+        """
+        (replies,) = self.run(
+            storage,
+            str(tmp_path / "server.sock"),
+            [
+                {"id": 1, "op": "login", "args": ["test", "test"]},
+                {"id": 2, "op": "add_element", "args": ["item1", "it1", "1234"]},
+                {"op": "get_element", "args": {"element_name": "item1"}},
+                {"op": "list_page", "args": [None, 10]},
+            ],
+        )
+        assert replies[0] == {
+            "id": 1,
+            "ok": True,
+            "result": True,
+            "messages": [],
+            "errors": [],
+        }
+        assert replies[1]["id"] == 2 and replies[1]["messages"]
+        assert replies[2]["result"] == ["item1", "it1", "1234"]
+        assert replies[3]["result"] == ["item1"]
+        vault = storage.get_vault(storage.get_user("test"))
+        assert vault.list_elements() == ["item1"]
+        assert is_encrypted(vault.get_element("item1").password)
+
+    def test_vault_per_connection(self, storage, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            storage -- _description_
+            tmp_path -- _description_
+        """
+        sessions = [
+            [
+                {"op": "login", "args": [login, login]},
+                {"op": "add_element", "args": [f"{login}-item", "it", "1234"]},
+                {"op": "list_elements"},
+            ]
+            for login in ("test", "toto")
+        ]
+        test, toto = self.run(storage, str(tmp_path / "server.sock"), *sessions)
+        assert test[2]["result"] == ["test-item"]
+        assert toto[2]["result"] == ["toto-item"]
+
+    def test_errors(self, storage, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            storage -- _description_
+            tmp_path -- _description_
+        """
+        (replies,) = self.run(
+            storage,
+            str(tmp_path / "server.sock"),
+            [
+                b"not json",
+                {"op": "exit"},
+                {"op": "audit_passwords", "args": ["/etc/passwd"]},
+                {"op": "login", "args": ["nobody", "x"]},
+                {"op": "get_element", "args": ["missing"]},
+                {"op": "add_element", "args": ["too few"]},
+                {"op": "create_user", "args": ["new", "new"]},
+            ],
+        )
+        assert [reply["ok"] for reply in replies] == [False] * 6 + [True]
+        assert replies[3]["result"] is False
+        assert storage.get_user("new") is not None
@@ -0,0 +1,147 @@
+"""
+Testing sharded storage
+"""
+import os
+import pytest
+from model.data import UserStorage, VaultItem
+from model.shards import ShardStore
+
+
+class TestShardedStorage:
+    """
+    _summary_
+    """
+
+    @pytest.fixture
+    def dirname(self, tmp_path) -> str:
+        """
+        _summary_
+
+        Arguments:
+            tmp_path -- _description_
+
+        Returns:
+            _description_
+        """
+        dirname = str(tmp_path / "data")
+        storage = UserStorage()
+        storage.load(dirname, sharded=True)
+        for login in ("test", "toto"):
+            storage.create_user(login, login)
+            vault = storage.get_vault(storage.get_user(login))
+            vault.add_element(VaultItem(f"{login}1", login, "1234"))
+        storage.save(dirname)
+        return dirname
+
+    def test_vaults_are_lazy(self, dirname):
+        """
+        _summary_
+
+        Arguments:
+            dirname -- _description_
+        """
+        storage = UserStorage()
+        storage.load(dirname)
+        assert len(storage.users) == 2
+        assert all(vault is None for vault in storage.users.values())
+
+    def test_get_vault_loads_shard(self, dirname):
+        """
+        _summary_
+
+        Arguments:
+            dirname -- _description_
+        """
+        storage = UserStorage()
+        storage.load(dirname)
+        user = storage.get_user("test")
+        assert storage.get_vault(user).list_elements() == ["test1"]
+        assert storage.users[user] is not None
+        assert storage.users[storage.get_user("toto")] is None
+
+    def test_save_writes_loaded_vaults_only(self, dirname):
+        """
+        _summary_
+
+        Arguments:
+            dirname -- _description_
+        """
+        storage = UserStorage()
+        storage.load(dirname)
+        os.remove(ShardStore(dirname).vault_path("toto"))
+        vault = storage.get_vault(storage.get_user("test"))
+        vault.add_element(VaultItem("test2", "test", "1234"))
+        storage.save(dirname)
+
+        assert not os.path.exists(ShardStore(dirname).vault_path("toto"))
+        storage.load(dirname)
+        assert storage.get_vault(storage.get_user("test")).list_elements() == [
+            "test1",
+            "test2",
+        ]
+
+    def test_remove_user_deletes_shard(self, dirname):
+        """
+        _summary_
+
+        Arguments:
+            dirname -- _description_
+        """
+        storage = UserStorage()
+        storage.load(dirname)
+        assert storage.remove_user("toto", "toto")
+        storage.save(dirname)
+        assert not os.path.exists(ShardStore(dirname).vault_path("toto"))
+        storage.load(dirname)
+        assert storage.get_user("toto") is None
+
+    @pytest.mark.xfail(raises=KeyError)
+    def test_missing_shard(self, dirname):
+        """
+        _summary_
+
+        Arguments:
+            dirname -- _description_
+        """
+        storage = UserStorage()
+        storage.load(dirname)
+        os.remove(ShardStore(dirname).vault_path("toto"))
+        storage.get_vault(storage.get_user("toto"))
+
+    def test_journaled(self, dirname):
+        """
+        _summary_
+
+        Arguments:
+            dirname -- _description_
+        """
+        storage = UserStorage()
+        storage.load(dirname, journaled=True)
+        vault = storage.get_vault(storage.get_user("toto"))
+        del vault.elements["toto1"]
+        storage.save(dirname)
+
+        storage = UserStorage()
+        storage.load(dirname, journaled=True)
+        assert storage.users[storage.get_user("test")] is None
+        assert storage.get_vault(storage.get_user("toto")).list_elements() == []
+
+    def test_convert_from_pickle(self, dirname, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            dirname -- _description_
+            tmp_path -- _description_
+        """
+        filename = str(tmp_path / "data.dat")
+        storage = UserStorage()
+        storage.load(dirname)
+        storage.save(filename)
+
+        storage.load(filename)
+        copy = str(tmp_path / "copy")
+        os.mkdir(copy)
+        storage.save(copy)
+        storage.load(copy)
+        assert storage.get_vault(storage.get_user("toto")).list_elements() == ["toto1"]
@@ -0,0 +1,81 @@
+"""
+Testing instrumentation
+"""
+import json
+import os
+import subprocess
+import sys
+import pytest
+from model import stats
+from model.stats import Recorder
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+from model import stats
+from model.data import UserStorage, VaultItem
+storage = UserStorage()
+storage.create_user("test", "test")
+storage.authenticate("test", "test")
+storage.get_vault(storage.get_user("test")).add_element(VaultItem("a", "b", "c"))
+storage.save({filename!r})
+storage.load({filename!r})
+storage.get_vault(storage.get_user("test")).search_by_name("a")
+stats.dump()
+"""
+
+
+class TestStats:
+    """
+    _summary_
+    """
+
+    def test_recorder(self):
+        """
+        _summary_
+        """
+        recorder = Recorder()
+        for ms in range(1, 101):
+            recorder.record("op", ms / 1e3)
+        recorder.add_bytes("read", 10)
+        recorder.add_bytes("read", 5)
+        snapshot = recorder.snapshot()
+        entry = snapshot["calls"]["op"]
+        assert entry["count"] == 100
+        assert round(entry["total_ms"]) == 5050
+        assert round(entry["p50_ms"]) == 51 and round(entry["max_ms"]) == 100
+        assert snapshot["bytes"] == {"read": 15}
+        assert len(recorder.report()) == 3
+        recorder.clear()
+        assert recorder.snapshot() == {"calls": {}, "bytes": {}}
+
+    @pytest.mark.skipif(stats.ENABLED, reason="PASSMAN_STATS is set")
+    def test_disabled(self):
+        """
+        _summary_
+        """
+        def func():
+            return 1
+
+        assert stats.timed("op")(func) is func
+
+    def test_enabled(self, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            tmp_path -- _description_
+        """
+        output = tmp_path / "stats.json"
+        script = SCRIPT.format(filename=str(tmp_path / "data.dat"))
+        env = {**os.environ, "PASSMAN_STATS": str(output)}
+        subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, check=True)
+        snapshot = json.loads(output.read_text())
+        for name in (
+            "storage.save",
+            "storage.load",
+            "user.verify_password",
+            "vault.search_by_name",
+        ):
+            assert snapshot["calls"][name]["count"] == 1
+        assert snapshot["bytes"]["written"] == snapshot["bytes"]["read"] > 0
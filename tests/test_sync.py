@@ -0,0 +1,259 @@
+"""
+Testing synchronisation of two copies of the data
+"""
+
+import os
+import pytest
+from model.data import UserStorage, VaultItem
+from model.sync import (
+    OURS,
+    THEIRS,
+    TREE_SUFFIX,
+    SavedTree,
+    StorageTree,
+    build_tree,
+    diff,
+    merge,
+    open_storage,
+    sync_files,
+)
+
+
+def make_storage(*logins: str) -> UserStorage:
+    """
+    _summary_
+
+    Returns:
+        _description_
+    """
+    storage = UserStorage()
+    for login in logins:
+        storage.create_user(login, "pass")
+        vault = storage.get_vault(storage.get_user(login))
+        vault.add_elements(VaultItem(f"item{i}", "it", str(i)) for i in range(100))
+    return storage
+
+
+def copy(storage: UserStorage, tmp_path, name: str) -> UserStorage:
+    """
+    _summary_
+
+    Returns:
+        _description_
+    """
+    storage.save(str(tmp_path / name))
+    return open_storage(str(tmp_path / name))
+
+
+class TestTree:
+    """
+    _summary_
+    """
+
+    def test_diff(self):
+        """
+        _summary_
+        """
+        digests = {f"key{i}": bytes([i % 256]) * 16 for i in range(1000)}
+        tree = build_tree(digests)
+        assert build_tree(dict(reversed(digests.items()))).digest == tree.digest
+        assert list(diff(tree, build_tree(digests))) == []
+        changed = dict(digests, key5=b"\xff" * 16, new=b"\x00" * 16)
+        del changed["key999"]
+        assert set(diff(tree, build_tree(changed))) == {"key5", "new", "key999"}
+        small = build_tree({"key5": digests["key5"]})
+        assert set(diff(small, tree)) == set(digests) - {"key5"}
+        assert set(diff(None, small)) == {"key5"}
+
+    def test_changes(self, tmp_path):
+        """
+        _summary_
+        """
+        ours = make_storage("alice", "bob")
+        theirs = copy(ours, tmp_path, "theirs.dat")
+        assert StorageTree(ours).changes(StorageTree(theirs)) == {}
+        vault = theirs.get_vault(theirs.get_user("bob"))
+        vault.elements["item3"] = VaultItem("item3", "it", "changed")
+        theirs.create_user("carol", "pass")
+        assert StorageTree(ours).changes(StorageTree(theirs)) == {
+            "bob": {"item3"},
+            "carol": set(),
+        }
+
+
+class TestMerge:
+    """
+    _summary_
+    """
+
+    def test_two_way(self, tmp_path):
+        """
+        _summary_
+        """
+        ours = make_storage("alice")
+        theirs = copy(ours, tmp_path, "theirs.dat")
+        del ours.get_vault(ours.get_user("alice")).elements["item1"]
+        vault = theirs.get_vault(theirs.get_user("alice"))
+        vault.elements["new"] = VaultItem("new", "it", "x")
+        vault.elements["item2"] = VaultItem("item2", "it", "theirs")
+        ours.get_vault(ours.get_user("alice")).elements["item2"] = VaultItem(
+            "item2", "it", "ours"
+        )
+        theirs.create_user("bob", "pass")
+        report = merge(ours, StorageTree(ours), StorageTree(theirs))
+        merged = ours.get_vault(ours.get_user("alice"))
+        # nothing removed without base: item1 comes back
+        assert merged.get_element("item1").password == "1"
+        assert merged.get_element("new").password == "x"
+        assert merged.get_element("item2").password == "ours"
+        assert ours.get_user("bob") is not None
+        assert report.conflicts == [("alice", "item2")]
+        assert (report.added, report.updated, report.removed) == (3, 0, 0)
+
+    @pytest.mark.parametrize("policy", [OURS, THEIRS])
+    def test_three_way(self, tmp_path, policy):
+        """
+        _summary_
+        """
+        ours = make_storage("alice", "bob")
+        theirs = copy(ours, tmp_path, "theirs.dat")
+        base = StorageTree(copy(ours, tmp_path, "base.dat"))
+        del ours.get_vault(ours.get_user("alice")).elements["item1"]
+        ours.get_vault(ours.get_user("alice")).elements["item2"] = VaultItem(
+            "item2", "it", "ours"
+        )
+        vault = theirs.get_vault(theirs.get_user("alice"))
+        vault.elements["item2"] = VaultItem("item2", "it", "theirs")
+        vault.elements["item3"] = VaultItem("item3", "it", "theirs")
+        theirs.remove_user("bob", "pass")
+        report = merge(ours, StorageTree(ours), StorageTree(theirs), base, policy)
+        merged = ours.get_vault(ours.get_user("alice"))
+        assert "item1" not in merged.elements
+        assert merged.get_element("item3").password == "theirs"
+        assert merged.get_element("item2").password == policy
+        assert ours.get_user("bob") is None
+        assert report.conflicts == ([("alice", "item2")] if policy == OURS else [])
+
+    def test_password_changed(self, tmp_path):
+        """
+        _summary_
+        """
+        ours = make_storage("alice")
+        theirs = copy(ours, tmp_path, "theirs.dat")
+        base = StorageTree(copy(ours, tmp_path, "base.dat"))
+        ours.get_vault(ours.get_user("alice")).elements["mine"] = VaultItem(
+            "mine", "it", "x"
+        )
+        theirs.remove_user("alice", "pass")
+        theirs.create_user("alice", "other")
+        merge(ours, StorageTree(ours), StorageTree(theirs), base)
+        # the user is taken as a whole: its items are not mixed
+        assert ours.authenticate("alice", "other") is not None
+        assert ours.get_vault(ours.get_user("alice")).list_elements() == []
+
+    def test_unknown_policy(self):
+        """
+        _summary_
+        """
+        ours = make_storage("alice")
+        with pytest.raises(ValueError):
+            merge(ours, StorageTree(ours), StorageTree(ours), policy="both")
+
+
+class TestSyncFiles:
+    """
+    _summary_
+    """
+
+    @pytest.mark.parametrize("binary", [False, True])
+    def test_sync_files(self, tmp_path, binary):
+        """
+        _summary_
+        """
+        name = "data.bin" if binary else "data.dat"
+        our_file, their_file = str(tmp_path / name), str(tmp_path / f"other-{name}")
+        base_file = str(tmp_path / "base.tree")
+        storage = UserStorage()
+        storage.load(our_file, journaled=True, binary=binary)
+        storage.users = make_storage("alice").users
+        storage.compact(our_file)
+        storage.journal.close()
+        open_storage(our_file).save(their_file)
+
+        ours, theirs = open_storage(our_file), open_storage(their_file)
+        ours.get_vault(ours.get_user("alice")).elements["item0"] = VaultItem(
+            "item0", "it", "ours"
+        )
+        ours.save(our_file)
+        ours.journal.close()
+        theirs.create_user("bob", "pass")
+        theirs.save(their_file)
+
+        report = sync_files(our_file, their_file, base_file)
+        assert (report.added, report.updated, report.removed) == (1, 0, 0)
+        for filename in (our_file, their_file):
+            synced = open_storage(filename)
+            assert sorted(user.login for user in synced.users) == ["alice", "bob"]
+            vault = synced.get_vault(synced.get_user("alice"))
+            assert vault.get_element("item0").password == "ours"
+            assert len(vault.elements) == 100
+            base = SavedTree(base_file)
+            assert StorageTree(None, saved=base).root.digest == (
+                StorageTree(synced).root.digest
+            )
+            base.close()
+            if synced.journal is not None:
+                synced.journal.close()
+        assert os.path.exists(our_file + TREE_SUFFIX) == binary
+
+        # with base, a removal on one side is synchronised
+        theirs = open_storage(their_file)
+        theirs.remove_user("bob", "pass")
+        theirs.save(their_file)
+        sync_files(our_file, their_file, base_file)
+        assert open_storage(our_file).get_user("bob") is None
+
+    def test_legacy_base(self, tmp_path):
+        """
+        _summary_
+        """
+        our_file, their_file = str(tmp_path / "ours.dat"), str(tmp_path / "theirs.dat")
+        base_file = str(tmp_path / "base.dat")
+        make_storage("alice", "bob").save(base_file)
+        open_storage(base_file).save(our_file)
+        theirs = open_storage(base_file)
+        theirs.remove_user("bob", "pass")
+        theirs.save(their_file)
+        sync_files(our_file, their_file, base_file)
+        assert open_storage(our_file).get_user("bob") is None
+        # the base is written back as a tree
+        assert list(SavedTree(base_file).users) == ["alice"]
+
+    def test_saved_tree(self, tmp_path):
+        """
+        _summary_
+        """
+        filename = str(tmp_path / "data.bin")
+        storage = UserStorage()
+        storage.load(filename, binary=True)
+        storage.users = make_storage("alice", "bob").users
+        storage.save(filename)
+        storage.store.close()
+        storage = open_storage(filename)
+        StorageTree(storage).save(
+            filename + TREE_SUFFIX, lambda login: storage.store.vault_stamp(login)
+        )
+        storage.store.close()
+
+        storage = open_storage(filename)
+        alice = storage.get_user("alice")
+        vault = storage.get_vault(alice)
+        vault.elements["item1"] = VaultItem("item1", "it", "changed")
+        saved = SavedTree(filename + TREE_SUFFIX)
+        tree = StorageTree(storage, saved=saved)
+        # bob’s vault is unchanged: taken from the saved tree, not loaded
+        assert storage.users[storage.get_user("bob")] is None
+        assert tree.root.digest == StorageTree(storage).root.digest
+        assert tree.changes(StorageTree(None, saved=saved)) == {"alice": {"item1"}}
+        saved.close()
+        storage.store.close()
@@ -0,0 +1,121 @@
+"""
+Testing import and export
+"""
+import io
+import pytest
+from model.data import Vault, VaultItem
+from model.transfer import (
+    export_file,
+    import_file,
+    import_items,
+    read_csv,
+    read_jsonl,
+    write_csv,
+    write_jsonl,
+)
+
+
+class TestTransfer:
+    """
+    _summary_
+    """
+
+    @pytest.fixture
+    def vault(self) -> Vault:
+        """
+        _summary_
+
+        Returns:
+            _description_
+        """
+        vault = Vault()
+        vault.add_element(VaultItem("item2", "it2", "pa,ss"))
+        vault.add_element(VaultItem("item1", "ït1", 'pa"ss'))
+        return vault
+
+    def test_csv_roundtrip(self, vault):
+        """
+        _summary_
+
+        Arguments:
+            vault -- _description_
+        """
+        file = io.StringIO()
+        assert write_csv(file, vault.elements.values()) == 2
+        file.seek(0)
+        items = list(read_csv(file))
+        assert [(i.name, i.login, i.password) for i in items] == [
+            ("item2", "it2", "pa,ss"),
+            ("item1", "ït1", 'pa"ss'),
+        ]
+
+    def test_jsonl_roundtrip(self, vault):
+        """
+        _summary_
+
+        Arguments:
+            vault -- _description_
+        """
+        file = io.StringIO()
+        assert write_jsonl(file, vault.elements.values()) == 2
+        file.seek(0)
+        assert [i.password for i in read_jsonl(file)] == ["pa,ss", 'pa"ss']
+
+    def test_csv_aliases(self):
+        """
+        _summary_
+        """
+        file = io.StringIO("Title,URL,Username,Password\nmail,http://m,me,1234\n")
+        item = next(read_csv(file))
+        assert (item.name, item.login, item.password) == ("mail", "me", "1234")
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_csv_missing_column(self):
+        """
+        _summary_
+        """
+        next(read_csv(io.StringIO("name,login\nmail,me\n")))
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_jsonl_invalid_item(self):
+        """
+        _summary_
+        """
+        next(read_jsonl(io.StringIO('{"name": "mail"}\n')))
+
+    def test_import_items(self, vault):
+        """
+        _summary_
+
+        Arguments:
+            vault -- _description_
+        """
+        items = (VaultItem(f"item{i}", "it", "1234") for i in range(10))
+        assert import_items(vault, items, batch_size=3) == (8, 2)
+        assert len(vault.list_elements()) == 10
+
+    def test_files(self, vault, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            vault -- _description_
+            tmp_path -- _description_
+        """
+        for extension in ("csv", "jsonl"):
+            filename = str(tmp_path / f"export.{extension}")
+            assert export_file(vault, filename) == 2
+            copy = Vault()
+            assert import_file(copy, filename) == (2, 0)
+            assert copy.get_element("item1").login == "ït1"
+
+    @pytest.mark.xfail(raises=ValueError)
+    def test_unsupported_format(self, vault, tmp_path):
+        """
+        _summary_
+
+        Arguments:
+            vault -- _description_
+            tmp_path -- _description_
+        """
+        export_file(vault, str(tmp_path / "export.txt"))
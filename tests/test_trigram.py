@@ -0,0 +1,119 @@
+"""
+Testing trigram search
+"""
+import pytest
+from model.data import Vault, VaultItem
+from model.trigram import TrigramIndex, similarity, trigrams
+
+
+class TestTrigram:
+    """
+    _summary_
+    """
+
+    def test_trigrams(self):
+        """
+        _summary_
+        """
+        assert trigrams("Mail", padded=False) == {"mai", "ail"}
+        assert trigrams("ab") == {"  a", " ab", "ab "}
+
+    def test_similarity(self):
+        """
+        _summary_
+        """
+        assert similarity(trigrams("mail"), trigrams("mail")) == 1.0
+        assert similarity(trigrams("mail"), trigrams("bank")) == 0.0
+
+    def test_remove(self):
+        """
+        _summary_
+        """
+        index = TrigramIndex(["gmail", "hotmail"])
+        index.remove("gmail")
+        assert index.substring("mail", []) == ["hotmail"]
+
+
+class TestVaultSearch:
+    """
+    _summary_
+    """
+
+    @pytest.fixture
+    def vault(self) -> Vault:
+        """
+        _summary_
+
+        Returns:
+            _description_
+        """
+        vault = Vault()
+        for name in ("work-gmail", "Mail", "bank", "hotmail.com", "mailbox"):
+            vault.add_element(VaultItem(name, "me", "1234"))
+        return vault
+
+    def names(self, items) -> list[str]:
+        """
+        _summary_
+
+        Arguments:
+            items -- _description_
+
+        Returns:
+            _description_
+        """
+        return [item.name for item in items]
+
+    def test_substring(self, vault):
+        """
+        _summary_
+
+        Arguments:
+            vault -- _description_
+        """
+        names = self.names(vault.search_substring("mail"))
+        assert names[0] == "Mail"
+        assert sorted(names) == ["Mail", "hotmail.com", "mailbox", "work-gmail"]
+
+    def test_substring_short_query(self, vault):
+        """
+        _summary_
+
+        Arguments:
+            vault -- _description_
+        """
+        assert self.names(vault.search_substring("nk")) == ["bank"]
+
+    def test_substring_not_found(self, vault):
+        """
+        _summary_
+
+        Arguments:
+            vault -- _description_
+        """
+        assert vault.search_substring("mails") == []
+
+    def test_fuzzy(self, vault):
+        """
+        _summary_
+
+        Arguments:
+            vault -- _description_
+        """
+        names = self.names(vault.search_fuzzy("hotmial"))
+        assert names[0] == "hotmail.com" and "bank" not in names
+
+    def test_index_follows_mutations(self, vault):
+        """
+        _summary_
+
+        Arguments:
+            vault -- _description_
+        """
+        vault.search_substring("mail")
+        del vault.elements["hotmail.com"]
+        vault.add_element(VaultItem("ymail", "me", "1234"))
+        vault.add_elements([VaultItem(f"mail{i}", "me", "1234") for i in range(3)])
+        names = self.names(vault.search_substring("mail"))
+        assert "hotmail.com" not in names
+        assert {"ymail", "mail0", "mail1", "mail2"} <= set(names)
@@ -0,0 +1,88 @@
+"""
+    Batch mode: runs a stream of commands, without prompts
+
+Each line is a command, either a JSON request as served by view.server:
+    {"id": 1, "op": "add_element", "args": ["site", "alice", "secret"]}
+or words, split as a shell does:
+    add_element site alice "my secret"
+Blank lines and lines starting with # are skipped. Each command gets one line
+of JSON in return, as from the server; a command without id gets its line
+number.
+"""
+from __future__ import annotations
+from functools import partial
+import json
+import shlex
+from typing import Iterable, TextIO
+
+from controller.tui_controller import TuiController
+from model.data import UserStorage
+from view.server import OPERATIONS, SessionView, make_reply, parse_request
+
+# operations opening files of this host: never served to remote clients
+BATCH_OPERATIONS = (
+    *OPERATIONS,
+    "import_elements",
+    "export_elements",
+    "audit_passwords",
+)
+
+
+def parse_command(line: str) -> tuple[object, str, list | dict]:
+    """
+    Read a command
+
+    Arguments:
+        line -- JSON request, or words
+
+    Raises:
+        ValueError: on malformed command or unknown operation
+
+    Returns:
+        request id, operation, and its positional or keyword arguments
+    """
+    if line.lstrip().startswith("{"):
+        return parse_request(line, BATCH_OPERATIONS)
+    op, *args = shlex.split(line)
+    if op not in BATCH_OPERATIONS:
+        raise ValueError(f"opération inconnue {op}")
+    return None, op, args
+
+
+def run(storage: UserStorage, commands: Iterable[str], output: TextIO) -> int:
+    """
+    Run commands against storage, in one session. Saving is left to the caller.
+
+    Arguments:
+        storage -- loaded storage
+        commands -- command lines
+        output -- receives one JSON reply per command
+
+    Returns:
+        number of failed commands
+    """
+    view = SessionView()
+    controller = TuiController(view, storage)
+    failed = 0
+    for number, line in enumerate(commands, 1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        request_id = result = None
+        try:
+            request_id, op, args = parse_command(line)
+        except ValueError as error:
+            view.show_error(f"Commande invalide: {error}")
+        else:
+            method = getattr(controller, op)
+            if isinstance(args, dict):
+                call = partial(method, **args)
+            else:
+                call = partial(method, *args)
+            try:
+                result = call()
+            except (KeyError, TypeError, ValueError) as error:
+                view.show_error(f"Erreur: {error}")
+        reply = make_reply(view, number if request_id is None else request_id, result)
+        failed += not reply["ok"]
+        output.write(json.dumps(reply) + "\n")
+    return failed
@@ -0,0 +1,264 @@
+"""
+    Socket server, speaking line delimited JSON
+
+Each request is one line holding a JSON object:
+    {"id": 1, "op": "login", "args": ["alice", "secret"]}
+and gets one line in return:
+    {"id": 1, "ok": true, "result": true, "messages": [], "errors": []}
+
+Operations are the TuiController methods in OPERATIONS, with positional or
+keyword arguments. Each connection has its own controller, hence its own vault.
+"""
+from __future__ import annotations
+import asyncio
+from functools import partial
+import json
+import os
+from typing import Any, Iterable, Optional
+
+from controller.tui_controller import TuiController
+from model.data import UserStorage, Vault
+
+# operation: True if it may keep the CPU busy, and runs on a worker thread
+OPERATIONS = {
+    "login": True,
+    "create_user": True,
+    "remove_user": True,
+    "list_elements": True,
+    "list_page": False,
+    "show_details": False,
+    "get_element": False,
+    "add_element": False,
+    "edit_element": False,
+    "remove_element": False,
+    "apply_changes": True,
+    "search_by_name": True,
+    "search_by_login": False,
+    "undo": False,
+    "item_history": False,
+}
+LINE_LIMIT = 1 << 20
+
+
+class SessionView:
+    """
+    View of a connection: collects what the controller shows, to send it back
+    with the reply
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor
+        """
+        self.messages: list[str] = []
+        self.errors: list[str] = []
+
+    def show_message(self, message: str) -> None:
+        """
+        Collect a message
+
+        Arguments:
+            message -- Message to send
+        """
+        self.messages.append(message)
+
+    def show_lines(self, lines: list[str]) -> None:
+        """
+        Collect many messages
+
+        Arguments:
+            lines -- Messages to send
+        """
+        self.messages.extend(lines)
+
+    def show_error(self, message: str) -> None:
+        """
+        Collect an error
+
+        Arguments:
+            message -- Error to send
+        """
+        self.errors.append(message)
+
+    def flush(self) -> tuple[list[str], list[str]]:
+        """
+        Take collected messages and errors
+
+        Returns:
+            messages and errors shown since last flush
+        """
+        messages, errors = self.messages, self.errors
+        self.messages, self.errors = [], []
+        return messages, errors
+
+
+def parse_request(
+    line: bytes | str, operations: Iterable[str] = OPERATIONS
+) -> tuple[Any, str, list | dict]:
+    """
+    Read a request
+
+    Arguments:
+        line -- JSON object
+
+    Keyword Arguments:
+        operations -- allowed operations (default: {OPERATIONS})
+
+    Raises:
+        ValueError: on malformed request or unknown operation
+
+    Returns:
+        request id, operation, and its positional or keyword arguments
+    """
+    try:
+        request = json.loads(line)
+        request_id = request.get("id")
+        op = request["op"]
+        args = request.get("args", [])
+    except (AttributeError, KeyError, TypeError) as error:
+        raise ValueError(f"champ manquant ou invalide {error}") from error
+    if not isinstance(op, str) or op not in operations:
+        raise ValueError(f"opération inconnue {op}")
+    if not isinstance(args, (list, dict)):
+        raise ValueError("args doit être une liste ou un objet")
+    return request_id, op, args
+
+
+def make_reply(view: SessionView, request_id: Any, result: Any) -> dict[str, Any]:
+    """
+    Build the reply to a request
+
+    Arguments:
+        view -- view of the session, flushed
+        request_id -- id of the request
+        result -- returned by the controller
+
+    Returns:
+        reply
+    """
+    messages, errors = view.flush()
+    return {
+        "id": request_id,
+        "ok": not errors,
+        "result": result,
+        "messages": messages,
+        "errors": errors,
+    }
+
+
+class Server:
+    """
+    Serves a storage to many clients
+    """
+
+    def __init__(self, storage: UserStorage) -> None:
+        """
+        Constructor
+
+        Arguments:
+            storage -- loaded storage, shared by every connection
+        """
+        self.storage = storage
+        self.server: Optional[asyncio.Server] = None
+
+    async def start(self, address: str) -> None:
+        """
+        Start listening
+
+        Arguments:
+            address -- "host:port" for TCP, a socket path otherwise
+        """
+        if ":" in address:
+            host, port = address.rsplit(":", 1)
+            self.server = await asyncio.start_server(
+                self.handle, host, int(port), limit=LINE_LIMIT
+            )
+        else:
+            if os.path.exists(address):
+                os.remove(address)
+            self.server = await asyncio.start_unix_server(
+                self.handle, address, limit=LINE_LIMIT
+            )
+
+    async def serve(self, address: str) -> None:
+        """
+        Listen until cancelled
+
+        Arguments:
+            address -- "host:port" for TCP, a socket path otherwise
+        """
+        await self.start(address)
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Answer the requests of a connection, one at a time
+
+        Arguments:
+            reader -- connection input
+            writer -- connection output
+        """
+        view = SessionView()
+        controller = TuiController(view, self.storage)
+        try:
+            while line := await reader.readline():
+                reply = await self.dispatch(controller, view, line)
+                writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # reset by peer, or line over LINE_LIMIT
+            pass
+        finally:
+            controller.vault = Vault()
+            writer.close()
+
+    async def dispatch(
+        self, controller: TuiController, view: SessionView, line: bytes
+    ) -> dict[str, Any]:
+        """
+        Run a request
+
+        Arguments:
+            controller -- controller of the connection
+            view -- view of the connection
+            line -- request
+
+        Returns:
+            reply
+        """
+        request_id = result = None
+        try:
+            request_id, op, args = parse_request(line)
+        except ValueError as error:
+            view.show_error(f"Requête invalide: {error}")
+        else:
+            method = getattr(controller, op)
+            if isinstance(args, dict):
+                call = partial(method, **args)
+            else:
+                call = partial(method, *args)
+            try:
+                if OPERATIONS[op]:
+                    result = await asyncio.to_thread(call)
+                else:
+                    result = call()
+            except (KeyError, TypeError, ValueError) as error:
+                view.show_error(f"Erreur: {error}")
+        return make_reply(view, request_id, result)
+
+
+def run(storage: UserStorage, address: str) -> None:
+    """
+    Serve storage until interrupted
+
+    Arguments:
+        storage -- loaded storage
+        address -- "host:port" for TCP, a socket path otherwise
+    """
+    try:
+        asyncio.run(Server(storage).serve(address))
+    except KeyboardInterrupt:
+        pass
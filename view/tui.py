@@ -2,6 +2,8 @@
     Terminal User Interface
 """
 from __future__ import annotations
+import sys
+
 import colorama
 from colorama import Fore, Style
 
@@ -55,6 +57,17 @@ class Tui:
         """
         print(message)
 
+    @staticmethod
+    def show_lines(lines: list[str]) -> None:
+        """
+        Print many lines to screen in one write
+
+        Arguments:
+            lines -- lines to print
+        """
+        sys.stdout.write("".join(f"{line}\n" for line in lines))
+        sys.stdout.flush()
+
     @staticmethod
     def show_error(message: str) -> None:
         """
@@ -116,37 +129,49 @@ class Tui:
                 \r4. Modifier un élément.
                 \r5. Supprimer un élément.
                 \r6. Rechercher un élément par son nom.
+                \r7. Importer des éléments (CSV ou JSONL).
+                \r8. Exporter les éléments (CSV ou JSONL).
+                \r9. Rechercher les éléments utilisant un login.
+                \r10. Annuler la dernière modification.
+                \r11. Historique d’un élément.
+                \r12. Vérifier les mots de passe compromis.
                 
                 \r0. Fermer le coffre-fort.
             """
             )
             choice = self.ask("Votre choix: ")
-            while not choice.isdigit() and choice not in [
-                "0",
-                "1",
-                "2",
-                "3",
-                "4",
-                "5",
-                "6",
-            ]:
-                match int(choice):
-                    case 0:
-                        return
-                    case 1:
-                        self.list_elements()
-                    case 2:
-                        self.show_details()
-                    case 3:
-                        self.add_element()
-                    case 4:
-                        self.edit_element()
-                    case 5:
-                        self.remove_element()
-                    case 6:
-                        self.search_by_name()
-                    case _:
-                        self.show_error("Choix invalide. Veuillez réessayer.")
+            match int(choice) if choice.isdigit() else choice:
+                case 0:
+                    return
+                case 1:
+                    self.list_elements()
+                case 2:
+                    self.show_details()
+                case 3:
+                    self.add_element()
+                case 4:
+                    self.edit_element()
+                case 5:
+                    self.remove_element()
+                case 6:
+                    self.search_by_name()
+                case 7:
+                    self.import_elements()
+                case 8:
+                    self.export_elements()
+                case 9:
+                    self.search_by_login()
+                case 10:
+                    self.controller.undo()
+                case 11:
+                    self.item_history()
+                case 12:
+                    self.audit_passwords()
+                case "stats":
+                    # hidden entry
+                    self.show_stats()
+                case _:
+                    self.show_error("Choix invalide. Veuillez réessayer.")
 
     @staticmethod
     def ask(prompt: str, default: str = "") -> str:
@@ -242,14 +267,79 @@ class Tui:
         """
         _summary_
         """
-        query = self.ask("Entrez le début du nom de l’élément: ")
-        for item in self.controller.search_by_name(query):
+        mode = self.ask(
+            "Type de recherche: 1. début du nom, 2. partie du nom, 3. approchée ", "1"
+        )
+        query = self.ask("Entrez le texte à rechercher: ")
+        modes = {"2": ctrl.SUBSTRING, "3": ctrl.FUZZY}
+        for item in self.controller.search_by_name(query, modes.get(mode, ctrl.PREFIX)):
             self.show_message(item)
 
-    def list_elements(self) -> None:
+    def search_by_login(self) -> None:
         """
         _summary_
         """
-        for item in self.controller.list_elements():
+        login = self.ask("Entrez le login ou l’email: ")
+        for item in self.controller.search_by_login(login):
             self.show_message(item)
+
+    def item_history(self) -> None:
+        """
+        _summary_
+        """
+        element_name = self.ask("Entrez le nom de l’élément: ")
+        for name, login, password in self.controller.item_history(element_name):
+            if name:
+                self.show_message(f"{name} | {login} | {password}")
+            else:
+                self.show_message("(supprimé)")
         self.ask("Appuyez sur une touche pour continuer.")
+
+    def audit_passwords(self) -> None:
+        """
+        _summary_
+        """
+        corpus = self.ask(
+            "Entrez le chemin du fichier de hachages SHA-1 compromis: ",
+            "pwned-passwords-sha1.txt",
+        )
+        for name, count in self.controller.audit_passwords(corpus):
+            self.show_message(f"{name}: {count} fuite(s)")
+        self.ask("Appuyez sur une touche pour continuer.")
+
+    def list_elements(self) -> None:
+        """
+        _summary_
+        """
+        after = None
+        while page := self.controller.list_page(after):
+            self.show_lines(page)
+            after = page[-1]
+            if len(page) < ctrl.PAGE_SIZE:
+                break
+            if self.ask("Entrée pour la page suivante, q pour arrêter: ") == "q":
+                return
+        self.ask("Appuyez sur une touche pour continuer.")
+
+    def show_stats(self) -> None:
+        """
+        _summary_
+        """
+        self.show_lines(self.controller.get_stats())
+        self.ask("Appuyez sur une touche pour continuer.")
+
+    def import_elements(self) -> None:
+        """
+        _summary_
+        """
+        filename = self.ask(
+            "Entrez le chemin du fichier à importer (.csv ou .jsonl): "
+        )
+        self.controller.import_elements(filename)
+
+    def export_elements(self) -> None:
+        """
+        _summary_
+        """
+        filename = self.ask("Entrez le chemin du fichier d’export (.csv ou .jsonl): ")
+        self.controller.export_elements(filename)